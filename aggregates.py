@@ -0,0 +1,180 @@
+# aggregates.py
+import json
+import os
+import threading
+from datetime import date as date_cls, timedelta
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from atomic_io import atomic_open
+
+SNAPSHOT_VERSION = 2
+
+
+def _is_next_day(previous: str, date: str) -> bool:
+    return date_cls.fromisoformat(date) - date_cls.fromisoformat(previous) == timedelta(days=1)
+
+
+def aggregate_history(history: Iterable[Tuple[str, str]]) -> Optional[dict]:
+    """Build one (user, habit id) record from its (date, status) pairs in date order."""
+    record = None
+    for date, status in history:
+        record = _advance(record, date, status == '✅')
+    return record
+
+
+def _advance(record: Optional[dict], date: str, done: bool) -> dict:
+    """Fold a check-in dated after every check-in already in record."""
+    if record is None:
+        record = {'total': 0, 'completed': 0, 'last_date': None, 'last_run': 0, 'longest_streak': 0,
+                  'month': None, 'month_total': 0, 'month_completed': 0}
+    if done:
+        extends = record['last_run'] > 0 and _is_next_day(record['last_date'], date)
+        record['last_run'] = record['last_run'] + 1 if extends else 1
+        record['longest_streak'] = max(record['longest_streak'], record['last_run'])
+    else:
+        record['last_run'] = 0
+    if record['month'] != date[:7]:
+        record['month'], record['month_total'], record['month_completed'] = date[:7], 0, 0
+    record['total'] += 1
+    record['completed'] += done
+    record['month_total'] += 1
+    record['month_completed'] += done
+    record['last_date'] = date
+    return record
+
+
+class HabitAggregates:
+    def __init__(self, snapshot_file: str, tracking_signature: Callable[[], Optional[list]]):
+        """
+        Materialized per-(user, habit id) counters so /stats is a dictionary
+        lookup; keyed by habit id, so a renamed habit keeps its counters.
+
+        Each record holds the total and completed check-ins, the completed run
+        ending at the latest check-in, the longest run, the latest date and the
+        counts for the latest month. New check-ins after the latest date are
+        folded in O(1); anything else (backfills, same-day corrections) rebuilds
+        that one (user, habit id) from its history.
+
+        The counters are saved to a small JSON snapshot tagged with the
+        store's tracking signature (size and mtime of the CSV log, or the
+        SQLite data version) and the habit alias table's, and are only rebuilt
+        from the log at startup if either changed since the snapshot was taken.
+
+        Args:
+            snapshot_file: Path to the JSON snapshot
+            tracking_signature: Callable returning that signature
+        """
+        self.snapshot_file = snapshot_file
+        self.log_signature = tracking_signature
+        self._lock = threading.Lock()
+        # user_id -> {habit id: record}
+        self._records: Dict[str, Dict[int, dict]] = {}
+        self._dirty = False
+
+    # Snapshot
+
+    def load_snapshot(self) -> bool:
+        """Load the snapshot if it matches the current tracking log; True on success."""
+        if not os.path.exists(self.snapshot_file):
+            return False
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Ignoring unreadable stats snapshot: {e}")
+            return False
+        if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('log') != self.log_signature():
+            return False
+        # JSON object keys are strings
+        records = {user_id: {int(habit_id): record for habit_id, record in habits.items()}
+                   for user_id, habits in snapshot['records'].items()}
+        with self._lock:
+            self._records = records
+            self._dirty = False
+        return True
+
+    def save_snapshot(self, signature: Optional[list]):
+        """
+        Write the counters atomically if they changed since the last save.
+
+        Args:
+            signature: log_signature() taken while no check-ins were being
+                written, so the counters match the log exactly
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps({
+                'version': SNAPSHOT_VERSION,
+                'log': signature,
+                'records': self._records,
+            }, ensure_ascii=False, separators=(',', ':'))
+            self._dirty = False
+        with atomic_open(self.snapshot_file, 'w', encoding='utf-8') as file:
+            file.write(data)
+
+    def rebuild(self, frame, monthly):
+        """
+        Replace all counters with the output of the stats engine.
+
+        Args:
+            frame: StatsEngine.compute() result, keyed by habit id
+            monthly: StatsEngine.rollup(period='M') result, keyed by habit id
+        """
+        latest_month = monthly.groupby(['user_id', 'habit_id']).tail(1).set_index(['user_id', 'habit_id'])
+        records = {}
+        for row in frame.itertuples(index=False):
+            month = latest_month.loc[(row.user_id, row.habit_id)]
+            records.setdefault(row.user_id, {})[int(row.habit_id)] = {
+                'total': int(row.total),
+                'completed': int(row.completed),
+                'last_date': row.last_date,
+                'last_run': int(row.last_run),
+                'longest_streak': int(row.longest_streak),
+                'month': month['period_start'][:7],
+                'month_total': int(month['total']),
+                'month_completed': int(month['completed']),
+            }
+        with self._lock:
+            self._records = records
+            self._dirty = True
+
+    # Updates
+
+    def apply(self, date: str, user_id, habit_id: int, status: str, previous: Optional[str], history):
+        """
+        Fold one check-in into the counters.
+
+        Args:
+            date, user_id, status: The check-in just written
+            habit_id: Id of the habit it was recorded under
+            previous: Status the (user, habit id)'s check-in on date had before,
+                or None if it is new
+            history: Callable returning the (date, status) pairs for this
+                (user, habit id) in date order, used when O(1) folding isn't possible
+        """
+        if previous == status:
+            return
+        user_id = str(user_id)
+        with self._lock:
+            habits = self._records.setdefault(user_id, {})
+            record = habits.get(habit_id)
+            if previous is None and (record is None or date > record['last_date']):
+                habits[habit_id] = _advance(record, date, status == '✅')
+            else:
+                habits[habit_id] = aggregate_history(history())
+            self._dirty = True
+
+    # Queries
+
+    def user_stats(self, user_id, today: str) -> Dict[int, Dict]:
+        """{habit id: {'total', 'completed', 'current_streak', 'longest_streak', 'last_date', ...}}"""
+        yesterday = (date_cls.fromisoformat(today) - timedelta(days=1)).isoformat()
+        with self._lock:
+            records = self._records.get(str(user_id), {})
+            stats = {}
+            for habit_id, record in records.items():
+                stats[habit_id] = dict(record)
+                alive = record['last_date'] >= yesterday
+                stats[habit_id]['current_streak'] = record['last_run'] if alive else 0
+            return stats
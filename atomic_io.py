@@ -0,0 +1,144 @@
+# atomic_io.py
+import os
+import threading
+from contextlib import contextmanager
+
+from metrics import timed
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+# path -> {'lock': RLock, 'depth': int, 'fd': lock file descriptor or None}
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+
+def _lock_state(path: str) -> dict:
+    key = os.path.abspath(path)
+    with _file_locks_guard:
+        state = _file_locks.get(key)
+        if state is None:
+            state = _file_locks[key] = {'lock': threading.RLock(), 'depth': 0, 'fd': None}
+        return state
+
+
+@contextmanager
+def locked(path: str):
+    """
+    Hold the lock for path: a per-file in-process lock plus an advisory
+    flock() on path + '.lock' so other processes are excluded too.
+
+    Reentrant within a thread, so helpers below can take it again.
+    """
+    state = _lock_state(path)
+    with state['lock']:
+        if state['depth'] == 0 and fcntl is not None:
+            fd = os.open(path + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            state['fd'] = fd
+        state['depth'] += 1
+        try:
+            yield
+        finally:
+            state['depth'] -= 1
+            if state['depth'] == 0 and state['fd'] is not None:
+                fcntl.flock(state['fd'], fcntl.LOCK_UN)
+                os.close(state['fd'])
+                state['fd'] = None
+
+
+def fsync_dir(path: str):
+    """Flush the directory entry of path so a rename survives a crash."""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def replace_file(tmp_path: str, path: str):
+    """fsync tmp_path and atomically rename it over path."""
+    with open(tmp_path, 'rb+') as file:
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+    fsync_dir(path)
+
+
+@contextmanager
+def atomic_open(path: str, mode: str = 'w', **kwargs):
+    """
+    Open a temporary file next to path for writing; on success it is
+    fsynced and renamed over path, on error path is left untouched.
+
+    Readers see either the old or the new file, never a partial one.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with locked(path), timed("habitbot_file_write_seconds", file=os.path.basename(path), op="rewrite"):
+        try:
+            with open(tmp_path, mode, **kwargs) as file:
+                yield file
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, path)
+            fsync_dir(path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def journal_path(path: str) -> str:
+    return path + '.journal'
+
+
+def append_journaled(path: str, data: bytes):
+    """
+    Append data to path through a write-ahead journal.
+
+    The journal records the file size before the append followed by the
+    data, and is fsynced before path is touched. If the process dies during
+    the append, recover_journal() truncates path back to that size and
+    replays the data, so a crash never leaves a torn row behind.
+    """
+    journal = journal_path(path)
+    with locked(path), timed("habitbot_file_write_seconds", file=os.path.basename(path), op="append"):
+        offset = os.path.getsize(path) if os.path.exists(path) else 0
+        with open(journal, 'wb') as file:
+            file.write(b"%d %d\n" % (offset, len(data)) + data)
+            file.flush()
+            os.fsync(file.fileno())
+        with open(path, 'ab') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.remove(journal)
+
+
+def recover_journal(path: str) -> bool:
+    """Finish an append interrupted by a crash; True if one was replayed."""
+    journal = journal_path(path)
+    with locked(path):
+        if not os.path.exists(journal):
+            return False
+        with open(journal, 'rb') as file:
+            header = file.readline()
+            data = file.read()
+        try:
+            offset, length = (int(part) for part in header.split())
+        except ValueError:
+            offset, length = 0, -1
+        if len(data) != length:
+            # Crashed while writing the journal: path was never touched
+            os.remove(journal)
+            return False
+        with open(path, 'ab') as file:
+            file.truncate(offset)
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.remove(journal)
+        print(f"🩹 Replayed interrupted write to {path} from {journal}")
+        return True
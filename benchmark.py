@@ -0,0 +1,342 @@
+# benchmark.py
+#
+# Micro-benchmarks and randomized checks, run by hand:
+#
+#   python benchmark.py parser     # check-in reply parser: speed + fuzz check
+#   python benchmark.py handlers   # handlers against a synthetic dataset (see bench_handlers)
+#   python benchmark.py metrics    # cost of recording a metric
+#
+# The bot's modules read their configuration from the environment when they
+# are imported, so they are imported inside the benchmarks, after main() has
+# set it up.
+import argparse
+import csv
+import os
+import random
+import resource
+import statistics
+import tempfile
+import time
+import timeit
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+
+def legacy_parse(user_text: str):
+    """The character-by-character parser handle_checkin_response used before response_parser."""
+    status_emojis = []
+    for char in list(user_text.lower()):
+        if char in ['✅', 'y', '1', 't'] or 'yes' in char:
+            status_emojis.append('✅')
+        elif char in ['❌', 'n', '0', 'f'] or 'no' in char:
+            status_emojis.append('❌')
+    return status_emojis
+
+
+def random_reply(rng: random.Random, max_tokens: int = 12):
+    """A random valid reply and the statuses it should parse to."""
+    from config import POSITIVE_RESPONSES, NEGATIVE_RESPONSES
+    from response_parser import DONE, MISSED, SEPARATORS
+    vocabulary = [(token, DONE) for token in POSITIVE_RESPONSES] + [(token, MISSED) for token in NEGATIVE_RESPONSES]
+    parts, expected = [], []
+    previous = None
+    for _ in range(rng.randint(0, max_tokens)):
+        token, status = rng.choice(vocabulary)
+        token = ''.join(char.upper() if rng.random() < 0.3 else char for char in token)
+        separator = ''.join(rng.choice(SEPARATORS) for _ in range(rng.randint(0, 3)))
+        if not separator and previous and previous[-1].isalpha() and token[0].isalpha():
+            # Two words written back to back would be one unknown word
+            separator = ' '
+        parts.append(separator + token)
+        expected.append(status)
+        previous = token
+    return ''.join(parts), expected
+
+
+def fuzz_parser(iterations: int, seed: int):
+    from response_parser import parse_statuses
+    rng = random.Random(seed)
+    for _ in range(iterations):
+        text, expected = random_reply(rng)
+        result = parse_statuses(text)
+        assert result == expected, f"{text!r}: expected {expected}, got {result}"
+    # Random garbage must be rejected or parsed, never crash
+    alphabet = 'yesnoYN01✅❌ ,.;xz-é️'
+    for _ in range(iterations):
+        parse_statuses(''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 20))))
+    print(f"✅ Fuzz: {iterations} random valid replies parsed correctly, {iterations} random strings survived")
+
+
+def bench_parser(number: int):
+    from response_parser import parse_statuses
+    samples = ["✅✅❌", "yes yes no", "1 1 0", "✅ yes ❌", "Done, skip, done, missed, 1, 0"]
+    for sample in samples:
+        legacy = timeit.timeit(lambda: legacy_parse(sample), number=number) / number * 1e6
+        current = timeit.timeit(lambda: parse_statuses(sample), number=number) / number * 1e6
+        print(f"{sample!r:40} legacy {legacy:6.2f} µs -> {legacy_parse(sample)}")
+        print(f"{'':40} regex  {current:6.2f} µs -> {parse_statuses(sample)}")
+
+
+HABITS = ["workout", "drink water", "read 30 minutes", "meditate", "journal", "stretch", "walk", "no sugar"]
+
+
+class FakeBot:
+    def __init__(self):
+        """
+        In-process stand-in for telegram.Bot: the handlers' replies and the
+        broadcast land here instead of going over the network.
+        """
+        self.sent = 0
+        self.id = 1
+        self.username = "fake_habit_bot"
+        self.defaults = None
+        self.document_bytes = 0
+
+    def send_message(self, chat_id, text, reply_markup=None, **kwargs):
+        self.sent += 1
+        return SimpleNamespace(chat_id=chat_id, text=text, reply_markup=reply_markup)
+
+    def answer_callback_query(self, callback_query_id, text=None, **kwargs):
+        return True
+
+    def edit_message_reply_markup(self, chat_id=None, message_id=None, reply_markup=None, **kwargs):
+        return True
+
+    def send_document(self, chat_id, document, filename=None, **kwargs):
+        # Read it like an upload would
+        for chunk in iter(lambda: document.read(65536), b""):
+            self.document_bytes += len(chunk)
+        self.sent += 1
+        return SimpleNamespace(chat_id=chat_id, document=SimpleNamespace(file_name=filename))
+
+
+def generate_dataset(users: int, rows: int, habits_per_user: int, first_user_id: int):
+    """
+    Write habit_list.csv and habit_tracking.csv in the current directory:
+    users with habits_per_user habits each, and about rows check-ins over the
+    days before yesterday (so every user is still due today).
+    """
+    from config import HABIT_LIST_FILE, HABIT_TRACKING_FILE
+    from habit_store import HABIT_LIST_FIELDS, TRACKING_FIELDS
+
+    habits = HABITS[:habits_per_user]
+    with open(HABIT_LIST_FILE, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HABIT_LIST_FIELDS)
+        for user_id in range(first_user_id, first_user_id + users):
+            writer.writerows((user_id, habit) for habit in habits)
+
+    rng = random.Random(0)
+    statuses = ['✅', '✅', '❌']
+    per_day = users * len(habits)
+    day = date.today() - timedelta(days=2)
+    written = 0
+    with open(HABIT_TRACKING_FILE, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(TRACKING_FIELDS)
+        while written < rows:
+            iso = day.isoformat()
+            batch = min(per_day, rows - written)
+            writer.writerows((iso, first_user_id + i // len(habits), habits[i % len(habits)], rng.choice(statuses))
+                             for i in range(batch))
+            written += batch
+            day -= timedelta(days=1)
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def run_phase(name: str, operation, items, workers: int):
+    """Run operation(item) for every item on a thread pool; print latency percentiles and throughput."""
+    def timed(item):
+        started = time.perf_counter()
+        operation(item)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        latencies = list(pool.map(timed, items))
+    elapsed = time.perf_counter() - started
+    print(f"  {name:26} n={len(latencies):<7} p50 {statistics.median(latencies) * 1000:8.3f} ms  "
+          f"p99 {percentile(latencies, 0.99) * 1000:8.3f} ms  {len(latencies) / elapsed:9.1f} ops/s")
+
+
+def report_memory(label: str):
+    peak = f"tracemalloc peak {tracemalloc.get_traced_memory()[1] / 1e6:.1f} MB, " if tracemalloc.is_tracing() else ""
+    # ru_maxrss is in KiB on Linux
+    print(f"  🧠 {label}: {peak}max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB")
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+
+
+def bench_handlers(args):
+    """
+    Drive start_command, handle_habit_input, handle_checkin_response,
+    handle_checkin_callback, stats_command, export_command and
+    send_daily_checkin against a
+    synthetic dataset in a scratch directory, with a fake in-process Bot and
+    (with --github) a local fake GitHub Contents API.
+    """
+    from telegram import Update
+    from fake_telegram import make_update
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    first_user_id = 100000000
+    started = time.perf_counter()
+    generate_dataset(args.users, args.rows, args.habits, first_user_id)
+    print(f"📦 {args.users} users, {args.rows} check-in rows written in {time.perf_counter() - started:.2f}s "
+          f"({os.getcwd()})")
+
+    github = None
+    if args.github:
+        from fake_github import FakeGitHubAPI
+        github = FakeGitHubAPI()
+        github.start()
+        os.environ.update(GITHUB_API_URL=github.url, GITHUB_REPO_OWNER="bench", GITHUB_REPO_NAME="habits",
+                          GITHUB_TOKEN="fake")
+
+    import csv_handler
+    import handlers
+    import metrics
+
+    started = time.perf_counter()
+    csv_handler.get_store()
+    csv_handler.get_aggregates()
+    print(f"📂 Store and stats loaded in {time.perf_counter() - started:.2f}s ({os.environ['STORAGE_BACKEND']})")
+    report_memory("after load")
+    if github:
+        started = time.perf_counter()
+        csv_handler.init_github_sync()
+        print(f"🔗 Initial GitHub sync in {time.perf_counter() - started:.2f}s: {github.stats()}")
+
+    bot = FakeBot()
+    context = SimpleNamespace(bot=bot, args=[], job=SimpleNamespace(context=bot))
+    habits = HABITS[:args.habits]
+    rng = random.Random(args.seed)
+    ops = min(args.ops, args.users // 2)
+
+    def update(user_id: int, text: str) -> Update:
+        return Update.de_json(make_update(user_id, text), bot)
+
+    def callback(user_id: int, data: str, keyboard) -> Update:
+        message = make_update(user_id, "check-in")["message"]
+        message["reply_markup"] = keyboard.to_dict()
+        return Update.de_json({"update_id": message["message_id"], "callback_query": {
+            "id": str(message["message_id"]), "from": message["from"], "chat_instance": str(user_id),
+            "data": data, "message": message}}, bot)
+
+    def check_in_with_buttons(user_id: int):
+        today = csv_handler.get_user_today(user_id)
+        _, keyboard = handlers.build_daily_checkin(habits, today)
+        handlers.handle_checkin_callback(callback(user_id, keyboard.inline_keyboard[0][0].callback_data, keyboard), context)
+        handlers.handle_checkin_callback(callback(user_id, keyboard.inline_keyboard[-1][1].callback_data, keyboard), context)
+
+    new_users = range(first_user_id + args.users, first_user_id + args.users + ops)
+    existing = rng.sample(range(first_user_id, first_user_id + args.users), 2 * ops)
+    replies = [' '.join(rng.choice('✅❌') for _ in habits) for _ in range(ops)]
+
+    print(f"⏱️  {ops} operations per handler, {args.workers} worker threads")
+    run_phase("start_command", lambda user_id: handlers.start_command(update(user_id, "/start"), context),
+              new_users, args.workers)
+    run_phase("handle_habit_input", lambda user_id: handlers.handle_habit_input(
+        update(user_id, ", ".join(habits)), context), new_users, args.workers)
+    run_phase("handle_checkin_response", lambda i: handlers.handle_checkin_response(
+        update(existing[i], replies[i]), context), range(ops), args.workers)
+    run_phase("check-in buttons (2 taps)", check_in_with_buttons, existing[ops:], args.workers)
+    run_phase("stats_command", lambda user_id: handlers.stats_command(update(user_id, "/stats"), context),
+              rng.sample(range(first_user_id, first_user_id + args.users), ops), args.workers)
+    export_context = SimpleNamespace(bot=bot, args=["json"])
+    run_phase("export_command (json)", lambda user_id: handlers.export_command(update(user_id, "/export json"),
+                                                                                export_context),
+              rng.sample(range(first_user_id, first_user_id + args.users), ops), args.workers)
+    print(f"  {'':26} {bot.document_bytes / 1e6:.2f} MB of gzipped JSON sent")
+    report_memory("handlers")
+
+    sent_before = bot.sent
+    started = time.perf_counter()
+    handlers.send_daily_checkin(context)
+    elapsed = time.perf_counter() - started
+    sent = bot.sent - sent_before
+    print(f"  {'send_daily_checkin':26} {sent} check-ins in {elapsed:.2f}s ({sent / elapsed:.1f} msg/s)")
+    report_memory("broadcast")
+
+    print("📈 Recorded metrics:")
+    print("\n".join(f"  {line}" for line in metrics.summary().splitlines()))
+
+    if github:
+        started = time.perf_counter()
+        csv_handler.shutdown_sync()
+        print(f"🔗 Final GitHub flush in {time.perf_counter() - started:.2f}s; total: {github.stats()}")
+        github.stop()
+
+
+def bench_metrics(number: int):
+    import metrics
+
+    def timed_block():
+        with metrics.timed("habitbot_bench_seconds", op="timed"):
+            pass
+
+    cases = [
+        ("inc", lambda: metrics.inc("habitbot_bench_total", op="inc")),
+        ("observe", lambda: metrics.observe("habitbot_bench_seconds", 0.003, op="observe")),
+        ("timed", timed_block),
+        ("instrumented handler", lambda: handler(None, None)),
+    ]
+    handler = metrics.instrument_handler(lambda update, context: None)
+    baseline = timeit.timeit(lambda: None, number=number) / number * 1e6
+    for name, case in cases:
+        cost = timeit.timeit(case, number=number) / number * 1e6 - baseline
+        print(f"{name:22} {cost:6.2f} µs per call")
+    metrics.reset()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Habit tracker micro-benchmarks")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    parser_cmd = subcommands.add_parser("parser", help="Check-in reply parser micro-benchmark and fuzz check")
+    parser_cmd.add_argument("--number", type=int, default=20000, help="Timing iterations per sample")
+    parser_cmd.add_argument("--fuzz", type=int, default=20000, help="Random replies to check")
+    parser_cmd.add_argument("--seed", type=int, default=int(time.time()))
+    handlers_cmd = subcommands.add_parser("handlers", help="Handlers against a synthetic dataset")
+    handlers_cmd.add_argument("--users", type=int, default=1000)
+    handlers_cmd.add_argument("--rows", type=int, default=100000, help="Check-in rows in the tracking log")
+    handlers_cmd.add_argument("--habits", type=int, default=3, choices=range(1, len(HABITS) + 1),
+                              help="Habits per user")
+    handlers_cmd.add_argument("--ops", type=int, default=500, help="Operations per handler (at most users / 2)")
+    handlers_cmd.add_argument("--workers", type=int, default=8, help="Concurrent handler threads")
+    handlers_cmd.add_argument("--backend", choices=["csv", "sqlite", "binary"], default="csv")
+    handlers_cmd.add_argument("--github", action="store_true", help="Sync with a local fake GitHub API")
+    handlers_cmd.add_argument("--no-tracemalloc", dest="tracemalloc", action="store_false",
+                              help="Skip tracemalloc (faster; only max RSS is reported)")
+    handlers_cmd.add_argument("--seed", type=int, default=0)
+    metrics_cmd = subcommands.add_parser("metrics", help="Overhead of recording metrics")
+    metrics_cmd.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+
+    if args.command == "parser":
+        print(f"Seed {args.seed}")
+        fuzz_parser(args.fuzz, args.seed)
+        bench_parser(args.number)
+    elif args.command == "handlers":
+        os.environ.update(STORAGE_BACKEND=args.backend,
+                          # Measure the bot's own overhead, not Telegram's rate limit
+                          BROADCAST_RATE="1000000")
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory(prefix="habit-bench-") as data_dir:
+            os.chdir(data_dir)
+            try:
+                bench_handlers(args)
+            finally:
+                os.chdir(cwd)
+    elif args.command == "metrics":
+        bench_metrics(args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,629 @@
+# binary_store.py
+#
+# Compact tracking log for STORAGE_BACKEND=binary. Instead of repeating the
+# user id and the habit text (often several bytes of emoji) on every row,
+# habit_tracking.bin holds 12-byte fixed-width records after a 32-byte header:
+#
+#   offset 0  uint16  day number (days since 1970-01-01)
+#          2  uint16  flags (bit 0: completed)
+#          4  uint32  user code
+#          8  uint32  habit code
+#
+# and habit_tracking.bin.dict maps the codes back to user ids and habit names
+# (one "u,<user_id>" or "h,<habit>" CSV row per code, in code order). Both
+# files are append-only, and as in the CSV log the last record for a
+# (day, user, habit) wins.
+#
+# The records file is memory-mapped: lookups unpack single records in place
+# and stats read the log as numpy columns over the mapping, without parsing.
+# habit_tracking.csv stays the interchange format for GitHub sync, as with
+# the SQLite backend. To convert by hand:
+#
+#   python binary_store.py to-binary habit_tracking.csv habit_tracking.bin
+#   python binary_store.py to-csv habit_tracking.bin habit_tracking.csv
+import argparse
+import csv
+import io
+import mmap
+import os
+import struct
+from array import array
+from datetime import date as date_cls
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from atomic_io import append_journaled, atomic_open, locked, recover_journal, replace_file
+from habit_store import HabitStore, TRACKING_FIELDS
+from metrics import timed
+from response_parser import DONE, MISSED
+
+MAGIC = b'HTRK'
+FORMAT_VERSION = 1
+# magic, version, record size, dictionary id, size and mtime_ns of the CSV file last imported or exported
+HEADER = struct.Struct('<4sHH8sQq')
+RECORD = struct.Struct('<HHII')
+# The same layout for numpy.frombuffer (a list, so numpy is only imported when it is used)
+RECORD_DTYPE = [('day', '<u2'), ('flags', '<u2'), ('user', '<u4'), ('habit', '<u4')]
+DONE_FLAG = 1
+STATUS_FLAGS = {DONE: DONE_FLAG, MISSED: 0}
+
+EPOCH_ORDINAL = date_cls(1970, 1, 1).toordinal()
+MAX_DAY = 0xffff  # 2149-06-06
+
+
+@lru_cache(maxsize=4096)
+def to_day(date: str) -> int:
+    """'YYYY-MM-DD' -> days since 1970-01-01 (ValueError outside what a record can hold)."""
+    day = date_cls.fromisoformat(date).toordinal() - EPOCH_ORDINAL
+    if not 0 <= day <= MAX_DAY:
+        raise ValueError(f"date {date} is outside 1970-01-01..2149-06-06")
+    return day
+
+
+def day_bound(date: str) -> int:
+    """Day number of a range bound, clamped just outside what a record can hold (so it matches nothing)."""
+    day = date_cls.fromisoformat(date).toordinal() - EPOCH_ORDINAL
+    return min(max(day, -1), MAX_DAY + 1)
+
+
+@lru_cache(maxsize=4096)
+def from_day(day: int) -> str:
+    return date_cls.fromordinal(day + EPOCH_ORDINAL).isoformat()
+
+
+def flags_of(status: str) -> int:
+    flags = STATUS_FLAGS.get(status)
+    if flags is None:
+        raise ValueError(f"status {status!r} is neither {DONE} nor {MISSED}")
+    return flags
+
+
+def status_of(flags: int) -> str:
+    return DONE if flags & DONE_FLAG else MISSED
+
+
+def file_signature(path: str) -> Tuple[int, int]:
+    """(size, mtime_ns) of path, or (0, 0) if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return 0, 0
+    return st.st_size, st.st_mtime_ns
+
+
+class TrackingLog:
+    def __init__(self, path: str):
+        """
+        A binary tracking log and its dictionary. Not thread-safe: the owner
+        (BinaryHabitStore) serializes access.
+
+        Args:
+            path: Path to the records file; the dictionary is path + '.dict'
+        """
+        self.path = path
+        self.dict_path = path + '.dict'
+        self.users: List[str] = []
+        self.habits: List[str] = []
+        self.user_codes: Dict[str, int] = {}
+        self.habit_codes: Dict[str, int] = {}
+        self.count = 0
+        self.csv_signature = (0, 0)
+        self._map = None
+        self._mapped = 0
+
+    def open(self):
+        """Read the dictionary and map the records. Raises ValueError if the two files don't belong together."""
+        recover_journal(self.dict_path)
+        recover_journal(self.path)
+        with open(self.path, 'rb') as file:
+            header = file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{self.path} is truncated")
+        magic, version, record_size, dictionary_id, csv_size, csv_mtime = HEADER.unpack(header)
+        if magic != MAGIC or version != FORMAT_VERSION or record_size != RECORD.size:
+            raise ValueError(f"{self.path} is not a version {FORMAT_VERSION} tracking log")
+        self.csv_signature = (csv_size, csv_mtime)
+
+        self.users, self.habits, self.user_codes, self.habit_codes = [], [], {}, {}
+        with open(self.dict_path, 'r', newline='', encoding='utf-8') as file:
+            rows = csv.reader(file)
+            if next(rows, None) != ['id', dictionary_id.hex()]:
+                raise ValueError(f"{self.dict_path} does not belong to {self.path}")
+            for kind, value in rows:
+                if kind == 'u':
+                    self.user_codes[value] = len(self.users)
+                    self.users.append(value)
+                else:
+                    self.habit_codes[value] = len(self.habits)
+                    self.habits.append(value)
+
+        size = os.path.getsize(self.path) - HEADER.size
+        self.count = size // RECORD.size
+        if size % RECORD.size:
+            # A torn record from a copy cut short (appends themselves are journaled)
+            with open(self.path, 'r+b') as file:
+                file.truncate(HEADER.size + self.count * RECORD.size)
+        self._remap()
+
+    def _remap(self):
+        # Earlier mappings are left to the garbage collector: iterators may still be reading them
+        with open(self.path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mapped = (len(self._map) - HEADER.size) // RECORD.size
+
+    def record(self, index: int) -> Tuple[int, int, int, int]:
+        """(day, flags, user code, habit code) of one record, unpacked in place."""
+        if index >= self._mapped:
+            self._remap()
+        return RECORD.unpack_from(self._map, HEADER.size + index * RECORD.size)
+
+    def iter_records(self, start: int = 0) -> Iterator[Tuple[int, int, int, int]]:
+        """(day, flags, user code, habit code) for the records from start on, read straight from the mapping."""
+        if self._mapped < self.count:
+            self._remap()
+        view = memoryview(self._map)[HEADER.size + start * RECORD.size:HEADER.size + self.count * RECORD.size]
+        return RECORD.iter_unpack(view)
+
+    def columns(self):
+        """All records as a numpy structured array over the mapping (no copy)."""
+        import numpy as np
+        if self._mapped < self.count:
+            self._remap()
+        return np.frombuffer(self._map, dtype=RECORD_DTYPE, count=self.count, offset=HEADER.size)
+
+    def append(self, rows: List[tuple]) -> Tuple[int, List[tuple]]:
+        """
+        Append (date, user_id, habit, status) rows, adding unseen users and
+        habits to the dictionary first.
+
+        Returns:
+            (number of the first new record, [(day, flags, user code, habit code), ...])
+
+        Raises:
+            ValueError: A status other than DONE/MISSED or an unsupported date
+                (nothing is written)
+        """
+        encoded = [(to_day(date), flags_of(status), user_id, habit) for date, user_id, habit, status in rows]
+        added = []
+        records = []
+        for day, flags, user_id, habit in encoded:
+            user = self.user_codes.get(user_id)
+            if user is None:
+                user = self.user_codes[user_id] = len(self.users)
+                self.users.append(user_id)
+                added.append(('u', user_id))
+            code = self.habit_codes.get(habit)
+            if code is None:
+                code = self.habit_codes[habit] = len(self.habits)
+                self.habits.append(habit)
+                added.append(('h', habit))
+            records.append((day, flags, user, code))
+        if added:
+            text = io.StringIO()
+            csv.writer(text).writerows(added)
+            try:
+                append_journaled(self.dict_path, text.getvalue().encode('utf-8'))
+            except BaseException:
+                self._forget(added)
+                raise
+        append_journaled(self.path, b''.join(RECORD.pack(*record) for record in records))
+        first = self.count
+        self.count += len(records)
+        return first, records
+
+    def _forget(self, added: List[tuple]):
+        """Undo in-memory dictionary entries whose append failed."""
+        for kind, value in reversed(added):
+            if kind == 'u':
+                del self.user_codes[self.users.pop()]
+            else:
+                del self.habit_codes[self.habits.pop()]
+
+    def set_csv_signature(self, signature: Tuple[int, int]):
+        """Record which version of the CSV file matches the log."""
+        fd = os.open(self.path, os.O_WRONLY)
+        try:
+            os.pwrite(fd, struct.pack('<Qq', *signature), 16)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self.csv_signature = tuple(signature)
+
+
+def write_log(path: str, rows: Iterable[tuple], csv_signature: Tuple[int, int] = (0, 0)) -> int:
+    """
+    Write a new tracking log from (date, user_id, habit, status) rows,
+    atomically replacing path and its dictionary. Rows with another status
+    or an unsupported date are skipped.
+
+    Returns:
+        The number of records written
+    """
+    users, habits = {}, {}
+    count = skipped = 0
+    dictionary_id = os.urandom(8)
+    with atomic_open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, RECORD.size, dictionary_id, *csv_signature))
+        buffer = bytearray()
+        for date, user_id, habit, status in rows:
+            try:
+                day = to_day(date)
+                flags = flags_of(status)
+            except ValueError:
+                skipped += 1
+                continue
+            user = users.setdefault(user_id, len(users))
+            code = habits.setdefault(habit, len(habits))
+            buffer += RECORD.pack(day, flags, user, code)
+            count += 1
+            if len(buffer) >= 1 << 20:
+                file.write(buffer)
+                buffer.clear()
+        file.write(buffer)
+        # Replaced before the records file: a crash in between leaves a pair whose ids don't match
+        with atomic_open(path + '.dict', 'w', newline='', encoding='utf-8') as dictionary:
+            writer = csv.writer(dictionary)
+            writer.writerow(['id', dictionary_id.hex()])
+            writer.writerows(('u', user_id) for user_id in users)
+            writer.writerows(('h', habit) for habit in habits)
+    if skipped:
+        print(f"⚠️  Skipped {skipped} rows with an unknown status or date while writing {path}")
+    return count
+
+
+def csv_to_binary(csv_path: str, binary_path: str) -> int:
+    """Convert a tracking CSV file into a binary log; returns the number of records."""
+    signature = file_signature(csv_path)
+    if not os.path.exists(csv_path):
+        return write_log(binary_path, ())
+    with open(csv_path, 'r', newline='', encoding='utf-8') as file:
+        rows = ((row['date'], row['user_id'], row['habit'], row['status']) for row in csv.DictReader(file))
+        return write_log(binary_path, rows, signature)
+
+
+def import_csv_changes(log: TrackingLog, csv_path: str) -> Tuple[int, bool]:
+    """
+    Append the rows of a tracking CSV file that differ from an open log, so
+    they win over its records; records missing from the file are kept (a
+    check-in written after the file was exported must survive importing it
+    again). Rows with another status or an unsupported date are skipped.
+
+    Returns:
+        (number of rows appended, whether the file now holds everything the log holds)
+    """
+    latest = {}
+    for day, flags, user, habit in log.iter_records():
+        latest[day, user, habit] = flags
+    imported = {}
+    skipped = 0
+    with open(csv_path, 'r', newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            try:
+                day, flags = to_day(row['date']), flags_of(row['status'])
+            except ValueError:
+                skipped += 1
+                continue
+            # Later rows win, like in the log
+            imported[day, row['user_id'], row['habit']] = flags
+    if skipped:
+        print(f"⚠️  Skipped {skipped} rows with an unknown status or date in {csv_path}")
+
+    changed = []
+    covered = set()
+    for (day, user_id, habit), flags in imported.items():
+        key = (day, log.user_codes.get(user_id), log.habit_codes.get(habit))
+        covered.add(key)
+        if latest.get(key) != flags:
+            changed.append((from_day(day), user_id, habit, status_of(flags)))
+    if changed:
+        log.append(changed)
+    return len(changed), covered.issuperset(latest)
+
+
+def iter_log_rows(log: TrackingLog) -> Iterator[tuple]:
+    """(date, user_id, habit, status) for each check-in of an open log, superseded records dropped."""
+    latest = {}
+    for day, flags, user, habit in log.iter_records():
+        latest[day, user, habit] = flags
+    for (day, user, habit), flags in latest.items():
+        yield from_day(day), log.users[user], log.habits[habit], status_of(flags)
+
+
+def binary_to_csv(binary_path: str, csv_path: str) -> int:
+    """Convert a binary log into a tracking CSV file; returns the number of rows."""
+    log = TrackingLog(binary_path)
+    log.open()
+    count = 0
+    with atomic_open(csv_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(TRACKING_FIELDS)
+        for row in iter_log_rows(log):
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+class BinaryHabitStore(HabitStore):
+    def __init__(self, binary_file: str, habit_list_file: str, tracking_file: str,
+                 settings_file: Optional[str] = None, state_file: Optional[str] = None):
+        """
+        HabitStore keeping check-ins in a binary tracking log (see the top of
+        this module); habits, settings and conversation state stay in CSV.
+
+        habit_tracking.csv is the interchange format, as with the SQLite
+        backend: load() imports it when it changed since the last import or
+        export (e.g. after a pull from GitHub) and export_csv() writes it back
+        out before a push.
+
+        The in-memory index maps (user, day) to record numbers only; statuses
+        and habits are read from the mapped log on lookup.
+
+        Args:
+            binary_file: Path to habit_tracking.bin
+            habit_list_file: Path to habit_list.csv
+            tracking_file: Path to habit_tracking.csv
+            settings_file: Path to user_settings.csv (optional)
+            state_file: Path to the conversation state CSV (optional)
+        """
+        super().__init__(habit_list_file, tracking_file, settings_file, state_file)
+        self.binary_file = binary_file
+        self.log = TrackingLog(binary_file)
+        # user code -> {day: record numbers in log order}
+        self._records: Dict[int, Dict[int, array]] = {}
+        # habit_tracking.csv holds exactly what the log holds
+        self._csv_current = False
+
+    def _load_tracking(self):
+        self._records = {}
+        csv_signature = file_signature(self.tracking_file)
+        log = TrackingLog(self.binary_file)
+        complete = True
+        with locked(self.binary_file):
+            try:
+                log.open()
+                rebuild = False
+            except FileNotFoundError:
+                rebuild = True
+            except ValueError as e:
+                print(f"⚠️  {e}; rebuilding it from {self.tracking_file}")
+                rebuild = True
+            if rebuild:
+                # Only a missing or unreadable log is replaced by the CSV file
+                with timed("habitbot_file_read_seconds", file=os.path.basename(self.tracking_file)):
+                    count = csv_to_binary(self.tracking_file, self.binary_file)
+                print(f"📥 Imported {count} rows from {self.tracking_file} into {self.binary_file}")
+                log = TrackingLog(self.binary_file)
+                log.open()
+            elif csv_signature != (0, 0) and csv_signature != log.csv_signature:
+                with timed("habitbot_file_read_seconds", file=os.path.basename(self.tracking_file)):
+                    count, complete = import_csv_changes(log, self.tracking_file)
+                log.set_csv_signature(csv_signature)
+                print(f"📥 Imported {count} changed rows from {self.tracking_file} into {self.binary_file}")
+        self.log = log
+        self._csv_current = complete and csv_signature != (0, 0) and csv_signature == log.csv_signature
+        with timed("habitbot_file_read_seconds", file=os.path.basename(self.binary_file)):
+            for index, (day, _, user, habit) in enumerate(log.iter_records()):
+                if self._index_record(index, day, user, habit):
+                    self._superseded += 1
+
+    def _index_record(self, index: int, day: int, user: int, habit: int) -> bool:
+        """Index one record; returns True if it replaced an earlier one."""
+        days = self._records.get(user)
+        if days is None:
+            days = self._records[user] = {}
+        records = days.get(day)
+        if records is None:
+            days[day] = array('I', (index,))
+            self._live += 1
+            return False
+        replaced = any(self.log.record(i)[3] == habit for i in records)
+        records.append(index)
+        if not replaced:
+            self._live += 1
+        return replaced
+
+    def _resolve(self, records) -> Dict[int, int]:
+        """{habit code: flags} of one (user, day), later records winning."""
+        statuses = {}
+        for index in records:
+            _, flags, _, habit = self.log.record(index)
+            statuses[habit] = flags
+        return statuses
+
+    def _day_records(self, user_id, date: str):
+        user = self.log.user_codes.get(str(user_id))
+        if user is None:
+            return None
+        try:
+            day = to_day(date)
+        except ValueError:
+            # A date the log can't hold has no check-ins, as in the other backends
+            return None
+        return self._records.get(user, {}).get(day)
+
+    def export_csv(self):
+        """Write habit_tracking.csv from the log (used before pushing it to GitHub)."""
+        with self._lock:
+            if self._csv_current and file_signature(self.tracking_file) == self.log.csv_signature:
+                return
+            with atomic_open(self.tracking_file, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(TRACKING_FIELDS)
+                writer.writerows(self.iter_checkins())
+            with locked(self.binary_file):
+                self.log.set_csv_signature(file_signature(self.tracking_file))
+            self._csv_current = True
+
+    def tracking_signature(self) -> Optional[list]:
+        """Value that changes whenever the tracking data changes (size and mtime of the log)."""
+        if not os.path.exists(self.binary_file):
+            return None
+        return ['binary', *file_signature(self.binary_file)]
+
+    # Tracking
+
+    def has_checkin(self, user_id, date: str) -> bool:
+        with self._lock:
+            return self._day_records(user_id, date) is not None
+
+    def get_checkins(self, user_id, date: str) -> Dict[str, str]:
+        with self._lock:
+            records = self._day_records(user_id, date)
+            if records is None:
+                return {}
+            return {self.log.habits[habit]: status_of(flags) for habit, flags in self._resolve(records).items()}
+
+    def get_status(self, date: str, user_id, habit: str) -> Optional[str]:
+        with self._lock:
+            records = self._day_records(user_id, date)
+            code = self.log.habit_codes.get(habit)
+            if records is None or code is None:
+                return None
+            flags = self._resolve(records).get(code)
+            return None if flags is None else status_of(flags)
+
+    def upsert_rows(self, rows):
+        """Insert or update (date, user_id, habit, status) rows in one append."""
+        rows = [(date, str(user_id), habit, status) for date, user_id, habit, status in rows]
+        if not rows:
+            return
+        with self._lock:
+            with locked(self.binary_file):
+                first, records = self.log.append(rows)
+            self._csv_current = False
+            for index, (day, _, user, habit) in enumerate(records, first):
+                if self._index_record(index, day, user, habit):
+                    self._superseded += 1
+            self._maybe_compact()
+
+    def habit_history(self, user_id, habit: str) -> List[tuple]:
+        with self._lock:
+            user = self.log.user_codes.get(str(user_id))
+            code = self.log.habit_codes.get(habit)
+            if user is None or code is None:
+                return []
+            history = []
+            for day, records in sorted(self._records.get(user, {}).items()):
+                flags = self._resolve(records).get(code)
+                if flags is not None:
+                    history.append((from_day(day), status_of(flags)))
+            return history
+
+    def iter_checkins(self):
+        """Yield (date, user_id, habit, status) for every stored check-in."""
+        with self._lock:
+            users = list(self._records)
+        for user in users:
+            # One user at a time, so a long scan doesn't hold the lock
+            with self._lock:
+                user_id, habits = self.log.users[user], self.log.habits
+                days = [(day, self._resolve(records)) for day, records in self._records[user].items()]
+            for day, statuses in days:
+                date = from_day(day)
+                for habit, flags in statuses.items():
+                    yield date, user_id, habits[habit], status_of(flags)
+
+    def iter_user_checkins(self, user_id, start: Optional[str] = None, end: Optional[str] = None):
+        with self._lock:
+            user = self.log.user_codes.get(str(user_id))
+            if user is None:
+                return
+            first = day_bound(start) if start else 0
+            last = day_bound(end) if end else MAX_DAY
+            days = sorted(day for day in self._records.get(user, {}) if first <= day <= last)
+        for day in days:
+            with self._lock:
+                statuses = [(self.log.habits[habit], flags)
+                            for habit, flags in self._resolve(self._records[user][day]).items()]
+            date = from_day(day)
+            for habit, flags in statuses:
+                yield date, habit, status_of(flags)
+
+    def tracking_columns(self, start: Optional[str] = None, end: Optional[str] = None) -> tuple:
+        """
+        The log as dictionary-encoded columns for StatsEngine.load_columns.
+
+        Args:
+            start: First date to include (YYYY-MM-DD), unbounded if None
+            end: Last date to include (YYYY-MM-DD), unbounded if None
+
+        Returns:
+            (day, user, habit, done, users, habits): numpy columns in log
+            order (views of the mapped file unless a date range is given) and
+            the lists their user and habit codes index
+        """
+        with self._lock:
+            records = self.log.columns()
+            if start or end:
+                day = records['day']
+                records = records[(day >= (day_bound(start) if start else 0)) & (day <= (day_bound(end) if end else MAX_DAY))]
+            done = (records['flags'] & DONE_FLAG).astype(bool)
+            return records['day'], records['user'], records['habit'], done, list(self.log.users), list(self.log.habits)
+
+    # Compaction
+
+    def compact(self):
+        """
+        Rewrite the log without superseded records.
+
+        Codes and the dictionary are kept, so only record numbers change; the
+        rewrite holds the store lock (it is a sequential write of 12 bytes
+        per live check-in).
+        """
+        try:
+            with self._lock, locked(self.binary_file):
+                with open(self.binary_file, 'rb') as file:
+                    header = file.read(HEADER.size)
+                tmp_path = self.binary_file + '.compact'
+                records = {}
+                index = 0
+                with open(tmp_path, 'wb') as file:
+                    file.write(header)
+                    buffer = bytearray()
+                    for user, days in self._records.items():
+                        compacted = records[user] = {}
+                        for day, numbers in days.items():
+                            statuses = self._resolve(numbers)
+                            compacted[day] = array('I', range(index, index + len(statuses)))
+                            index += len(statuses)
+                            for habit, flags in statuses.items():
+                                buffer += RECORD.pack(day, flags, user, habit)
+                        if len(buffer) >= 1 << 20:
+                            file.write(buffer)
+                            buffer.clear()
+                    file.write(buffer)
+                replace_file(tmp_path, self.binary_file)
+                superseded = self._superseded
+                self.log.open()
+                self._records = records
+                self._superseded = 0
+                self._live = index
+            print(f"🧹 Compacted {self.binary_file}: dropped {superseded} superseded records")
+        except Exception as e:
+            print(f"❌ Exception compacting {self.binary_file}: {e}")
+        finally:
+            self._compacting = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert habit_tracking.csv to and from the binary tracking log")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    to_binary = subcommands.add_parser("to-binary", help="CSV -> binary log (+ .dict)")
+    to_binary.add_argument("csv_path")
+    to_binary.add_argument("binary_path")
+    to_csv = subcommands.add_parser("to-csv", help="Binary log -> CSV, superseded records dropped")
+    to_csv.add_argument("binary_path")
+    to_csv.add_argument("csv_path")
+    args = parser.parse_args()
+
+    if args.command == "to-binary":
+        count = csv_to_binary(args.csv_path, args.binary_path)
+        print(f"✅ Wrote {count} records to {args.binary_path} ({os.path.getsize(args.binary_path)} bytes, "
+              f"from {os.path.getsize(args.csv_path) if os.path.exists(args.csv_path) else 0} bytes of CSV)")
+    else:
+        count = binary_to_csv(args.binary_path, args.csv_path)
+        print(f"✅ Wrote {count} rows to {args.csv_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# broadcast.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional, Tuple
+
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut, Unauthorized
+
+from metrics import inc, observe
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Thread-safe token bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size (default: one second's worth)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for the given time (e.g. after a 429)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._paused_until:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+                else:
+                    self._updated = self._paused_until
+                    wait = self._paused_until - now
+            time.sleep(wait)
+
+
+@dataclass
+class BroadcastReport:
+    total: int = 0
+    sent: int = 0
+    failed: int = 0
+    retried: int = 0
+    # Counted as sent: no answer in time, but the message has usually gone out
+    timed_out: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (f"{self.sent}/{self.total} sent ({self.timed_out} unconfirmed), {self.failed} failed, {self.retried} retried "
+                f"in {self.elapsed:.1f}s ({self.throughput:.1f} msg/s)")
+
+
+class Broadcaster:
+    def __init__(self, bot, workers: int = 8, rate: float = 25.0, max_retries: int = 3):
+        """
+        Send many messages through a bounded worker pool under a global rate limit.
+
+        Args:
+            bot: telegram.Bot (or anything with a compatible send_message)
+            workers: Number of concurrent senders
+            rate: Messages per second across all workers
+            max_retries: Attempts per message after 429s or network errors (not timeouts)
+        """
+        self.bot = bot
+        self.workers = workers
+        self.bucket = TokenBucket(rate)
+        self.max_retries = max_retries
+
+    def _send(self, chat_id, text: str, reply_markup: Any, report: BroadcastReport, lock: threading.Lock):
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            # Time the API call only, not the wait for the rate limit
+            started = time.perf_counter()
+            try:
+                self.bot.send_message(chat_id=chat_id, text=text, reply_markup=reply_markup)
+                observe("habitbot_broadcast_send_seconds", time.perf_counter() - started)
+                with lock:
+                    report.sent += 1
+                inc("habitbot_broadcast_messages_total", result="sent")
+                return
+            except RetryAfter as e:
+                # Telegram asks the whole bot to back off, not just this chat
+                self.bucket.pause(e.retry_after)
+            except (Unauthorized, BadRequest) as e:
+                # Blocked the bot / deleted account: retrying won't help
+                print(f"Failed to send message to user {chat_id}: {e}")
+                break
+            except TimedOut:
+                # Usually delivered even so: a retry would send the check-in (and its keyboard) twice
+                with lock:
+                    report.sent += 1
+                    report.timed_out += 1
+                inc("habitbot_broadcast_messages_total", result="timed_out")
+                return
+            except NetworkError as e:
+                time.sleep(min(30, 2 ** attempt))
+            except Exception as e:
+                print(f"Failed to send message to user {chat_id}: {e}")
+                break
+            if attempt < self.max_retries:
+                with lock:
+                    report.retried += 1
+                inc("habitbot_broadcast_retries_total")
+        with lock:
+            report.failed += 1
+        inc("habitbot_broadcast_messages_total", result="failed")
+
+    def send_all(self, messages: Iterable[Tuple[Any, str, Any]]) -> BroadcastReport:
+        """
+        Send (chat_id, text, reply_markup) messages and wait for all of them.
+
+        Returns:
+            BroadcastReport with counts and throughput for the run
+        """
+        messages = list(messages)
+        report = BroadcastReport(total=len(messages))
+        lock = threading.Lock()
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="broadcast") as pool:
+            for chat_id, text, reply_markup in messages:
+                pool.submit(self._send, chat_id, text, reply_markup, report, lock)
+        report.elapsed = time.monotonic() - started
+        return report
@@ -1,11 +1,72 @@
 # config.py
 import os
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
+# Bot API base URL (default: Telegram's); point it at a local fake API for testing
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")
+
+# How updates arrive: "polling" (getUpdates) or "webhook" (HTTP server, see webhook.py)
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", os.getenv("PORT", "8443")))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # public base URL; registered with Telegram at startup if set
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "8"))
+
+# Sharded mode (see router.py): this process owns the users with shard_for(user_id, SHARD_COUNT) == SHARD_INDEX
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+SHARD_INDEX = int(os.getenv("SHARD_INDEX", "0"))
+
+# Directory for the data files below (default: the working directory); each shard gets its own
+DATA_DIR = os.getenv("DATA_DIR", "")
 
 # Constants
-DAILY_CHECKIN_TIME = "08:00"  # 8:00 AM
-HABIT_LIST_FILE = "habit_list.csv"
-HABIT_TRACKING_FILE = "habit_tracking.csv"
+DAILY_CHECKIN_TIME = "08:00"  # 8:00 AM, default for users who haven't picked a time
+DEFAULT_TIMEZONE = "America/Toronto"
+HABIT_LIST_FILE = os.path.join(DATA_DIR, "habit_list.csv")
+HABIT_TRACKING_FILE = os.path.join(DATA_DIR, "habit_tracking.csv")
+USER_SETTINGS_FILE = os.path.join(DATA_DIR, "user_settings.csv")
+STATS_SNAPSHOT_FILE = os.path.join(DATA_DIR, "habit_stats.json")  # derived from habit_tracking.csv, safe to delete
+CONVERSATION_STATE_FILE = os.path.join(DATA_DIR, "conversation_state.csv")
+HABIT_ALIASES_FILE = os.path.join(DATA_DIR, "habit_aliases.csv")  # pinned habit ids (renames), see habit_ids.py
+
+# Conversation state (e.g. waiting for a habit list after /start): lifetime,
+# maximum number of users with a state, and whether it survives restarts
+CONVERSATION_STATE_TTL = float(os.getenv("CONVERSATION_STATE_TTL", "86400"))
+CONVERSATION_STATE_MAX = int(os.getenv("CONVERSATION_STATE_MAX", "10000"))
+PERSIST_CONVERSATION_STATE = os.getenv("PERSIST_CONVERSATION_STATE", "1") == "1"
+
+# Storage backend: "csv" (in-memory indexes over the CSV files), "sqlite" (SQLite
+# database in WAL mode) or "binary" (check-ins in a memory-mapped fixed-width log,
+# see binary_store.py); the last two import/export the CSV files for GitHub sync
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "csv")
+SQLITE_DB_FILE = os.getenv("SQLITE_DB_FILE", os.path.join(DATA_DIR, "habits.db"))
+BINARY_TRACKING_FILE = os.getenv("BINARY_TRACKING_FILE", os.path.join(DATA_DIR, "habit_tracking.bin"))
+
+# Handler threads: updates are processed concurrently by this many dispatcher workers
+DISPATCHER_WORKERS = int(os.getenv("DISPATCHER_WORKERS", "8"))
+
+# GitHub sync: seconds to wait after a write so bursts become one commit
+SYNC_DEBOUNCE_SECONDS = float(os.getenv("SYNC_DEBOUNCE_SECONDS", "10"))
+# Initial GitHub pull at startup: "background" serves from the local files meanwhile
+# (writes wait up to HYDRATION_WRITE_TIMEOUT seconds for it), "blocking" waits before starting
+STARTUP_SYNC = os.getenv("STARTUP_SYNC", "background")
+HYDRATION_WRITE_TIMEOUT = float(os.getenv("HYDRATION_WRITE_TIMEOUT", "30"))
+
+# Daily broadcast: concurrent senders and messages per second (Telegram allows ~30/s)
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "8"))
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "25"))
+
+# Metrics: Prometheus text endpoint at http://METRICS_LISTEN:METRICS_PORT/metrics (0 = off),
+# and the Telegram user IDs allowed to run /metrics (comma-separated)
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+ADMIN_USER_IDS = {int(user_id) for user_id in os.getenv("ADMIN_USER_IDS", "").split(",") if user_id.strip()}
+
+# /export: compressed documents are built in memory up to EXPORT_SPOOL_BYTES (then in a
+# temporary file) and split into parts of about EXPORT_PART_BYTES (Telegram bots may send up to 50 MB)
+EXPORT_SPOOL_BYTES = int(os.getenv("EXPORT_SPOOL_BYTES", str(1024 * 1024)))
+EXPORT_PART_BYTES = int(os.getenv("EXPORT_PART_BYTES", str(45 * 1024 * 1024)))
 
 # Response patterns
 POSITIVE_RESPONSES = ["✅", "yes", "y", "true", "1", "done", "complete"]
@@ -1,17 +1,61 @@
 # csv_handler.py
-import csv
-import os
+import threading
+import time
 from datetime import datetime
-from config import HABIT_LIST_FILE, HABIT_TRACKING_FILE
-from github_synch import create_github_sync, GitHubCSVSync
+import pytz
+from config import (HABIT_LIST_FILE, HABIT_TRACKING_FILE, USER_SETTINGS_FILE, STATS_SNAPSHOT_FILE,
+                    CONVERSATION_STATE_FILE, HABIT_ALIASES_FILE, CONVERSATION_STATE_TTL, CONVERSATION_STATE_MAX,
+                    PERSIST_CONVERSATION_STATE, STORAGE_BACKEND, SQLITE_DB_FILE, BINARY_TRACKING_FILE,
+                    SYNC_DEBOUNCE_SECONDS,
+                    DEFAULT_TIMEZONE, DAILY_CHECKIN_TIME, HYDRATION_WRITE_TIMEOUT)
+from aggregates import HabitAggregates
+from github_synch import GitHubCSVSync, GitHubShardedCSVSync
+from habit_ids import HabitIds
+from habit_store import HabitStore
 
 # Global GitHub sync instances
 github_sync_habits = None
 github_sync_tracking = None
+github_sync_settings = None
+github_sync_aliases = None
 
-def init_github_sync():
-    """Initialize GitHub synchronization for both CSV files if environment variables are set."""
-    global github_sync_habits, github_sync_tracking
+# Background pusher shared by all sync instances
+sync_worker = None
+
+# Write barrier: cleared while the initial GitHub pull is merged in the background
+# (see init_github_sync), so local writes can't race the rows it applies
+_hydrated = threading.Event()
+_hydrated.set()
+
+# Process-wide indexed view of the CSV files (see get_store)
+_store = None
+_store_lock = threading.Lock()
+
+# Stable habit ids, which the stats are grouped by (see get_habit_ids)
+_habit_ids = None
+
+# Columnar copy of the tracking log for rollups (see get_stats_engine)
+_stats_engine = None
+
+# Materialized per-(user, habit id) counters for /stats (see get_aggregates)
+_aggregates = None
+
+# Per-user conversation state (see get_state_store)
+_state_store = None
+
+# Held while a check-in is written and folded into the counters, so a
+# snapshot never sees the log and the counters out of step
+_checkin_lock = threading.RLock()
+
+def init_github_sync(background=False):
+    """
+    Initialize GitHub synchronization for the CSV files if environment variables are set.
+    
+    The initial pull merges the remote files into the local data. With
+    background=True it runs on a separate thread, so the bot serves from the
+    local files right away; writes wait for it to finish (see _await_hydration).
+    """
+    global github_sync_habits, github_sync_tracking, github_sync_settings, github_sync_aliases, sync_worker
     
     # Get GitHub configuration
     from github_synch import get_github_config
@@ -27,194 +71,420 @@ def init_github_sync():
         repo_name=config["repo_name"],
         file_path=config["file_path"],
         github_token=config["github_token"],
-        branch=config["branch"]
+        branch=config["branch"],
+        api_url=config["api_url"],
+        key_fields=("user_id", "habit"),
+        apply_changes=_apply_remote_habits
     )
     
     # Create sync instance for habit_tracking.csv
-    tracking_file_path = os.getenv("GITHUB_FILE_PATH_TRACKING", "data/habit_tracking.csv")
-    github_sync_tracking = GitHubCSVSync(
+    if config["tracking_layout"] == "monthly":
+        github_sync_tracking = GitHubShardedCSVSync(
+            repo_owner=config["repo_owner"],
+            repo_name=config["repo_name"],
+            shard_dir=config["tracking_shard_dir"],
+            github_token=config["github_token"],
+            branch=config["branch"],
+            apply_changes=_apply_remote_tracking,
+            api_url=config["api_url"]
+        )
+    else:
+        github_sync_tracking = GitHubCSVSync(
+            repo_owner=config["repo_owner"],
+            repo_name=config["repo_name"],
+            file_path=config["tracking_file_path"],
+            github_token=config["github_token"],
+            branch=config["branch"],
+            api_url=config["api_url"],
+            key_fields=("date", "user_id", "habit"),
+            apply_changes=_apply_remote_tracking
+        )
+    
+    # Create sync instance for user_settings.csv
+    github_sync_settings = GitHubCSVSync(
         repo_owner=config["repo_owner"],
         repo_name=config["repo_name"],
-        file_path=tracking_file_path,
+        file_path=config["settings_file_path"],
         github_token=config["github_token"],
-        branch=config["branch"]
+        branch=config["branch"],
+        api_url=config["api_url"],
+        key_fields=("user_id",),
+        apply_changes=_apply_remote_settings
     )
     
-    print("🔗 GitHub synchronization enabled for both CSV files")
+    # Create sync instance for habit_aliases.csv (merged rows are written to the file, see sync_aliases_from_github)
+    github_sync_aliases = GitHubCSVSync(
+        repo_owner=config["repo_owner"],
+        repo_name=config["repo_name"],
+        file_path=config["aliases_file_path"],
+        github_token=config["github_token"],
+        branch=config["branch"],
+        api_url=config["api_url"],
+        key_fields=("user_id", "name")
+    )
     
-    # Sync both files from GitHub on startup
-    github_sync_habits.sync_from_github(HABIT_LIST_FILE)
-    github_sync_tracking.sync_from_github(HABIT_TRACKING_FILE)
+    print("🔗 GitHub synchronization enabled for all CSV files")
+    
+    # Later writes are pushed in the background
+    from sync_worker import GitHubSyncWorker
+    sync_worker = GitHubSyncWorker(debounce_seconds=SYNC_DEBOUNCE_SECONDS)
+    sync_worker.start()
+    
+    if background:
+        _hydrated.clear()
+        threading.Thread(target=_hydrate, name="github-hydrate", daemon=True).start()
+    else:
+        _hydrate()
+
+def _hydrate():
+    """Merge all files from GitHub, open the write barrier, then push the rows only we have."""
+    started = time.perf_counter()
+    try:
+        sync_all_from_github()
+    except Exception as e:
+        print(f"❌ Initial GitHub sync failed, serving local data: {e}")
+    finally:
+        _hydrated.set()
+    print(f"🔗 Initial GitHub sync finished in {time.perf_counter() - started:.2f}s")
+    _schedule_sync(github_sync_habits, HABIT_LIST_FILE)
+    _schedule_sync(github_sync_tracking, HABIT_TRACKING_FILE)
+    _schedule_sync(github_sync_settings, USER_SETTINGS_FILE)
+    _schedule_sync(github_sync_aliases, HABIT_ALIASES_FILE)
+
+def _await_hydration():
+    """Hold a write until the initial GitHub pull has been applied (at most HYDRATION_WRITE_TIMEOUT seconds)."""
+    if not _hydrated.is_set() and not _hydrated.wait(HYDRATION_WRITE_TIMEOUT):
+        # Still safe: the next push merges this write with the remote rows
+        print(f"⚠️  Initial GitHub sync still running after {HYDRATION_WRITE_TIMEOUT:g}s, writing anyway")
+
+def wait_for_hydration(timeout=None):
+    """Block until the initial GitHub pull is done; False on timeout."""
+    return _hydrated.wait(timeout)
+
+def _schedule_sync(sync, local_file_path):
+    """Queue a background push of local_file_path (no-op if sync is disabled)."""
+    if sync and sync_worker:
+        sync_worker.mark_dirty(sync, local_file_path, prepare=get_store().export_csv)
+
+def _push_now(sync, local_file_path):
+    """Push local_file_path immediately, through the worker when it is running."""
+    if not sync:
+        return False
+    if sync_worker:
+        sync_worker.mark_dirty(sync, local_file_path, prepare=get_store().export_csv)
+        return sync_worker.flush()
+    get_store().export_csv()
+    return sync.sync_to_github(local_file_path)
+
+def shutdown_sync():
+    """Stop the background sync worker after pushing any pending changes."""
+    if sync_worker:
+        print("🔄 Flushing pending GitHub sync...")
+        sync_worker.stop()
+
+def create_store():
+    """Create the storage backend selected by STORAGE_BACKEND ("csv", "sqlite" or "binary")."""
+    if STORAGE_BACKEND == "sqlite":
+        from sqlite_store import SQLiteHabitStore
+        return SQLiteHabitStore(SQLITE_DB_FILE, HABIT_LIST_FILE, HABIT_TRACKING_FILE, USER_SETTINGS_FILE)
+    if STORAGE_BACKEND == "binary":
+        from binary_store import BinaryHabitStore
+        return BinaryHabitStore(BINARY_TRACKING_FILE, HABIT_LIST_FILE, HABIT_TRACKING_FILE, USER_SETTINGS_FILE,
+                                CONVERSATION_STATE_FILE)
+    if STORAGE_BACKEND != "csv":
+        raise ValueError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r} (expected 'csv', 'sqlite' or 'binary')")
+    return HabitStore(HABIT_LIST_FILE, HABIT_TRACKING_FILE, USER_SETTINGS_FILE, CONVERSATION_STATE_FILE)
+
+def get_store():
+    """Return the process-wide habit store, loading it from disk on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = create_store()
+                store.load()
+                _store = store
+    return _store
+
+def get_state_store():
+    """Return the conversation state store, persisted through the habit store if enabled."""
+    global _state_store
+    if _state_store is None:
+        from state_store import StateStore
+        backend = get_store() if PERSIST_CONVERSATION_STATE else None
+        with _store_lock:
+            if _state_store is None:
+                _state_store = StateStore(CONVERSATION_STATE_TTL, CONVERSATION_STATE_MAX, backend)
+    return _state_store
+
+def get_habit_ids():
+    """Return the habit id registry, setting up habit_aliases.csv from the existing data on first run."""
+    global _habit_ids
+    if _habit_ids is None:
+        store = get_store()
+        with _store_lock:
+            if _habit_ids is None:
+                habit_ids = HabitIds(HABIT_ALIASES_FILE)
+                if not habit_ids.load():
+                    habit_ids.migrate({user_id: store.get_habits(user_id) for user_id in store.users()},
+                                      {(user_id, habit) for _, user_id, habit, _ in store.iter_checkins()})
+                _habit_ids = habit_ids
+    return _habit_ids
+
+def get_stats_engine():
+    """Return the columnar stats engine, loading the tracking log on first use."""
+    global _stats_engine
+    if _stats_engine is None:
+        habit_ids = get_habit_ids()
+        with _store_lock:
+            if _stats_engine is None:
+                from stats_engine import StatsEngine
+                engine = StatsEngine(habit_key=habit_ids.habit_id)
+                if STORAGE_BACKEND == "csv":
+                    engine.load_csv(HABIT_TRACKING_FILE)
+                elif STORAGE_BACKEND == "binary":
+                    engine.load_columns(*get_store().tracking_columns())
+                else:
+                    engine.load_rows(get_store().iter_checkins())
+                _stats_engine = engine
+    return _stats_engine
+
+def _stats_signature():
+    """Signature of everything the stats are derived from: the tracking data and the habit aliases"""
+    return [get_store().tracking_signature(), get_habit_ids().signature()]
+
+def get_aggregates():
+    """Return the per-(user, habit id) counters, from the snapshot if it is fresh."""
+    global _aggregates
+    if _aggregates is None:
+        with _checkin_lock:
+            if _aggregates is None:
+                aggregates = HabitAggregates(STATS_SNAPSHOT_FILE, _stats_signature)
+                if not aggregates.load_snapshot():
+                    print("📊 Stats snapshot is stale, rebuilding from the tracking log")
+                    engine = get_stats_engine()
+                    aggregates.rebuild(engine.compute(), engine.rollup(period='M'))
+                    aggregates.save_snapshot(aggregates.log_signature())
+                _aggregates = aggregates
+    return _aggregates
+
+def save_stats_snapshot(context=None):
+    """Persist the stats counters if they changed (also usable as a JobQueue callback)."""
+    if _aggregates is None:
+        return
+    with _checkin_lock:
+        _aggregates.save_snapshot(_aggregates.log_signature())
+
+def _write_checkins(date, user_id, statuses):
+    """Write one user's check-ins for a day and fold them into the loaded stats structures."""
+    _write_tracking_rows([(date, user_id, habit, status) for habit, status in statuses])
+
+def _write_tracking_rows(rows):
+    """Write (date, user_id, habit, status) rows and fold them into the loaded stats structures."""
+    store = get_store()
+    habit_ids = get_habit_ids()
+    # Last row wins, as in the log
+    rows = {(date, str(user_id), habit): status for date, user_id, habit, status in rows}
+    with _checkin_lock:
+        previous = {key: store.get_status(*key) for key in rows}
+        store.upsert_rows([key + (status,) for key, status in rows.items()])
+        for (date, user_id, habit), status in rows.items():
+            if _stats_engine is not None:
+                _stats_engine.append(date, user_id, habit, status)
+            if _aggregates is not None:
+                habit_id = habit_ids.habit_id(user_id, habit)
+                _aggregates.apply(date, user_id, habit_id, status, previous[(date, user_id, habit)],
+                                  lambda user_id=user_id, habit_id=habit_id: _habit_history(user_id, habit_id))
+
+def _habit_history(user_id, habit_id):
+    """(date, status) pairs of one habit in date order, whichever of its names they were recorded under"""
+    habit_ids = get_habit_ids()
+    history = {}
+    for date, habit, status in get_store().iter_user_checkins(user_id):
+        if habit_ids.habit_id(user_id, habit) == habit_id:
+            history[date] = status
+    return sorted(history.items())
+
+def _apply_remote_habits(rows, changed):
+    """Apply habit_list.csv rows merged from GitHub: replace the lists of the users whose rows changed."""
+    from scheduler import reschedule_user
+    habits_by_user = {}
+    for row in rows:
+        habits_by_user.setdefault(row['user_id'], []).append(row['habit'])
+    for user_id in {user_id for user_id, _ in changed}:
+        get_store().set_habits(user_id, habits_by_user.get(user_id, []))
+        reschedule_user(int(user_id))
+
+def _apply_remote_tracking(rows, changed):
+    """Apply habit_tracking.csv rows merged from GitHub (check-ins are never deleted locally)."""
+    _write_tracking_rows((row['date'], row['user_id'], row['habit'], row['status'])
+                         for row in rows if (row['date'], row['user_id'], row['habit']) in changed)
+
+def _apply_remote_settings(rows, changed):
+    """Apply user_settings.csv rows merged from GitHub."""
+    from scheduler import reschedule_user
+    for row in rows:
+        if (row['user_id'],) in changed:
+            get_store().set_settings(row['user_id'], row['timezone'], row['checkin_time'])
+            reschedule_user(int(row['user_id']))
 
 def save_user_habits(user_id, habits):
     """Save user's habits to habit_list.csv"""
-    # Create file with headers if it doesn't exist
-    if not os.path.exists(HABIT_LIST_FILE):
-        with open(HABIT_LIST_FILE, 'w', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            writer.writerow(['user_id', 'habit'])
-    
-    # Read existing data
-    existing_data = []
-    if os.path.exists(HABIT_LIST_FILE):
-        with open(HABIT_LIST_FILE, 'r', newline='', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            existing_data = list(reader)
-    
-    # Remove existing habits for this user
-    existing_data = [row for row in existing_data if row['user_id'] != str(user_id)]
-    
-    # Add new habits for this user
-    for habit in habits:
-        existing_data.append({'user_id': str(user_id), 'habit': habit})
+    _await_hydration()
+    get_habit_ids().assign(user_id, habits)
+    get_store().set_habits(user_id, habits)
     
-    # Write back to file
-    with open(HABIT_LIST_FILE, 'w', newline='', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=['user_id', 'habit'])
-        writer.writeheader()
-        writer.writerows(existing_data)
+    # Sync to GitHub if enabled
+    _schedule_sync(github_sync_habits, HABIT_LIST_FILE)
+    _schedule_sync(github_sync_aliases, HABIT_ALIASES_FILE)
+
+def rename_user_habit(user_id, old_name, new_name):
+    """Rename one of user's habits; its history stays under the old name and counts for the new one"""
+    _await_hydration()
+    habits = get_user_habits(user_id)
+    if new_name in habits:
+        raise ValueError(f"You already have a habit called “{new_name}”.")
+    get_habit_ids().rename(user_id, old_name, new_name)
+    get_store().set_habits(user_id, [new_name if habit == old_name else habit for habit in habits])
     
     # Sync to GitHub if enabled
-    if github_sync_habits:
-        github_sync_habits.sync_to_github(HABIT_LIST_FILE)
+    _schedule_sync(github_sync_habits, HABIT_LIST_FILE)
+    _schedule_sync(github_sync_aliases, HABIT_ALIASES_FILE)
 
 def get_user_habits(user_id):
     """Get user's habits from habit_list.csv"""
-    if not os.path.exists(HABIT_LIST_FILE):
-        return []
-    
-    habits = []
-    with open(HABIT_LIST_FILE, 'r', newline='', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            if row['user_id'] == str(user_id):
-                habits.append(row['habit'])
+    return get_store().get_habits(user_id)
+
+def get_user_settings(user_id):
+    """Get user's timezone and check-in time, falling back to the defaults"""
+    settings = get_store().get_settings(user_id)
+    return settings or {'timezone': DEFAULT_TIMEZONE, 'checkin_time': DAILY_CHECKIN_TIME}
+
+def save_user_settings(user_id, timezone, checkin_time):
+    """Save user's timezone and HH:MM check-in time to user_settings.csv"""
+    _await_hydration()
+    get_store().set_settings(user_id, timezone, checkin_time)
     
-    return habits
+    # Sync to GitHub if enabled
+    _schedule_sync(github_sync_settings, USER_SETTINGS_FILE)
+
+def get_user_today(user_id):
+    """Today's date (YYYY-MM-DD) in the user's timezone"""
+    tz = pytz.timezone(get_user_settings(user_id)['timezone'])
+    return datetime.now(tz).strftime("%Y-%m-%d")
 
 def append_checkin(date, user_id, habit, status):
     """Append a habit check-in to habit_tracking.csv"""
-    # Create file with headers if it doesn't exist
-    if not os.path.exists(HABIT_TRACKING_FILE):
-        with open(HABIT_TRACKING_FILE, 'w', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            writer.writerow(['date', 'user_id', 'habit', 'status'])
-    
-    # Read existing data to check for duplicates
-    existing_data = []
-    if os.path.exists(HABIT_TRACKING_FILE):
-        with open(HABIT_TRACKING_FILE, 'r', newline='', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            existing_data = list(reader)
-    
-    # Check if this check-in already exists
-    user_id_str = str(user_id)
-    for row in existing_data:
-        if (row['date'] == date and 
-            row['user_id'] == user_id_str and 
-            row['habit'] == habit):
-            # Update existing check-in
-            row['status'] = status
-            break
-    else:
-        # Add new check-in
-        existing_data.append({
-            'date': date,
-            'user_id': user_id_str,
-            'habit': habit,
-            'status': status
-        })
-    
-    # Write back to file
-    with open(HABIT_TRACKING_FILE, 'w', newline='', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=['date', 'user_id', 'habit', 'status'])
-        writer.writeheader()
-        writer.writerows(existing_data)
+    _await_hydration()
+    _write_checkins(date, user_id, [(habit, status)])
     
     # Sync to GitHub if enabled
-    if github_sync_tracking:
-        github_sync_tracking.sync_to_github(HABIT_TRACKING_FILE)
+    _schedule_sync(github_sync_tracking, HABIT_TRACKING_FILE)
+
+def record_checkins(date, user_id, statuses):
+    """Record all of a day's (habit, status) pairs for one user in a single write"""
+    _await_hydration()
+    _write_checkins(date, user_id, list(statuses))
+    
+    # One sync for the whole batch
+    _schedule_sync(github_sync_tracking, HABIT_TRACKING_FILE)
 
 def get_all_users():
     """Get all user IDs from habit_list.csv"""
-    if not os.path.exists(HABIT_LIST_FILE):
-        return []
-    
-    user_ids = []
-    with open(HABIT_LIST_FILE, 'r', newline='', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            user_ids.append(int(row['user_id']))
-    
-    return user_ids
+    return [int(user_id) for user_id in get_store().users()]
 
 def has_checkin_today(user_id, date):
     """Check if user has already checked in today"""
-    if not os.path.exists(HABIT_TRACKING_FILE):
-        return False
-    
-    with open(HABIT_TRACKING_FILE, 'r', newline='', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            if row['user_id'] == str(user_id) and row['date'] == date:
-                return True
-    
-    return False
+    return get_store().has_checkin(user_id, date)
 
 def sync_habits_from_github():
     """Sync habit_list.csv from GitHub repository."""
     if github_sync_habits:
+        # Merged rows are applied through the store (see _apply_remote_habits)
+        get_store().export_csv()
         return github_sync_habits.sync_from_github(HABIT_LIST_FILE)
     return False
 
 def sync_habits_to_github():
     """Sync habit_list.csv to GitHub repository."""
-    if github_sync_habits:
-        return github_sync_habits.sync_to_github(HABIT_LIST_FILE)
-    return False
+    return _push_now(github_sync_habits, HABIT_LIST_FILE)
 
 def sync_tracking_from_github():
     """Sync habit_tracking.csv from GitHub repository."""
     if github_sync_tracking:
+        # Merged rows are applied through the store (see _apply_remote_tracking)
+        get_store().export_csv()
         return github_sync_tracking.sync_from_github(HABIT_TRACKING_FILE)
     return False
 
 def sync_tracking_to_github():
     """Sync habit_tracking.csv to GitHub repository."""
-    if github_sync_tracking:
-        return github_sync_tracking.sync_to_github(HABIT_TRACKING_FILE)
+    return _push_now(github_sync_tracking, HABIT_TRACKING_FILE)
+
+def sync_settings_from_github():
+    """Sync user_settings.csv from GitHub repository."""
+    if github_sync_settings:
+        # Merged rows are applied through the store (see _apply_remote_settings)
+        get_store().export_csv()
+        return github_sync_settings.sync_from_github(USER_SETTINGS_FILE)
     return False
 
+def sync_settings_to_github():
+    """Sync user_settings.csv to GitHub repository."""
+    return _push_now(github_sync_settings, USER_SETTINGS_FILE)
+
+def sync_aliases_from_github():
+    """Sync habit_aliases.csv from GitHub repository."""
+    global _stats_engine, _aggregates
+    if github_sync_aliases:
+        habit_ids = get_habit_ids()
+        signature = habit_ids.signature()
+        success = github_sync_aliases.sync_from_github(HABIT_ALIASES_FILE)
+        if habit_ids.signature() != signature:
+            # Merged aliases can move check-ins between habits: regroup the stats on next use
+            with _checkin_lock:
+                habit_ids.load()
+                _stats_engine = None
+                _aggregates = None
+        return success
+    return False
+
+def sync_aliases_to_github():
+    """Sync habit_aliases.csv to GitHub repository."""
+    return _push_now(github_sync_aliases, HABIT_ALIASES_FILE)
+
 def sync_all_from_github():
-    """Sync both CSV files from GitHub repository."""
+    """Sync all CSV files from GitHub repository."""
+    # Aliases first, so merged check-ins are counted under the right habit
+    aliases_success = sync_aliases_from_github()
     habits_success = sync_habits_from_github()
     tracking_success = sync_tracking_from_github()
-    return habits_success and tracking_success
+    settings_success = sync_settings_from_github()
+    return aliases_success and habits_success and tracking_success and settings_success
 
 def sync_all_to_github():
-    """Sync both CSV files to GitHub repository."""
+    """Sync all CSV files to GitHub repository."""
+    aliases_success = sync_aliases_to_github()
     habits_success = sync_habits_to_github()
     tracking_success = sync_tracking_to_github()
-    return habits_success and tracking_success
+    settings_success = sync_settings_to_github()
+    return aliases_success and habits_success and tracking_success and settings_success
 
-def get_user_stats(user_id):
-    """Get statistics for a user's habits"""
-    if not os.path.exists(HABIT_TRACKING_FILE):
-        return {}
-    
-    stats = {}
-    with open(HABIT_TRACKING_FILE, 'r', newline='', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            if row['user_id'] == str(user_id):
-                habit = row['habit']
-                status = row['status']
-                
-                if habit not in stats:
-                    stats[habit] = {'total': 0, 'completed': 0}
-                
-                stats[habit]['total'] += 1
-                if status == '✅':
-                    stats[habit]['completed'] += 1
-    
-    return stats 
\ No newline at end of file
+def get_user_stats(user_id, today=None):
+    """Get statistics (totals, completions, streaks, latest month) for a user's habits, by name on their list"""
+    stats = get_aggregates().user_stats(user_id, today or get_user_today(user_id))
+    habit_ids = get_habit_ids()
+    by_name = {}
+    for habit in get_user_habits(user_id):
+        habit_id = habit_ids.habit_id(user_id, habit)
+        if habit_id in stats:
+            by_name[habit] = stats[habit_id]
+    return by_name
+
+def get_all_stats(today=None):
+    """Get statistics for every user's habits in one vectorized pass (DataFrame, one row per habit id)"""
+    return get_stats_engine().compute(today=today)
+
+def get_user_rollup(user_id, period='W'):
+    """Get weekly ('W') or monthly ('M') completion totals for a user's habits (DataFrame, by habit id)"""
+    return get_stats_engine().rollup(user_id, period)
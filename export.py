@@ -0,0 +1,92 @@
+# export.py
+#
+# Streaming history export for /export: a user's check-ins are read from the
+# store a day at a time and gzip-compressed as they are produced into a
+# spooled temporary file (memory up to EXPORT_SPOOL_BYTES, then disk), so an
+# export takes constant memory however long the history is. A history that
+# compresses to more than EXPORT_PART_BYTES is split into several parts, each
+# a complete .csv.gz / .json.gz document.
+import csv
+import gzip
+import io
+import json
+import tempfile
+from typing import IO, Iterable, Iterator, Optional, Tuple
+
+from config import EXPORT_PART_BYTES, EXPORT_SPOOL_BYTES
+
+EXPORT_FIELDS = ['date', 'habit', 'status']
+FORMATS = ('csv', 'json')
+
+# Rows written between checks of the compressed size
+SIZE_CHECK_INTERVAL = 1000
+
+
+def iter_export_rows(user_id, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[tuple]:
+    """(date, habit, status) for a user's check-ins from start to end (inclusive, YYYY-MM-DD), oldest first."""
+    from csv_handler import get_store
+    return get_store().iter_user_checkins(user_id, start, end)
+
+
+def export_parts(rows: Iterable[tuple], fmt: str = 'csv',
+                 part_bytes: int = EXPORT_PART_BYTES) -> Iterator[Tuple[IO[bytes], int]]:
+    """
+    Compress (date, habit, status) rows into one or more gzip documents.
+
+    Rows are consumed only as parts are requested; a part's file is closed
+    when the next one is requested (or the generator is closed).
+
+    Args:
+        rows: Rows in the order they should appear
+        fmt: "csv" (with a header) or "json" (an array of objects)
+        part_bytes: Start a new part once the compressed size reaches this
+
+    Yields:
+        (file positioned at its start, number of rows in it); always at least
+        one, possibly empty, part
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown export format {fmt!r}")
+    rows = iter(rows)
+    row = next(rows, None)
+    while True:
+        spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+        try:
+            # mtime=0: the same history always compresses to the same bytes
+            text = io.TextIOWrapper(gzip.GzipFile(fileobj=spool, mode='wb', mtime=0), encoding='utf-8', newline='')
+            if fmt == 'csv':
+                writer = csv.writer(text)
+                writer.writerow(EXPORT_FIELDS)
+            else:
+                text.write('[')
+            count = 0
+            while row is not None:
+                if fmt == 'csv':
+                    writer.writerow(row)
+                else:
+                    text.write(('\n' if not count else ',\n')
+                               + json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False))
+                count += 1
+                row = next(rows, None)
+                if count % SIZE_CHECK_INTERVAL == 0 and spool.tell() >= part_bytes:
+                    break
+            if fmt == 'json':
+                text.write('\n]\n')
+            # Flushes the gzip trailer; the spool itself stays open
+            text.close()
+            spool.seek(0)
+            yield spool, count
+        finally:
+            spool.close()
+        if row is None:
+            return
+
+
+def export_filename(fmt: str, start: Optional[str] = None, end: Optional[str] = None, part: int = 1) -> str:
+    """habit-history[-<start>][_<end>][-part<N>].<fmt>.gz"""
+    name = "habit-history"
+    if start or end:
+        name += f"-{start or 'start'}_{end or 'today'}"
+    if part > 1:
+        name += f"-part{part}"
+    return f"{name}.{fmt}.gz"
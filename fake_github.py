@@ -0,0 +1,119 @@
+# fake_github.py
+#
+# In-process stand-in for the GitHub Contents API, for benchmarks and local
+# testing of GitHub sync without a token or network:
+#
+#   api = FakeGitHubAPI()
+#   api.start()
+#   os.environ["GITHUB_API_URL"] = api.url   # before csv_handler.init_github_sync()
+#
+# Files live in memory. GET honours If-None-Match (ETag = blob SHA) and PUT
+# rejects a stale or missing SHA with 409, like the real API.
+import base64
+import hashlib
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def blob_sha(content: bytes) -> str:
+    """Git blob SHA of content, as the Contents API reports it."""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+class FakeGitHubAPI:
+    def __init__(self, port: int = 0):
+        """
+        Minimal GitHub Contents API (GET/PUT /repos/<owner>/<repo>/contents/<path>).
+
+        Args:
+            port: Port to listen on (0 picks a free one)
+        """
+        self._lock = threading.Lock()
+        # path -> (content, sha)
+        self.files = {}
+        # "GET 200", "PUT 409", ... -> count
+        self.requests = Counter()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, payload=None, headers=None):
+                body = json.dumps(payload).encode() if payload is not None else b""
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                api._count(self.command, status, sent=len(body))
+
+            def _path(self):
+                if "/contents/" not in self.path:
+                    return None
+                return self.path.split("/contents/", 1)[1].split("?", 1)[0]
+
+            def do_GET(self):
+                path = self._path()
+                with api._lock:
+                    entry = api.files.get(path)
+                if entry is None:
+                    self._reply(404, {"message": "Not Found"})
+                    return
+                content, sha = entry
+                etag = f'"{sha}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self._reply(304)
+                    return
+                self._reply(200, {"sha": sha, "content": base64.b64encode(content).decode()}, {"ETag": etag})
+
+            def do_PUT(self):
+                path = self._path()
+                raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with api._lock:
+                    api.bytes_in += len(raw)
+                body = json.loads(raw)
+                content = base64.b64decode(body["content"])
+                with api._lock:
+                    current = api.files.get(path)
+                    if (current[1] if current else None) != body.get("sha"):
+                        conflict = True
+                    else:
+                        conflict = False
+                        sha = blob_sha(content)
+                        api.files[path] = (content, sha)
+                if conflict:
+                    self._reply(409, {"message": "sha does not match"})
+                    return
+                self._reply(201 if current is None else 200, {"content": {"path": path, "sha": sha}})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_port
+        self.url = f"http://127.0.0.1:{self.port}"
+
+    def _count(self, method: str, status: int, sent: int):
+        with self._lock:
+            self.requests[f"{method} {status}"] += 1
+            self.bytes_out += sent
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="fake-github-api", daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self) -> str:
+        """One-line summary of the traffic so far."""
+        counts = ", ".join(f"{key}: {value}" for key, value in sorted(self.requests.items()))
+        return (f"{sum(self.requests.values())} requests ({counts}), "
+                f"{self.bytes_in / 1e6:.2f} MB up, {self.bytes_out / 1e6:.2f} MB down")
@@ -0,0 +1,182 @@
+# fake_telegram.py
+#
+# End-to-end check of webhook mode without Telegram: serves a fake Bot API
+# and plays simulated users against the bot's webhook.
+#
+#   python fake_telegram.py --api-port 8081 --webhook http://127.0.0.1:8443/telegram --users 50
+#
+# and in another shell, from a scratch directory:
+#
+#   TELEGRAM_TOKEN=123:fake TELEGRAM_API_URL=http://127.0.0.1:8081/bot \
+#   BOT_MODE=webhook WEBHOOK_PORT=8443 python /path/to/main.py
+#
+# Each user sends /start, a habit list and a check-in, waiting for the bot's
+# reply to each message before sending the next.
+import argparse
+import itertools
+import json
+import statistics
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from webhook import SECRET_TOKEN_HEADER
+
+
+class FakeBotAPI:
+    def __init__(self, port: int = 0):
+        """
+        Minimal Telegram Bot API: acknowledges every method and records
+        sendMessage calls per chat.
+
+        Args:
+            port: Port to listen on (0 picks a free one)
+        """
+        self._cond = threading.Condition()
+        # chat_id -> [text, ...]
+        self.messages = {}
+        self._message_ids = itertools.count(1)
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                method = self.path.rsplit("/", 1)[-1]
+                length = int(self.headers.get("Content-Length", 0))
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    params = json.loads(raw) if raw else {}
+                except ValueError:
+                    params = {}
+                body = json.dumps({"ok": True, "result": api.handle(method, params)}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.port = self.server.server_port
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="fake-bot-api", daemon=True).start()
+
+    def stop(self):
+        """Stop serving once the responses in flight have been written."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, method: str, params: dict):
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Habit Tracker", "username": "fake_habit_bot"}
+        if method == "sendMessage":
+            chat_id = int(params["chat_id"])
+            with self._cond:
+                self.messages.setdefault(chat_id, []).append(params.get("text", ""))
+                self._cond.notify_all()
+            return {"message_id": next(self._message_ids), "date": int(time.time()),
+                    "chat": {"id": chat_id, "type": "private"}, "text": params.get("text", "")}
+        return True
+
+    def wait_for_replies(self, chat_id: int, count: int, timeout: float) -> bool:
+        """Block until chat_id has received at least count messages."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while len(self.messages.get(chat_id, [])) < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+
+_update_ids = itertools.count(1)
+
+
+def make_update(user_id: int, text: str) -> dict:
+    """A private text message from user_id, with a bot_command entity for /commands."""
+    message = {
+        "message_id": next(_update_ids),
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"},
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": message["message_id"], "message": message}
+
+
+def post_update(webhook_url: str, update: dict, secret: str = ""):
+    request = urllib.request.Request(webhook_url, data=json.dumps(update).encode(), method="POST",
+                                     headers={"Content-Type": "application/json"})
+    if secret:
+        request.add_header(SECRET_TOKEN_HEADER, secret)
+    with urllib.request.urlopen(request, timeout=10) as response:
+        response.read()
+
+
+def wait_until_up(webhook_url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            urllib.request.urlopen(webhook_url, timeout=2).read()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+
+
+def run_user(api: FakeBotAPI, webhook_url: str, user_id: int, script, secret: str, timeout: float):
+    """Send each message and wait for the bot's reply; returns the round-trip latencies."""
+    latencies = []
+    expected = len(api.messages.get(user_id, []))
+    for text in script:
+        started = time.monotonic()
+        post_update(webhook_url, make_update(user_id, text), secret)
+        expected += 1
+        if not api.wait_for_replies(user_id, expected, timeout):
+            raise TimeoutError(f"user {user_id}: no reply to {text!r}")
+        latencies.append(time.monotonic() - started)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the bot's webhook with simulated users")
+    parser.add_argument("--webhook", default="http://127.0.0.1:8443/telegram", help="Webhook URL of the bot")
+    parser.add_argument("--api-port", type=int, default=8081, help="Port for the fake Bot API")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--secret", default="", help="WEBHOOK_SECRET the bot expects")
+    parser.add_argument("--first-user-id", type=int, default=900000000)
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    api = FakeBotAPI(args.api_port)
+    api.start()
+    print(f"🤖 Fake Bot API on http://127.0.0.1:{api.port}/bot")
+    wait_until_up(args.webhook)
+
+    script = ["/start", "workout, drink water, read", "✅ ❌ ✅", "/stats"]
+    users = range(args.first_user_id, args.first_user_id + args.users)
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda user_id: run_user(api, args.webhook, user_id, script, args.secret,
+                                                         args.timeout), users))
+    elapsed = time.monotonic() - started
+    api.stop()
+
+    latencies = sorted(latency for result in results for latency in result)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"✅ {len(latencies)} messages from {args.users} users answered in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:.1f} msg/s)")
+    print(f"   round trip p50 {statistics.median(latencies) * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,197 @@
 # github_synch.py
-import requests
+# requests (~90 ms to import) is loaded by get_session, when GitHub sync is actually used
 import base64
+import hashlib
 import json
 import os
-from typing import Optional, Dict, Any
+import threading
+from typing import Optional, Dict, Tuple, Callable, Iterable, Iterator, List
 import csv
-from io import StringIO
+from io import BytesIO, StringIO, TextIOWrapper
+from atomic_io import atomic_open, locked, replace_file
+from habit_store import TRACKING_FIELDS
+from metrics import observe
+
+DEFAULT_API_URL = "https://api.github.com"
+
+# Status codes GitHub returns when the SHA sent with a PUT is stale
+SHA_CONFLICT_STATUSES = (409, 422)
+
+# Fetch/merge/PUT rounds before a merging push gives up (another replica keeps winning)
+MERGE_ATTEMPTS = 3
+
+
+class SHAConflict(Exception):
+    """The remote file changed between our fetch and our PUT."""
+
+
+def read_csv(content: bytes) -> csv.DictReader:
+    """Lazy DictReader over CSV bytes, decoding line by line instead of copying the whole file to a str."""
+    return csv.DictReader(TextIOWrapper(BytesIO(content), encoding='utf-8', newline=''))
+
+
+def write_csv(file, rows: Iterable[dict], fieldnames: Optional[List[str]] = None) -> int:
+    """
+    Write rows to a text file as they are consumed.
+    
+    Args:
+        file: Text file opened with newline=''
+        rows: Dictionaries (any iterable, e.g. a DictReader)
+        fieldnames: Header; taken from the first row if None
+    
+    Returns:
+        The number of rows written
+    """
+    rows = iter(rows)
+    first = None
+    if fieldnames is None:
+        first = next(rows, None)
+        # Empty CSV with default headers
+        fieldnames = list(first) if first is not None else ['user_id', 'habits']
+    writer = csv.DictWriter(file, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    count = 0
+    if first is not None:
+        writer.writerow(first)
+        count = 1
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def csv_bytes(rows: Iterable[dict], fieldnames: Optional[List[str]] = None) -> Tuple[bytes, int]:
+    """write_csv into memory, encoding as it goes: (content, number of rows)."""
+    output = BytesIO()
+    text = TextIOWrapper(output, encoding='utf-8', newline='')
+    count = write_csv(text, rows, fieldnames)
+    text.flush()
+    return output.getvalue(), count
+
+
+def merge_rows(base: Dict[tuple, dict], local: Dict[tuple, dict], remote: Dict[tuple, dict],
+               prefer_local: bool = True) -> Dict[tuple, dict]:
+    """
+    Three-way merge of keyed CSV rows.
+    
+    A row changed (or added, or deleted) on only one side since base takes
+    that side's version. If both sides changed the same row differently,
+    prefer_local picks the winner. Local rows keep their order, rows only
+    the remote has are appended in remote order.
+    
+    Args:
+        base: Rows as of the last sync, {key: row}
+        local: Local rows, {key: row}
+        remote: Remote rows, {key: row}
+        prefer_local: Conflict resolution (True when pushing, False when pulling)
+    
+    Returns:
+        Merged rows, {key: row}
+    """
+    merged = {}
+    for key in list(local) + [key for key in remote if key not in local]:
+        ours, theirs, ancestor = local.get(key), remote.get(key), base.get(key)
+        if ours == theirs or theirs == ancestor:
+            row = ours
+        elif ours == ancestor:
+            row = theirs
+        else:
+            row = ours if prefer_local else theirs
+        if row is not None:
+            merged[key] = row
+    return merged
+
+_session = None
+_session_lock = threading.Lock()
+
+def _record_request(response, *args, **kwargs):
+    """Session hook: time every GitHub API call (until the response headers arrived)."""
+    observe("habitbot_github_request_seconds", response.elapsed.total_seconds(),
+            method=response.request.method, status=response.status_code)
+
+def get_session() -> "requests.Session":
+    """
+    Return the process-wide pooled HTTP session for the GitHub API.
+    
+    Reusing one session keeps TCP+TLS connections alive between calls
+    instead of paying a fresh handshake for every request.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                session.hooks["response"].append(_record_request)
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
 
 class GitHubCSVSync:
-    def __init__(self, repo_owner: str, repo_name: str, file_path: str, github_token: str, branch: str = "main"):
+    def __init__(self, repo_owner: str, repo_name: str, file_path: str, github_token: str, branch: str = "main",
+                 session: Optional["requests.Session"] = None, key_fields: Optional[Tuple[str, ...]] = None,
+                 apply_changes: Optional[Callable[[List[dict], set], None]] = None,
+                 api_url: str = DEFAULT_API_URL):
         """
         Initialize GitHub CSV synchronization.
         
+        With key_fields set, pushes and pulls do a row-level three-way merge
+        against the content of the last sync (kept next to the local file as
+        <local file>.base) instead of overwriting one side with the other, so
+        several bot instances can share one data repository.
+        
         Args:
             repo_owner: GitHub username or organization name
             repo_name: Repository name
             file_path: Path to the CSV file in the repository (e.g., "data/habit_list.csv")
             github_token: GitHub personal access token
             branch: Branch name (default: "main")
+            session: HTTP session to use (default: the shared pooled session)
+            key_fields: Columns identifying a row, e.g. ("date", "user_id", "habit");
+                None keeps the plain overwrite behaviour
+            apply_changes: Called with (merged rows, keys of the local rows that
+                changed) to bring local state up to date after a merge; if None
+                the merged rows are written to the local file
+            api_url: Base URL of the GitHub REST API (e.g. a local fake for benchmarks)
         """
         self.repo_owner = repo_owner
         self.repo_name = repo_name
         self.file_path = file_path
         self.github_token = github_token
         self.branch = branch
-        self.base_url = "https://api.github.com"
+        self.base_url = api_url.rstrip('/')
         self.headers = {
             "Authorization": f"token {github_token}",
             "Accept": "application/vnd.github.v3+json",
             "User-Agent": "HabitTrackerBot/1.0"
         }
+        self.session = session or get_session()
+        # Last known blob SHA of the remote file (None = unknown)
+        self._sha = None
+        # ETag of the last successful download, for conditional GETs
+        self._etag = None
+        self.key_fields = tuple(key_fields) if key_fields else None
+        self.apply_changes = apply_changes
+    
+    @property
+    def contents_url(self) -> str:
+        return f"{self.base_url}/repos/{self.repo_owner}/{self.repo_name}/contents/{self.file_path}"
         
     def _get_file_sha(self) -> Optional[str]:
         """Get the current SHA of the file in the repository."""
-        url = f"{self.base_url}/repos/{self.repo_owner}/{self.repo_name}/contents/{self.file_path}"
+        url = self.contents_url
         params = {"ref": self.branch}
         
         try:
-            response = requests.get(url, headers=self.headers, params=params)
+            response = self.session.get(url, headers=self.headers, params=params)
             if response.status_code == 200:
-                return response.json()["sha"]
+                self._sha = response.json()["sha"]
+                return self._sha
             elif response.status_code == 404:
                 # File doesn't exist yet
+                self._sha = None
                 return None
             else:
                 print(f"Error getting file SHA: {response.status_code} - {response.text}")
@@ -50,99 +200,277 @@ class GitHubCSVSync:
             print(f"Exception getting file SHA: {e}")
             return None
     
-    def download_csv(self) -> list:
+    def fetch_content(self, if_changed: bool = False) -> Tuple[int, Optional[bytes]]:
         """
-        Download CSV file from GitHub repository.
+        Fetch the raw bytes of the file from GitHub.
+        
+        Args:
+            if_changed: Send the ETag of the last fetch so an unchanged file
+                comes back as a cheap 304 without content
         
         Returns:
-            List of dictionaries representing CSV data
+            (status_code, content) where content is None unless status is 200
         """
-        url = f"{self.base_url}/repos/{self.repo_owner}/{self.repo_name}/contents/{self.file_path}"
         params = {"ref": self.branch}
+        headers = self.headers
+        if if_changed and self._etag:
+            headers = dict(self.headers, **{"If-None-Match": self._etag})
+        
+        response = self.session.get(self.contents_url, headers=headers, params=params)
+        if response.status_code == 200:
+            body = response.json()
+            self._sha = body["sha"]
+            self._etag = response.headers.get("ETag")
+            return 200, base64.b64decode(body["content"])
+        if response.status_code == 404:
+            self._sha = None
+            self._etag = None
+        elif response.status_code != 304:
+            print(f"❌ Error downloading file: {response.status_code} - {response.text}")
+        return response.status_code, None
+    
+    def put_content(self, content: bytes, retry_conflict: bool = True) -> bool:
+        """
+        Commit raw bytes as the new content of the file.
+        
+        Uses the cached blob SHA; on a SHA conflict the SHA is refetched and
+        the PUT retried once.
+        
+        Args:
+            content: New file content
+            retry_conflict: If False, raise SHAConflict instead of retrying,
+                so the caller can merge the new remote content first
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        # Only ask GitHub for the SHA when we don't know it yet
+        if self._sha is None:
+            self._get_file_sha()
+        
+        # Prepare commit data
+        commit_data = {
+            "message": f"Update {self.file_path} via Habit Tracker Bot",
+            "content": base64.b64encode(content).decode('utf-8'),
+            "branch": self.branch
+        }
+        
+        if self._sha:
+            commit_data["sha"] = self._sha
+        
+        # Upload to GitHub
+        url = self.contents_url
+        
+        response = self.session.put(url, headers=self.headers, json=commit_data)
+        
+        if response.status_code in SHA_CONFLICT_STATUSES and not retry_conflict:
+            self._sha = None
+            raise SHAConflict(self.file_path)
+        
+        if response.status_code in SHA_CONFLICT_STATUSES:
+            # Cached SHA is stale (someone else committed); refetch once
+            print(f"🔁 SHA for {self.file_path} is stale, refetching")
+            if self._get_file_sha():
+                commit_data["sha"] = self._sha
+            else:
+                commit_data.pop("sha", None)
+            response = self.session.put(url, headers=self.headers, json=commit_data)
+        
+        if response.status_code in [200, 201]:
+            self._sha = response.json()["content"]["sha"]
+            return True
         
+        print(f"❌ Error uploading file: {response.status_code} - {response.text}")
+        return False
+    
+    def download_csv(self, if_changed: bool = False) -> Optional[Iterator[dict]]:
+        """
+        Download CSV file from GitHub repository.
+        
+        Args:
+            if_changed: Send the ETag of the last download and return None
+                if the remote file has not changed since then
+        
+        Returns:
+            Iterator of dictionaries representing CSV data (parsed as it is
+            consumed; its fieldnames attribute holds the header), or None if unchanged
+        """
         try:
-            response = requests.get(url, headers=self.headers, params=params)
+            status, content = self.fetch_content(if_changed)
             
-            if response.status_code == 200:
-                # Decode the content
-                content = response.json()["content"]
-                decoded_content = base64.b64decode(content).decode('utf-8')
-                
-                # Parse CSV
-                csv_data = []
-                csv_reader = csv.DictReader(StringIO(decoded_content))
-                for row in csv_reader:
-                    csv_data.append(row)
-                
-                print(f"✅ Successfully downloaded {len(csv_data)} rows from {self.file_path}")
-                return csv_data
+            if status == 304:
+                print(f"✅ {self.file_path} unchanged on GitHub")
+                return None
+            
+            if status == 200:
+                print(f"✅ Successfully downloaded {len(content)} bytes from {self.file_path}")
+                return read_csv(content)
                 
-            elif response.status_code == 404:
+            elif status == 404:
                 print(f"📄 File {self.file_path} not found in repository. Creating new file.")
-                return []
-            else:
-                print(f"❌ Error downloading file: {response.status_code} - {response.text}")
-                return []
+            return iter(())
                 
         except Exception as e:
             print(f"❌ Exception downloading file: {e}")
-            return []
+            return iter(())
     
-    def upload_csv(self, csv_data: list) -> bool:
+    def upload_csv(self, csv_data: Iterable[dict], fieldnames: Optional[List[str]] = None) -> bool:
         """
         Upload CSV data to GitHub repository.
         
         Args:
-            csv_data: List of dictionaries representing CSV data
+            csv_data: Dictionaries representing CSV data (a list or any iterable)
+            fieldnames: Header; taken from the first row if None
             
         Returns:
             True if successful, False otherwise
         """
         try:
-            # Convert CSV data to string
-            output = StringIO()
-            if csv_data:
-                fieldnames = csv_data[0].keys()
-                writer = csv.DictWriter(output, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(csv_data)
+            content, count = csv_bytes(csv_data, fieldnames)
+            if self.put_content(content):
+                print(f"✅ Successfully uploaded {count} rows to {self.file_path}")
+                return True
+            return False
+                
+        except Exception as e:
+            print(f"❌ Exception uploading file: {e}")
+            return False
+    
+    def _parse_keyed(self, content: Optional[bytes]) -> Tuple[List[str], Dict[tuple, dict]]:
+        """Parse CSV bytes into (fieldnames, {key: row}); the last row for a key wins."""
+        if not content:
+            return [], {}
+        reader = read_csv(content)
+        rows = {}
+        for row in reader:
+            rows[tuple(row.get(field, '') for field in self.key_fields)] = row
+        return list(reader.fieldnames or []), rows
+    
+    @staticmethod
+    def _serialize_keyed(fieldnames: List[str], rows: Dict[tuple, dict]) -> bytes:
+        output = StringIO()
+        writer = csv.DictWriter(output, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows.values())
+        return output.getvalue().encode('utf-8')
+    
+    def _merge_into_local(self, local_file_path: str, remote: Optional[bytes], prefer_local: bool) -> bytes:
+        """
+        Merge remote content into the local file and record the new base.
+        
+        Args:
+            local_file_path: Local CSV file
+            remote: Remote content, or None if the remote still matches the base
+            prefer_local: Conflict resolution, see merge_rows
+        
+        Returns:
+            The merged CSV content
+        """
+        base_path = local_file_path + '.base'
+        with locked(local_file_path):
+            local = base = None
+            if os.path.exists(local_file_path):
+                with open(local_file_path, 'rb') as file:
+                    local = file.read()
+                # Without a local file there is nothing the base could be an ancestor of
+                if os.path.exists(base_path):
+                    with open(base_path, 'rb') as file:
+                        base = file.read()
+            fieldnames, local_rows = self._parse_keyed(local)
+            _, base_rows = self._parse_keyed(base)
+            if remote is None:
+                remote_fields, remote_rows = fieldnames, base_rows
             else:
-                # Empty CSV with default headers
-                writer = csv.DictWriter(output, fieldnames=['user_id', 'habits'])
-                writer.writeheader()
-            
-            csv_content = output.getvalue()
-            
-            # Encode content
-            encoded_content = base64.b64encode(csv_content.encode('utf-8')).decode('utf-8')
-            
-            # Get current SHA if file exists
-            current_sha = self._get_file_sha()
-            
-            # Prepare commit data
-            commit_data = {
-                "message": f"Update {self.file_path} via Habit Tracker Bot",
-                "content": encoded_content,
-                "branch": self.branch
-            }
+                remote_fields, remote_rows = self._parse_keyed(remote)
             
-            if current_sha:
-                commit_data["sha"] = current_sha
-            
-            # Upload to GitHub
-            url = f"{self.base_url}/repos/{self.repo_owner}/{self.repo_name}/contents/{self.file_path}"
-            
-            response = requests.put(url, headers=self.headers, json=commit_data)
+            merged = merge_rows(base_rows, local_rows, remote_rows, prefer_local)
+            changed = {key for key in local_rows.keys() | merged.keys() if local_rows.get(key) != merged.get(key)}
+            content = self._serialize_keyed(fieldnames or remote_fields or list(self.key_fields), merged)
+            if changed and self.apply_changes is None:
+                with atomic_open(local_file_path, 'wb') as file:
+                    file.write(content)
+        
+        # Outside the file lock: the callback goes through the store, which takes its own locks
+        if changed and self.apply_changes is not None:
+            self.apply_changes(list(merged.values()), changed)
+        if changed:
+            print(f"🔀 Merged {len(changed)} changed row(s) from {self.file_path} into {local_file_path}")
+        if remote is not None:
+            with atomic_open(base_path, 'wb') as file:
+                file.write(remote)
+        return content
+    
+    def merge_from_github(self, local_file_path: str) -> bool:
+        """
+        Pull: three-way merge the remote rows into the local ones.
+        
+        On a conflict the remote version wins. If the remote file does not
+        exist the local file is left as it is (the next push creates it).
+        
+        Args:
+            local_file_path: Local CSV file
             
-            if response.status_code in [200, 201]:
-                print(f"✅ Successfully uploaded {len(csv_data)} rows to {self.file_path}")
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            status, content = self.fetch_content(if_changed=os.path.exists(local_file_path))
+            if status == 304:
+                print(f"✅ {self.file_path} unchanged on GitHub")
                 return True
-            else:
-                print(f"❌ Error uploading file: {response.status_code} - {response.text}")
+            if status == 404:
+                print(f"📄 File {self.file_path} not found in repository, keeping local data")
+                return True
+            if status != 200:
                 return False
-                
+            self._merge_into_local(local_file_path, content, prefer_local=False)
+            print(f"✅ Synced {self.file_path} from GitHub to {local_file_path}")
+            return True
         except Exception as e:
-            print(f"❌ Exception uploading file: {e}")
+            # The cached ETag may no longer describe the base; fetch in full next time
+            self._etag = None
+            print(f"❌ Exception merging from GitHub: {e}")
+            return False
+    
+    def merge_to_github(self, local_file_path: str) -> bool:
+        """
+        Push: merge in any remote changes made since the last sync, then
+        upload the merged rows.
+        
+        If another instance commits between our fetch and our PUT, the new
+        remote content is merged and the PUT retried (up to MERGE_ATTEMPTS).
+        On a conflict the local version wins.
+        
+        Args:
+            local_file_path: Local CSV file
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            for attempt in range(MERGE_ATTEMPTS):
+                status, remote = self.fetch_content(if_changed=True)
+                if status not in (200, 304, 404):
+                    return False
+                content = self._merge_into_local(local_file_path, remote, prefer_local=True)
+                if self._sha == git_blob_sha(content):
+                    print(f"✅ {self.file_path} already up to date on GitHub")
+                    return True
+                try:
+                    if not self.put_content(content, retry_conflict=False):
+                        return False
+                except SHAConflict:
+                    print(f"🔁 {self.file_path} changed on GitHub while pushing, merging again")
+                    continue
+                with atomic_open(local_file_path + '.base', 'wb') as file:
+                    file.write(content)
+                print(f"✅ Successfully uploaded merged {self.file_path}")
+                return True
+            print(f"❌ Gave up pushing {self.file_path} after {MERGE_ATTEMPTS} conflicting attempts")
+            return False
+        except Exception as e:
+            self._etag = None
+            print(f"❌ Exception merging to GitHub: {e}")
             return False
     
     def sync_from_github(self, local_file_path: str) -> bool:
@@ -155,22 +483,19 @@ class GitHubCSVSync:
         Returns:
             True if successful, False otherwise
         """
+        if self.key_fields:
+            return self.merge_from_github(local_file_path)
         try:
-            csv_data = self.download_csv()
-            
-            # Save to local file
-            with open(local_file_path, 'w', newline='', encoding='utf-8') as file:
-                if csv_data:
-                    fieldnames = csv_data[0].keys()
-                    writer = csv.DictWriter(file, fieldnames=fieldnames)
-                    writer.writeheader()
-                    writer.writerows(csv_data)
-                else:
-                    # Create empty file with headers
-                    writer = csv.DictWriter(file, fieldnames=['user_id', 'habits'])
-                    writer.writeheader()
-            
-            print(f"✅ Synced {len(csv_data)} rows from GitHub to {local_file_path}")
+            reader = self.download_csv(if_changed=os.path.exists(local_file_path))
+            if reader is None:
+                # Local copy already matches the remote file
+                return True
+            
+            # Stream the rows into the local file (atomically, so a crash can't leave it truncated)
+            with atomic_open(local_file_path, 'w', newline='', encoding='utf-8') as file:
+                count = write_csv(file, reader, getattr(reader, 'fieldnames', None))
+            
+            print(f"✅ Synced {count} rows from GitHub to {local_file_path}")
             return True
             
         except Exception as e:
@@ -187,21 +512,383 @@ class GitHubCSVSync:
         Returns:
             True if successful, False otherwise
         """
+        if self.key_fields:
+            return self.merge_to_github(local_file_path)
         try:
-            # Read local file
-            csv_data = []
-            if os.path.exists(local_file_path):
-                with open(local_file_path, 'r', newline='', encoding='utf-8') as file:
-                    reader = csv.DictReader(file)
-                    csv_data = list(reader)
+            # Serialize the local file as it is read, then upload outside the lock
+            content = None
+            with locked(local_file_path):
+                if os.path.exists(local_file_path):
+                    with open(local_file_path, 'r', newline='', encoding='utf-8') as file:
+                        reader = csv.DictReader(file)
+                        content, count = csv_bytes(reader, reader.fieldnames)
+            if content is None:
+                return self.upload_csv([])
             
             # Upload to GitHub
-            return self.upload_csv(csv_data)
+            if self.put_content(content):
+                print(f"✅ Successfully uploaded {count} rows to {self.file_path}")
+                return True
+            return False
             
         except Exception as e:
             print(f"❌ Exception syncing to GitHub: {e}")
             return False
 
+def git_blob_sha(content: bytes) -> str:
+    """SHA GitHub assigns to a blob with this content (lets us skip no-op uploads)."""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+class GitHubShardedCSVSync:
+    MANIFEST_NAME = "manifest.json"
+    
+    def __init__(self, repo_owner: str, repo_name: str, shard_dir: str, github_token: str, branch: str = "main",
+                 session: Optional["requests.Session"] = None,
+                 apply_changes: Optional[Callable[[List[dict], set], None]] = None,
+                 api_url: str = DEFAULT_API_URL):
+        """
+        Sync habit_tracking.csv to GitHub as one CSV file per month.
+        
+        Remote layout:
+            <shard_dir>/manifest.json  - {"shards": {"2025-07": {"sha": ..., "rows": n}}}
+            <shard_dir>/2025-07.csv    - check-ins dated July 2025
+        
+        Because the local tracking file is append-only, only the months that
+        appear in rows appended since the last successful sync are rebuilt,
+        and a shard is uploaded only if it differs from the last synced version.
+        
+        Each month is three-way merged like GitHubCSVSync does with whole files,
+        against the shard as of the last sync (kept in
+        <local file>.months.base/<month>.csv): a pull merges the changed
+        shards into the local rows, and a push whose shard changed remotely
+        merges the remote rows in before uploading again.
+        
+        Args:
+            repo_owner: GitHub username or organization name
+            repo_name: Repository name
+            shard_dir: Directory for the shards in the repository (e.g., "data/habit_tracking")
+            github_token: GitHub personal access token
+            branch: Branch name (default: "main")
+            session: HTTP session to use (default: the shared pooled session)
+            apply_changes: Called with (the merged rows that differ from the
+                local ones, their keys as (date, user_id, habit)) to bring
+                local state up to date after a merge; if None the merged
+                months are rewritten in the local file
+            api_url: Base URL of the GitHub REST API
+        """
+        self.repo_owner = repo_owner
+        self.repo_name = repo_name
+        self.shard_dir = shard_dir.rstrip('/')
+        self.github_token = github_token
+        self.branch = branch
+        self.session = session or get_session()
+        self.base_url = api_url.rstrip('/')
+        self.apply_changes = apply_changes
+        # Remote path -> GitHubCSVSync (one per shard, plus the manifest)
+        self._files = {}
+        # Last manifest we downloaded or uploaded (None = unknown)
+        self._manifest = None
+        # month -> {(date, user_id, habit): status} for recently touched months
+        self._shard_rows = {}
+        # (st_dev, st_ino) and size of the local file at the last successful push
+        self._synced_file_id = None
+        self._synced_offset = 0
+    
+    def _file(self, name: str) -> GitHubCSVSync:
+        path = f"{self.shard_dir}/{name}"
+        if path not in self._files:
+            sync = GitHubCSVSync(self.repo_owner, self.repo_name, path, self.github_token,
+                                 self.branch, session=self.session, api_url=self.base_url)
+            self._files[path] = sync
+        return self._files[path]
+    
+    def _load_manifest(self, if_changed: bool = False) -> Optional[dict]:
+        """Fetch the manifest; returns None if it has not changed since the last fetch."""
+        status, content = self._file(self.MANIFEST_NAME).fetch_content(if_changed)
+        if status == 304:
+            return None
+        if status == 404:
+            return {"shards": {}}
+        if status != 200:
+            raise RuntimeError(f"could not fetch {self.shard_dir}/{self.MANIFEST_NAME} ({status})")
+        return json.loads(content.decode('utf-8'))
+    
+    @staticmethod
+    def _parse_rows(lines, months: Optional[set] = None) -> Dict[str, dict]:
+        """Group tracking rows by month, last row per (date, user_id, habit) winning."""
+        shards = {}
+        for row in csv.reader(lines):
+            if len(row) != len(TRACKING_FIELDS) or row[0] == 'date':
+                continue
+            date, user_id, habit, status = row
+            month = date[:7]
+            if months is not None and month not in months:
+                continue
+            shards.setdefault(month, {})[(date, user_id, habit)] = status
+        return shards
+    
+    @classmethod
+    def _shard_content_rows(cls, content: Optional[bytes]) -> dict:
+        """{(date, user_id, habit): status} of a shard's CSV content."""
+        rows = {}
+        if content:
+            for month_rows in cls._parse_rows(StringIO(content.decode('utf-8'), newline='')).values():
+                rows.update(month_rows)
+        return rows
+    
+    @staticmethod
+    def _serialize(rows: dict) -> bytes:
+        output = StringIO()
+        writer = csv.writer(output)
+        writer.writerow(TRACKING_FIELDS)
+        for (date, user_id, habit), status in sorted(rows.items()):
+            writer.writerow([date, user_id, habit, status])
+        return output.getvalue().encode('utf-8')
+    
+    @staticmethod
+    def _base_path(local_file_path: str, month: str) -> str:
+        return os.path.join(local_file_path + '.months.base', f"{month}.csv")
+    
+    def _read_base(self, local_file_path: str, month: str) -> Optional[bytes]:
+        """The month's shard as of the last sync, or None if it was never synced."""
+        try:
+            with open(self._base_path(local_file_path, month), 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+    
+    def _write_base(self, local_file_path: str, month: str, content: bytes):
+        path = self._base_path(local_file_path, month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_open(path, 'wb') as file:
+            file.write(content)
+    
+    def _merge_months(self, local_file_path: str, remote: Dict[str, bytes], prefer_local: bool) -> Dict[str, dict]:
+        """
+        Three-way merge remote shards into the local rows of their months,
+        bring the local data up to date and record the shards as the new bases.
+        
+        Args:
+            local_file_path: Local path to habit_tracking.csv
+            remote: month -> remote shard content
+            prefer_local: Conflict resolution, see merge_rows
+        
+        Returns:
+            month -> merged {(date, user_id, habit): status}
+        """
+        months = set(remote)
+        with locked(local_file_path):
+            local = {}
+            if os.path.exists(local_file_path):
+                with open(local_file_path, 'r', newline='', encoding='utf-8') as file:
+                    local = self._parse_rows(file, months=months)
+            merged = {}
+            changed = set()
+            for month, content in remote.items():
+                ours = local.get(month, {})
+                merged[month] = merge_rows(self._shard_content_rows(self._read_base(local_file_path, month)), ours,
+                                           self._shard_content_rows(content), prefer_local)
+                changed.update(key for key, status in merged[month].items() if ours.get(key) != status)
+            if changed and self.apply_changes is None:
+                # Rewrite the file with the merged months in place of their local rows
+                tmp_path = local_file_path + '.download'
+                with open(tmp_path, 'w', newline='', encoding='utf-8') as out:
+                    writer = csv.writer(out)
+                    writer.writerow(TRACKING_FIELDS)
+                    if os.path.exists(local_file_path):
+                        with open(local_file_path, 'r', newline='', encoding='utf-8') as file:
+                            for row in csv.reader(file):
+                                if row and row[0] != 'date' and row[0][:7] not in months:
+                                    writer.writerow(row)
+                    for month in sorted(merged):
+                        for (date, user_id, habit), status in sorted(merged[month].items()):
+                            writer.writerow([date, user_id, habit, status])
+                replace_file(tmp_path, local_file_path)
+                # A new file: the next push parses it again
+                self._synced_file_id = None
+        
+        # Outside the file lock: the callback goes through the store, which takes its own locks
+        if changed and self.apply_changes is not None:
+            self.apply_changes([{'date': date, 'user_id': user_id, 'habit': habit, 'status': status}
+                                for rows in merged.values()
+                                for (date, user_id, habit), status in rows.items()
+                                if (date, user_id, habit) in changed], changed)
+        if changed:
+            print(f"🔀 Merged {len(changed)} changed row(s) from {len(remote)} shard(s) of {self.shard_dir}")
+        for month, content in remote.items():
+            self._write_base(local_file_path, month, content)
+        return merged
+    
+    def _touched_shards(self, local_file_path: str, st: os.stat_result) -> set:
+        """Bring _shard_rows up to date and return the months changed since the last push."""
+        file_id = (st.st_dev, st.st_ino)
+        if file_id != self._synced_file_id or st.st_size < self._synced_offset:
+            # First push, or the file was replaced (compaction, pull): check every month
+            with open(local_file_path, 'r', newline='', encoding='utf-8') as file:
+                self._shard_rows = self._parse_rows(file)
+            return set(self._shard_rows)
+        
+        with open(local_file_path, 'rb') as file:
+            file.seek(self._synced_offset)
+            tail = file.read(st.st_size - self._synced_offset).decode('utf-8')
+        appended = self._parse_rows(StringIO(tail, newline=''))
+        
+        missing = set(appended) - set(self._shard_rows)
+        if missing:
+            # Months we evicted from memory: rebuild them from the whole file
+            with open(local_file_path, 'r', newline='', encoding='utf-8') as file:
+                self._shard_rows.update(self._parse_rows(file, months=missing))
+        for month, rows in appended.items():
+            if month not in missing:
+                self._shard_rows[month].update(rows)
+        return set(appended)
+    
+    def _push_shard(self, local_file_path: str, month: str) -> Optional[bool]:
+        """
+        Upload one month, merging in remote changes on a SHA conflict.
+        
+        Returns:
+            True if uploaded, False if the remote already had it, None on failure
+        """
+        shard = self._file(f"{month}.csv")
+        for attempt in range(MERGE_ATTEMPTS):
+            content = self._serialize(self._shard_rows[month])
+            base = self._read_base(local_file_path, month)
+            if base == content:
+                return False
+            if base is None:
+                # Never synced: merge with the remote shard first, if there is one
+                status, remote = shard.fetch_content()
+                if status == 200:
+                    self._shard_rows[month] = self._merge_months(local_file_path, {month: remote},
+                                                                 prefer_local=True)[month]
+                    continue
+                if status != 404:
+                    return None
+            # The PUT only succeeds if the remote shard is still the one we merged with
+            shard._sha = git_blob_sha(base) if base is not None else None
+            try:
+                if not shard.put_content(content, retry_conflict=False):
+                    return None
+            except SHAConflict:
+                print(f"🔁 Shard {month} changed on GitHub while pushing, merging again")
+                status, remote = shard.fetch_content()
+                if status not in (200, 404):
+                    return None
+                self._shard_rows[month] = self._merge_months(local_file_path, {month: remote or b""},
+                                                             prefer_local=True)[month]
+                continue
+            self._write_base(local_file_path, month, content)
+            return True
+        print(f"❌ Gave up pushing shard {month} after {MERGE_ATTEMPTS} conflicting attempts")
+        return None
+    
+    def _push_manifest(self, updates: Dict[str, dict]) -> bool:
+        """Record updated shard entries in the remote manifest, keeping entries other replicas added."""
+        manifest_file = self._file(self.MANIFEST_NAME)
+        for attempt in range(MERGE_ATTEMPTS):
+            self._manifest.setdefault("shards", {}).update(updates)
+            manifest = json.dumps(self._manifest, indent=2, sort_keys=True).encode('utf-8')
+            try:
+                return manifest_file.put_content(manifest, retry_conflict=False)
+            except SHAConflict:
+                self._manifest = self._load_manifest()
+        print(f"❌ Gave up pushing {self.shard_dir}/{self.MANIFEST_NAME} after {MERGE_ATTEMPTS} conflicting attempts")
+        return False
+    
+    def sync_to_github(self, local_file_path: str) -> bool:
+        """
+        Upload the monthly shards touched since the last push, then the manifest.
+        
+        Args:
+            local_file_path: Local path to habit_tracking.csv
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            if not os.path.exists(local_file_path):
+                return True
+            if self._manifest is None:
+                self._manifest = self._load_manifest() or {"shards": {}}
+            
+            with locked(local_file_path):
+                st = os.stat(local_file_path)
+                touched = self._touched_shards(local_file_path, st)
+            shards = self._manifest.setdefault("shards", {})
+            
+            uploaded = 0
+            updates = {}
+            for month in sorted(touched):
+                pushed = self._push_shard(local_file_path, month)
+                if pushed is None:
+                    return False
+                uploaded += pushed
+                sha = git_blob_sha(self._serialize(self._shard_rows[month]))
+                if shards.get(month, {}).get("sha") != sha:
+                    updates[month] = {"sha": sha, "rows": len(self._shard_rows[month])}
+            
+            if updates and not self._push_manifest(updates):
+                return False
+            
+            # Unless a merge rewrote the file meanwhile, the next push only reads what gets appended
+            current = os.stat(local_file_path)
+            replaced = (current.st_dev, current.st_ino) != (st.st_dev, st.st_ino)
+            self._synced_file_id = None if replaced else (st.st_dev, st.st_ino)
+            self._synced_offset = st.st_size
+            # Only keep the months that are likely to be touched again
+            self._shard_rows = {month: self._shard_rows[month] for month in touched}
+            print(f"✅ Uploaded {uploaded} of {len(touched)} touched shard(s) to {self.shard_dir}")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Exception syncing shards to GitHub: {e}")
+            return False
+    
+    def sync_from_github(self, local_file_path: str) -> bool:
+        """
+        Download the shards that changed since the last sync and merge them
+        into the local rows of their months.
+        
+        Local rows the remote doesn't have (e.g. check-ins not pushed before a
+        restart) are kept; on a conflict the remote version wins. If the
+        remote has no manifest yet the local file is left untouched and will
+        be uploaded by the next push.
+        
+        Args:
+            local_file_path: Local path to habit_tracking.csv
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            manifest = self._load_manifest(if_changed=os.path.exists(local_file_path) and self._manifest is not None)
+            if manifest is None:
+                print(f"✅ {self.shard_dir} unchanged on GitHub")
+                return True
+            
+            changed = {}
+            for month, info in sorted(manifest.get("shards", {}).items()):
+                base = self._read_base(local_file_path, month)
+                if base is not None and git_blob_sha(base) == info["sha"]:
+                    continue
+                status, content = self._file(f"{month}.csv").fetch_content()
+                if status != 200:
+                    print(f"❌ Could not download shard {month} ({status})")
+                    return False
+                changed[month] = content
+            
+            if changed:
+                self._merge_months(local_file_path, changed, prefer_local=False)
+            
+            self._manifest = manifest
+            print(f"✅ Synced {len(changed)} changed shard(s) from {self.shard_dir} to {local_file_path}")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Exception syncing shards from GitHub: {e}")
+            return False
+
 # Environment variable configuration
 def get_github_config() -> Dict[str, str]:
     """
@@ -215,7 +902,13 @@ def get_github_config() -> Dict[str, str]:
         "repo_name": os.getenv("GITHUB_REPO_NAME", ""),
         "github_token": os.getenv("GITHUB_TOKEN", ""),
         "file_path": os.getenv("GITHUB_FILE_PATH", "data/habit_list.csv"),
-        "branch": os.getenv("GITHUB_BRANCH", "main")
+        "tracking_file_path": os.getenv("GITHUB_FILE_PATH_TRACKING", "data/habit_tracking.csv"),
+        "settings_file_path": os.getenv("GITHUB_FILE_PATH_SETTINGS", "data/user_settings.csv"),
+        "aliases_file_path": os.getenv("GITHUB_FILE_PATH_ALIASES", "data/habit_aliases.csv"),
+        "tracking_layout": os.getenv("GITHUB_TRACKING_LAYOUT", "file"),
+        "tracking_shard_dir": os.getenv("GITHUB_TRACKING_SHARD_DIR", "data/habit_tracking"),
+        "branch": os.getenv("GITHUB_BRANCH", "main"),
+        "api_url": os.getenv("GITHUB_API_URL", DEFAULT_API_URL)
     }
 
 def create_github_sync() -> Optional[GitHubCSVSync]:
@@ -236,5 +929,6 @@ def create_github_sync() -> Optional[GitHubCSVSync]:
         repo_name=config["repo_name"],
         file_path=config["file_path"],
         github_token=config["github_token"],
-        branch=config["branch"]
+        branch=config["branch"],
+        api_url=config["api_url"]
     ) 
\ No newline at end of file
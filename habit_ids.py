@@ -0,0 +1,136 @@
+# habit_ids.py
+#
+# Stable habit ids. Check-ins are recorded under the habit's name, and a
+# name maps to an id derived from the name with emoji, punctuation and case
+# dropped, so "Drink water 💦" in the habit list and "Drink water 💧" in the
+# tracking log are one habit. habit_aliases.csv pins a name to another id
+# when that isn't enough:
+#   - after /rename, the new name keeps the old id, so the history recorded
+#     under the old name carries over without rewriting the tracking log
+#   - when two of a user's habits would get the same id ("run 🏃", "run 🚴")
+#
+# Derived ids need no coordination, so every replica and shard gives a
+# habit the same id; only the aliases are stored (and synced).
+import csv
+import io
+import os
+import threading
+import unicodedata
+import zlib
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from atomic_io import append_journaled, atomic_open, recover_journal
+
+HABIT_ALIAS_FIELDS = ['user_id', 'name', 'habit_id']
+
+
+@lru_cache(maxsize=65536)
+def habit_key(name: str) -> str:
+    """name reduced to casefolded letters and digits ('Drink water 💦' -> 'drink water'); all-emoji names stay as they are."""
+    words = ''.join(ch if unicodedata.category(ch)[0] in 'LN' else ' ' for ch in name).casefold().split()
+    return ' '.join(words) or name
+
+
+@lru_cache(maxsize=65536)
+def derived_id(name: str) -> int:
+    return zlib.crc32(habit_key(name).encode('utf-8')) & 0x7fffffff
+
+
+class HabitIds:
+    def __init__(self, aliases_file: str):
+        """
+        Maps (user, habit name) to a stable integer habit id.
+
+        Args:
+            aliases_file: Path to habit_aliases.csv (user_id, name, habit_id);
+                the last row for a (user_id, name) wins
+        """
+        self.aliases_file = aliases_file
+        self._lock = threading.RLock()
+        # (user_id, name) -> habit id
+        self._aliases: Dict[Tuple[str, str], int] = {}
+
+    def load(self) -> bool:
+        """(Re)read the alias table; False if it doesn't exist yet (see migrate)."""
+        with self._lock:
+            recover_journal(self.aliases_file)
+            if not os.path.exists(self.aliases_file):
+                self._aliases = {}
+                return False
+            aliases = {}
+            with open(self.aliases_file, 'r', newline='', encoding='utf-8') as file:
+                for row in csv.DictReader(file):
+                    aliases[(row['user_id'], row['name'])] = int(row['habit_id'])
+            self._aliases = aliases
+            return True
+
+    def signature(self) -> Optional[list]:
+        """Size and mtime of the alias table, which changes whenever an alias is added."""
+        if not os.path.exists(self.aliases_file):
+            return None
+        st = os.stat(self.aliases_file)
+        return [st.st_size, st.st_mtime_ns]
+
+    def habit_id(self, user_id, name: str) -> int:
+        alias = self._aliases.get((str(user_id), name))
+        return derived_id(name) if alias is None else alias
+
+    def assign(self, user_id, names: List[str]) -> List[int]:
+        """Ids for a habit list, pinning names to fresh ids where two of them would share one."""
+        user_id = str(user_id)
+        with self._lock:
+            ids, added = [], []
+            for name in names:
+                habit_id = self.habit_id(user_id, name)
+                while habit_id in ids:
+                    habit_id = (habit_id + 1) & 0x7fffffff
+                if habit_id != self.habit_id(user_id, name):
+                    added.append((user_id, name, habit_id))
+                ids.append(habit_id)
+            self._add(added)
+            return ids
+
+    def rename(self, user_id, old_name: str, new_name: str) -> int:
+        """Give new_name the id of old_name (an O(1) alias, the tracking log is untouched); returns the id."""
+        user_id = str(user_id)
+        with self._lock:
+            habit_id = self.habit_id(user_id, old_name)
+            if self.habit_id(user_id, new_name) != habit_id:
+                self._add([(user_id, new_name, habit_id)])
+            return habit_id
+
+    def _add(self, rows: List[tuple]):
+        if not rows:
+            return
+        text = io.StringIO()
+        writer = csv.writer(text)
+        if not os.path.exists(self.aliases_file) or os.path.getsize(self.aliases_file) == 0:
+            writer.writerow(HABIT_ALIAS_FIELDS)
+        writer.writerows(rows)
+        append_journaled(self.aliases_file, text.getvalue().encode('utf-8'))
+        for user_id, name, habit_id in rows:
+            self._aliases[(user_id, name)] = habit_id
+
+    def migrate(self, habits_by_user: Dict[str, List[str]], tracked: Iterable[Tuple[str, str]]):
+        """
+        One-time setup of the alias table from existing data: pin look-alike
+        habits on the same list apart and report the name variants in the
+        tracking log that now count as the habit on the list.
+
+        Args:
+            habits_by_user: user_id -> habit list
+            tracked: Distinct (user_id, habit name) pairs from the tracking log
+        """
+        with self._lock:
+            with atomic_open(self.aliases_file, 'w', newline='', encoding='utf-8') as file:
+                csv.writer(file).writerow(HABIT_ALIAS_FIELDS)
+            self._aliases = {}
+            for user_id, habits in habits_by_user.items():
+                self.assign(user_id, habits)
+            listed = {(user_id, self.habit_id(user_id, habit)): habit
+                      for user_id, habits in habits_by_user.items() for habit in habits}
+            merged = sum(1 for user_id, name in tracked
+                         if listed.get((user_id, self.habit_id(user_id, name)), name) != name)
+        print(f"🪪 Habit ids set up: {merged} tracked name variant(s) merged into listed habits, "
+              f"{len(self._aliases)} look-alike habit(s) kept apart")
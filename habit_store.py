@@ -0,0 +1,395 @@
+# habit_store.py
+import csv
+import io
+import os
+import threading
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+from atomic_io import append_journaled, atomic_open, locked, recover_journal, replace_file
+from metrics import timed
+
+HABIT_LIST_FIELDS = ['user_id', 'habit']
+TRACKING_FIELDS = ['date', 'user_id', 'habit', 'status']
+USER_SETTINGS_FIELDS = ['user_id', 'timezone', 'checkin_time']
+CONVERSATION_STATE_FIELDS = ['user_id', 'state', 'expires_at']
+
+# Compact the tracking log once superseded rows exceed both of these
+COMPACT_MIN_SUPERSEDED = 1000
+COMPACT_SUPERSEDED_RATIO = 0.25
+
+
+class HabitStore:
+    def __init__(self, habit_list_file: str, tracking_file: str, settings_file: Optional[str] = None,
+                 state_file: Optional[str] = None):
+        """
+        In-memory, indexed view of the habit list and tracking CSV files.
+
+        The CSV files stay the durable format: a write returns once it is on
+        disk, and load() rebuilds the indexes from disk. Rewrites are atomic
+        (temp file + fsync + rename) and appends go through a write-ahead
+        journal, all under the file's lock (see atomic_io).
+
+        habit_list.csv is rewritten from a snapshot of the lists taken under
+        the store lock but written outside it, so saving habits doesn't hold
+        up lookups; saves that queue up behind a rewrite share the next one.
+
+        habit_tracking.csv is an append-only log: an upsert appends a row and
+        the last row for a (date, user_id, habit) wins when the log is read.
+        Superseded rows are folded away by a background compaction.
+
+        Args:
+            habit_list_file: Path to habit_list.csv
+            tracking_file: Path to habit_tracking.csv
+            settings_file: Path to user_settings.csv (per-user timezone and
+                check-in time); settings are kept in memory only if None
+            state_file: Path to the conversation state CSV (see
+                state_store.StateStore); kept in memory only if None
+        """
+        self.habit_list_file = habit_list_file
+        self.tracking_file = tracking_file
+        self.settings_file = settings_file
+        self.state_file = state_file
+        self._lock = threading.RLock()
+        # user_id -> [habit, ...] in the order the user entered them (lists are replaced, never mutated)
+        self._habits_by_user: Dict[str, List[str]] = {}
+        # Bumped on every habit list change; the last version written to habit_list.csv
+        self._habits_version = 0
+        self._habits_written = 0
+        # Serialises habit_list.csv rewrites (taken before, never inside, self._lock)
+        self._habit_list_lock = threading.Lock()
+        # user_id -> {'timezone': ..., 'checkin_time': 'HH:MM'}
+        self._settings_by_user: Dict[str, Dict[str, str]] = {}
+        # (date, user_id) -> {habit: status}
+        self._checkins_by_day: Dict[tuple, Dict[str, str]] = {}
+        # user_id -> {date, ...}
+        self._dates_by_user: Dict[str, set] = {}
+        # user_id -> (state, expires_at); reread when another process changes the file
+        self._states: Dict[str, Tuple[str, float]] = {}
+        self._states_signature = None
+        # Rows in the tracking log that a later row overrides
+        self._superseded = 0
+        self._live = 0
+        self._compacting = False
+
+    def load(self):
+        """(Re)build all indexes from the CSV files."""
+        with self._lock:
+            self._habits_by_user = {}
+            self._settings_by_user = {}
+            self._checkins_by_day = {}
+            self._dates_by_user = {}
+            self._states = {}
+            self._states_signature = None
+            self._superseded = 0
+            self._live = 0
+
+            if os.path.exists(self.habit_list_file):
+                with open(self.habit_list_file, 'r', newline='', encoding='utf-8') as file, \
+                        timed("habitbot_file_read_seconds", file=os.path.basename(self.habit_list_file)):
+                    for row in csv.DictReader(file):
+                        self._habits_by_user.setdefault(row['user_id'], []).append(row['habit'])
+
+            if self.settings_file and os.path.exists(self.settings_file):
+                with open(self.settings_file, 'r', newline='', encoding='utf-8') as file, \
+                        timed("habitbot_file_read_seconds", file=os.path.basename(self.settings_file)):
+                    for row in csv.DictReader(file):
+                        self._settings_by_user[row['user_id']] = {
+                            'timezone': row['timezone'],
+                            'checkin_time': row['checkin_time'],
+                        }
+
+            self._load_tracking()
+
+    def _load_tracking(self):
+        recover_journal(self.tracking_file)
+        if os.path.exists(self.tracking_file):
+            with open(self.tracking_file, 'r', newline='', encoding='utf-8') as file, \
+                    timed("habitbot_file_read_seconds", file=os.path.basename(self.tracking_file)):
+                for row in csv.DictReader(file):
+                    if self._index_checkin(row['date'], row['user_id'], row['habit'], row['status']):
+                        self._superseded += 1
+
+    def export_csv(self):
+        """Bring the CSV files up to date (nothing to do: they are the durable format)."""
+
+    def tracking_signature(self) -> Optional[list]:
+        """Value that changes whenever the tracking data changes (size and mtime of the log)."""
+        if not os.path.exists(self.tracking_file):
+            return None
+        st = os.stat(self.tracking_file)
+        return [st.st_size, st.st_mtime_ns]
+
+    def _index_checkin(self, date: str, user_id: str, habit: str, status: str) -> bool:
+        """Index one check-in; returns True if it replaced an existing one."""
+        statuses = self._checkins_by_day.setdefault((date, user_id), {})
+        replaced = habit in statuses
+        if not replaced:
+            self._live += 1
+        statuses[habit] = status
+        self._dates_by_user.setdefault(user_id, set()).add(date)
+        return replaced
+
+    # Habit list
+
+    def get_habits(self, user_id) -> List[str]:
+        """Return a copy of the user's habits (empty list if none)."""
+        with self._lock:
+            return list(self._habits_by_user.get(str(user_id), []))
+
+    def users(self) -> List[str]:
+        """Return the ids (as strings) of every user with at least one habit."""
+        with self._lock:
+            return list(self._habits_by_user)
+
+    def set_habits(self, user_id, habits: List[str]):
+        """Replace a user's habits; returns once habit_list.csv holds the change."""
+        with self._lock:
+            user_id = str(user_id)
+            self._habits_by_user.pop(user_id, None)
+            if habits:
+                self._habits_by_user[user_id] = list(habits)
+            self._habits_version += 1
+            version = self._habits_version
+        self._write_habit_list(version)
+
+    def _write_habit_list(self, version: int):
+        """Rewrite habit_list.csv unless a rewrite since then already covered version."""
+        with self._habit_list_lock:
+            with self._lock:
+                if self._habits_written >= version:
+                    return
+                version = self._habits_version
+                snapshot = list(self._habits_by_user.items())
+            with atomic_open(self.habit_list_file, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(HABIT_LIST_FIELDS)
+                for user_id, habits in snapshot:
+                    for habit in habits:
+                        writer.writerow([user_id, habit])
+            self._habits_written = version
+
+    # User settings
+
+    def get_settings(self, user_id) -> Optional[Dict[str, str]]:
+        """Return the user's {'timezone', 'checkin_time'} or None if never set."""
+        with self._lock:
+            settings = self._settings_by_user.get(str(user_id))
+            return dict(settings) if settings else None
+
+    def set_settings(self, user_id, timezone: str, checkin_time: str):
+        """Store the user's timezone and HH:MM check-in time and rewrite user_settings.csv."""
+        with self._lock:
+            self._settings_by_user[str(user_id)] = {'timezone': timezone, 'checkin_time': checkin_time}
+            if self.settings_file:
+                self._write_settings()
+
+    def _write_settings(self):
+        with atomic_open(self.settings_file, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(USER_SETTINGS_FIELDS)
+            for user_id, settings in self._settings_by_user.items():
+                writer.writerow([user_id, settings['timezone'], settings['checkin_time']])
+
+    # Conversation state
+
+    def _refresh_states(self):
+        """Reread the state file if it changed since we last read or wrote it."""
+        if not self.state_file:
+            return
+        try:
+            st = os.stat(self.state_file)
+        except FileNotFoundError:
+            self._states, self._states_signature = {}, None
+            return
+        signature = (st.st_size, st.st_mtime_ns)
+        if signature == self._states_signature:
+            return
+        states = {}
+        with open(self.state_file, 'r', newline='', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                states[row['user_id']] = (row['state'], float(row['expires_at']))
+        self._states, self._states_signature = states, signature
+
+    def _write_states(self):
+        if not self.state_file:
+            return
+        with atomic_open(self.state_file, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(CONVERSATION_STATE_FIELDS)
+            for user_id, (state, expires_at) in self._states.items():
+                writer.writerow([user_id, state, repr(expires_at)])
+        st = os.stat(self.state_file)
+        self._states_signature = (st.st_size, st.st_mtime_ns)
+
+    def get_state(self, user_id) -> Optional[Tuple[str, float]]:
+        """Return (state, expires_at) of the user's conversation state, or None."""
+        with self._lock:
+            self._refresh_states()
+            return self._states.get(str(user_id))
+
+    def set_state(self, user_id, state: str, expires_at: float, now: float, max_entries: int):
+        """Store a conversation state, dropping expired ones and the soonest to expire beyond max_entries."""
+        with self._lock, locked(self.state_file) if self.state_file else nullcontext():
+            self._refresh_states()
+            self._states[str(user_id)] = (state, expires_at)
+            states = {user: entry for user, entry in self._states.items() if entry[1] > now}
+            if len(states) > max_entries:
+                states = dict(sorted(states.items(), key=lambda item: item[1][1])[-max_entries:])
+            self._states = states
+            self._write_states()
+
+    def delete_state(self, user_id):
+        with self._lock, locked(self.state_file) if self.state_file else nullcontext():
+            self._refresh_states()
+            if self._states.pop(str(user_id), None) is not None:
+                self._write_states()
+
+    def count_states(self, now: float) -> int:
+        with self._lock:
+            self._refresh_states()
+            return sum(1 for _, expires_at in self._states.values() if expires_at > now)
+
+    # Tracking
+
+    def has_checkin(self, user_id, date: str) -> bool:
+        """True if the user has at least one check-in recorded for date."""
+        with self._lock:
+            return (date, str(user_id)) in self._checkins_by_day
+
+    def get_checkins(self, user_id, date: str) -> Dict[str, str]:
+        """Return {habit: status} for one user and day."""
+        with self._lock:
+            return dict(self._checkins_by_day.get((date, str(user_id)), {}))
+
+    def get_status(self, date: str, user_id, habit: str) -> Optional[str]:
+        with self._lock:
+            return self._checkins_by_day.get((date, str(user_id)), {}).get(habit)
+
+    def upsert_checkin(self, date: str, user_id, habit: str, status: str):
+        """Insert or update one check-in by appending it to the tracking log."""
+        self.upsert_checkins(date, user_id, [(habit, status)])
+
+    def upsert_checkins(self, date: str, user_id, statuses):
+        """
+        Insert or update several check-ins for one user and day in one append.
+
+        Args:
+            date: Check-in date (YYYY-MM-DD)
+            user_id: Telegram user id
+            statuses: Iterable of (habit, status) pairs
+        """
+        self.upsert_rows([(date, user_id, habit, status) for habit, status in statuses])
+
+    def upsert_rows(self, rows):
+        """Insert or update (date, user_id, habit, status) rows in one append."""
+        rows = [(date, str(user_id), habit, status) for date, user_id, habit, status in rows]
+        if not rows:
+            return
+        with self._lock:
+            self._append_tracking(rows)
+            for date, user_id, habit, status in rows:
+                if self._index_checkin(date, user_id, habit, status):
+                    self._superseded += 1
+            self._maybe_compact()
+
+    def habit_history(self, user_id, habit: str) -> List[tuple]:
+        """Return [(date, status), ...] for one user's habit in date order."""
+        user_id = str(user_id)
+        with self._lock:
+            history = []
+            for date in sorted(self._dates_by_user.get(user_id, ())):
+                status = self._checkins_by_day[(date, user_id)].get(habit)
+                if status is not None:
+                    history.append((date, status))
+            return history
+
+    def iter_checkins(self):
+        """Yield (date, user_id, habit, status) for every stored check-in."""
+        with self._lock:
+            items = list(self._checkins_by_day.items())
+        for (date, user_id), statuses in items:
+            for habit, status in statuses.items():
+                yield date, user_id, habit, status
+
+    def iter_user_checkins(self, user_id, start: Optional[str] = None, end: Optional[str] = None):
+        """
+        Yield (date, habit, status) for one user's check-ins in date order.
+
+        Args:
+            user_id: Telegram user id
+            start: First date to include (YYYY-MM-DD), unbounded if None
+            end: Last date to include (YYYY-MM-DD), unbounded if None
+        """
+        user_id = str(user_id)
+        with self._lock:
+            dates = sorted(date for date in self._dates_by_user.get(user_id, ())
+                           if (start is None or date >= start) and (end is None or date <= end))
+        for date in dates:
+            # One day at a time, so a long export doesn't hold the lock
+            with self._lock:
+                statuses = list(self._checkins_by_day.get((date, user_id), {}).items())
+            for habit, status in statuses:
+                yield date, habit, status
+
+    def _append_tracking(self, rows):
+        """Append rows to the tracking log, creating it with a header if needed."""
+        text = io.StringIO()
+        writer = csv.writer(text)
+        with locked(self.tracking_file):
+            new_file = not os.path.exists(self.tracking_file) or os.path.getsize(self.tracking_file) == 0
+            if new_file:
+                writer.writerow(TRACKING_FIELDS)
+            else:
+                # Guard against a hand-edited file without a trailing newline
+                with open(self.tracking_file, 'rb') as file:
+                    file.seek(-1, os.SEEK_END)
+                    if file.read(1) != b'\n':
+                        text.write('\r\n')
+            writer.writerows(rows)
+            append_journaled(self.tracking_file, text.getvalue().encode('utf-8'))
+
+    # Compaction
+
+    def _maybe_compact(self):
+        if self._compacting or self._superseded < COMPACT_MIN_SUPERSEDED:
+            return
+        if self._superseded < self._live * COMPACT_SUPERSEDED_RATIO:
+            return
+        self._compacting = True
+        threading.Thread(target=self.compact, name="tracking-compaction", daemon=True).start()
+
+    def compact(self):
+        """
+        Rewrite the tracking log without superseded rows.
+
+        The resolved rows are written to a temporary file without holding the
+        lock; rows appended meanwhile are copied over before the atomic rename.
+        """
+        try:
+            with self._lock:
+                if not os.path.exists(self.tracking_file):
+                    return
+                rows = list(self.iter_checkins())
+                offset = os.path.getsize(self.tracking_file)
+                superseded = self._superseded
+
+            tmp_path = self.tracking_file + '.compact'
+            with open(tmp_path, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(TRACKING_FIELDS)
+                writer.writerows(rows)
+
+            with self._lock, locked(self.tracking_file):
+                with open(self.tracking_file, 'rb') as src, open(tmp_path, 'ab') as dst:
+                    src.seek(offset)
+                    tail = src.read()
+                    if tail:
+                        dst.write(tail)
+                replace_file(tmp_path, self.tracking_file)
+                self._superseded -= superseded
+            print(f"🧹 Compacted {self.tracking_file}: dropped {superseded} superseded rows")
+        except Exception as e:
+            print(f"❌ Exception compacting {self.tracking_file}: {e}")
+        finally:
+            self._compacting = False
@@ -1,14 +1,27 @@
 # handlers.py
-from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from telegram import Update, ReplyKeyboardRemove
+from telegram.error import BadRequest
 from telegram.ext import CallbackContext
-from csv_handler import save_user_habits, get_user_habits, append_checkin, has_checkin_today
-from quotes import get_random_quote
-from config import POSITIVE_RESPONSES, NEGATIVE_RESPONSES
+from csv_handler import (save_user_habits, get_user_habits, record_checkins, has_checkin_today,
+                         get_user_settings, save_user_settings, get_user_today, get_state_store)
+from render import (render_checkin, render_checkin_confirmation, render_stats, checkin_inline_keyboard,
+                    decode_callback, habits_version, habit_lines, mask_from_keyboard, TOGGLE, ALL_DONE)
+from config import BROADCAST_WORKERS, BROADCAST_RATE, CONVERSATION_STATE_MAX, ADMIN_USER_IDS
+from response_parser import parse_statuses, DONE, MISSED
+from state_store import StateStore
+from broadcast import Broadcaster
+from scheduler import reschedule_user
 from datetime import datetime
 import re
+import pytz
+import threading
 
-# Store user states
-user_states = {}
+WAITING_FOR_HABITS = "waiting_for_habits"
+
+# Ticked habits of check-ins in progress: "user_id:date" -> bitmask (as a string).
+# Kept in memory only; if it's lost the ticks are read back from the message's keyboard.
+_selections = StateStore(ttl_seconds=2 * 86400, max_entries=CONVERSATION_STATE_MAX)
+_selections_lock = threading.Lock()
 
 def start_command(update: Update, context: CallbackContext):
     user_id = update.effective_user.id
@@ -19,14 +32,15 @@ def start_command(update: Update, context: CallbackContext):
     welcome_message += "Please send me your habits separated by commas.\n"
     welcome_message += "For example: workout, drink water, read 30 minutes, meditate"
     
+    # Set the state first: the user's answer may arrive as soon as the reply is sent
+    get_state_store().set(user_id, WAITING_FOR_HABITS)
     update.message.reply_text(welcome_message)
-    user_states[user_id] = "waiting_for_habits"
 
 def handle_habit_input(update: Update, context: CallbackContext):
     user_id = update.effective_user.id
     user_text = update.message.text.strip()
     
-    if user_id not in user_states or user_states[user_id] != "waiting_for_habits":
+    if get_state_store().get(user_id) != WAITING_FOR_HABITS:
         handle_checkin_response(update, context)
         return
     
@@ -36,56 +50,58 @@ def handle_habit_input(update: Update, context: CallbackContext):
         return
     
     save_user_habits(user_id, habits)
-    del user_states[user_id]
+    reschedule_user(user_id)
+    get_state_store().pop(user_id)
+    settings = get_user_settings(user_id)
     confirm_message = f"Perfect! I've saved your {len(habits)} habit(s):\n\n"
     for i, habit in enumerate(habits, 1):
         confirm_message += f"{i}. {habit}\n"
-    confirm_message += "\nI'll send you daily check-ins at 8:00 AM with motivational quotes! 🌅\n"
-    confirm_message += "You can reply with ✅/❌ or yes/no for each habit."
+    confirm_message += f"\nI'll send you daily check-ins at {settings['checkin_time']} ({settings['timezone']}) with motivational quotes! 🌅\n"
+    confirm_message += "Tap the buttons under the check-in, or reply with ✅/❌ or yes/no for each habit.\n"
+    confirm_message += "Use /schedule to change the time or timezone."
     update.message.reply_text(confirm_message)
 
+def build_daily_checkin(habits, date=None):
+    """Build the daily check-in message and inline keyboard for a list of habits (the habit part is cached per habit list)"""
+    date = date or datetime.now().strftime("%Y-%m-%d")
+    habits = tuple(habits)
+    return render_checkin(habits, date), checkin_inline_keyboard(habits, date)
+
+def prepare_daily_checkins(user_ids=None):
+    """Collect (chat_id, text, reply_markup) for users still due today in their timezone, in one pass"""
+    from csv_handler import get_store
+    store = get_store()
+    messages = []
+    for user_id in (store.users() if user_ids is None else user_ids):
+        habits = store.get_habits(user_id)
+        if not habits:
+            continue
+        today = get_user_today(user_id)
+        if store.has_checkin(user_id, today):
+            continue
+        message, reply_markup = build_daily_checkin(habits, today)
+        messages.append((int(user_id), message, reply_markup))
+    return messages
+
+def send_checkins(bot, user_ids=None):
+    """Broadcast the daily check-in to user_ids (all users if None)"""
+    messages = prepare_daily_checkins(user_ids)
+    if not messages:
+        return
+    broadcaster = Broadcaster(bot, workers=BROADCAST_WORKERS, rate=BROADCAST_RATE)
+    report = broadcaster.send_all(messages)
+    print(f"📨 Daily check-in broadcast: {report}")
+
 def send_daily_checkin(context):
     """Send daily check-in to all users - works with JobQueue context"""
-    from csv_handler import get_all_users
-    user_ids = get_all_users()
-    today = datetime.now().strftime("%Y-%m-%d")
-    
     # Get bot instance from JobQueue context
     bot = context.job.context
-    
-    for user_id in set(user_ids): # dedupe here so each chat_id only gets one message
-        if has_checkin_today(user_id, today):
-            continue
-        habits = get_user_habits(user_id)
-        if not habits:
-            continue
-        quote = get_random_quote()
-        message = f"🌅 Good morning! Time for your daily habit check-in!\n\n"
-        message += f"💭 {quote}\n\n"
-        message += "📋 Your habits for today:\n"
-        for i, habit in enumerate(habits, 1):
-            message += f"{i}. {habit}\n"
-        message += "\nReply with your status for each habit:\n"
-        message += "✅ = Completed\n❌ = Missed\n\n"
-        message += "Example: ✅✅❌ (for 3 habits)"
-        keyboard = [
-            ["✅✅✅", "✅✅❌", "✅❌✅", "✅❌❌"],
-            ["❌✅✅", "❌✅❌", "❌❌✅", "❌❌❌"]
-        ]
-        reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
-        try:
-            bot.send_message(
-                chat_id=user_id,
-                text=message,
-                reply_markup=reply_markup
-            )
-        except Exception as e:
-            print(f"Failed to send message to user {user_id}: {e}")
+    send_checkins(bot)
 
 def handle_checkin_response(update: Update, context: CallbackContext):
     user_id = update.effective_user.id
     user_text = update.message.text.strip()
-    today = datetime.now().strftime("%Y-%m-%d")
+    today = get_user_today(user_id)
     habits = get_user_habits(user_id)
     if not habits:
         update.message.reply_text("You haven't set up your habits yet. Use /start to begin!")
@@ -93,41 +109,75 @@ def handle_checkin_response(update: Update, context: CallbackContext):
     if has_checkin_today(user_id, today):
         update.message.reply_text("You've already checked in today! See you tomorrow! 😊")
         return
-    response_chars = list(user_text.lower())
-    status_emojis = []
-    for char in response_chars:
-        if char in ['✅', 'y', '1', 't'] or 'yes' in char:
-            status_emojis.append('✅')
-        elif char in ['❌', 'n', '0', 'f'] or 'no' in char:
-            status_emojis.append('❌')
-    if len(status_emojis) != len(habits):
+    status_emojis = parse_statuses(user_text)
+    if status_emojis is None or len(status_emojis) != len(habits):
         update.message.reply_text(
             f"Please provide status for all {len(habits)} habits.\n"
             f"Example: {'✅' * len(habits)} or {'❌' * len(habits)}"
         )
         return
-    for habit, status in zip(habits, status_emojis):
-        append_checkin(today, user_id, habit, status)
-    completed = status_emojis.count('✅')
-    total = len(habits)
-    completion_rate = (completed / total) * 100
-    confirmation = f"📊 Daily Check-in Complete!\n\n"
-    for i, (habit, status) in enumerate(zip(habits, status_emojis), 1):
-        confirmation += f"{i}. {habit}: {status}\n"
-    confirmation += f"\n🎯 Completion Rate: {completed}/{total} ({completion_rate:.1f}%)\n\n"
-    if completion_rate == 100:
-        confirmation += "🎉 Perfect! You completed all your habits today!"
-    elif completion_rate >= 80:
-        confirmation += "🌟 Great job! You're doing amazing!"
-    elif completion_rate >= 60:
-        confirmation += "👍 Good progress! Keep it up!"
-    else:
-        confirmation += "💪 Tomorrow is a new day! Don't give up!"
+    record_checkins(today, user_id, zip(habits, status_emojis))
     update.message.reply_text(
-        confirmation,
+        render_checkin_confirmation(tuple(habits), tuple(status_emojis)),
         reply_markup=ReplyKeyboardRemove()
     )
 
+def handle_checkin_callback(update: Update, context: CallbackContext):
+    """Toggle / All done / Save buttons of the daily check-in's inline keyboard"""
+    query = update.callback_query
+    try:
+        op, date, version, index = decode_callback(query.data)
+    except ValueError:
+        query.answer("This check-in has expired. Please reply with ✅/❌ instead.")
+        return
+    user_id = query.from_user.id
+    habits = tuple(get_user_habits(user_id))
+    if not habits or habits_version(habits) != version:
+        query.answer("Your habits have changed since this check-in. Please reply with ✅/❌ instead.",
+                     show_alert=True)
+        return
+    if has_checkin_today(user_id, date):
+        query.answer("You've already checked in for this day! 😊")
+        _remove_keyboard(query)
+        return
+
+    if op == TOGGLE and (index is None or not 0 <= index < len(habits)):
+        query.answer()
+        return
+
+    key = f"{user_id}:{date}"
+    with _selections_lock:
+        selected = _selections.get(key)
+        mask = int(selected) if selected is not None else mask_from_keyboard(query.message.reply_markup)
+        if op == TOGGLE:
+            mask ^= 1 << index
+            _selections.set(key, str(mask))
+        else:
+            if op == ALL_DONE:
+                mask = (1 << len(habits)) - 1
+            _selections.pop(key)
+
+    if op == TOGGLE:
+        query.answer()
+        try:
+            query.edit_message_reply_markup(reply_markup=checkin_inline_keyboard(habits, date, mask))
+        except BadRequest:
+            # "message is not modified" when two taps race; the next tap redraws it
+            pass
+        return
+
+    statuses = tuple(DONE if mask >> i & 1 else MISSED for i in range(len(habits)))
+    record_checkins(date, user_id, zip(habits, statuses))
+    query.answer("Saved ✅")
+    _remove_keyboard(query)
+    query.message.reply_text(render_checkin_confirmation(habits, statuses))
+
+def _remove_keyboard(query):
+    try:
+        query.edit_message_reply_markup(reply_markup=None)
+    except BadRequest:
+        pass
+
 def help_command(update: Update, context: CallbackContext):
     help_text = """
 🤖 Habit Tracker Bot Commands:
@@ -135,12 +185,15 @@ def help_command(update: Update, context: CallbackContext):
 /start - Set up your habits
 /help - Show this help message
 /stats - View your habit statistics
+/rename - Rename a habit, keeping its history and streak
+/schedule - Set your check-in time and timezone
+/export - Download your check-in history (CSV or JSON)
 /sync - Sync data with GitHub
 
 📋 How it works:
 1. Use /start to set your habits
-2. Receive daily check-ins at 8:00 AM
-3. Reply with ✅/❌ for each habit
+2. Receive daily check-ins at your chosen time (8:00 AM by default)
+3. Tap the habits you completed and 💾 Save, or reply with ✅/❌ for each habit
 4. Track your progress over time
 
 💡 Tips:
@@ -152,6 +205,35 @@ def help_command(update: Update, context: CallbackContext):
 """
     update.message.reply_text(help_text)
 
+def schedule_command(update: Update, context: CallbackContext):
+    """Show or change the user's daily check-in time and timezone"""
+    user_id = update.effective_user.id
+    settings = get_user_settings(user_id)
+    
+    if not context.args:
+        update.message.reply_text(
+            f"⏰ Your daily check-in is at {settings['checkin_time']} ({settings['timezone']}).\n\n"
+            "To change it, send /schedule HH:MM [Area/City]\n"
+            "For example: /schedule 07:30 Europe/Paris"
+        )
+        return
+    
+    checkin_time = context.args[0]
+    timezone = context.args[1] if len(context.args) > 1 else settings['timezone']
+    try:
+        parsed = datetime.strptime(checkin_time, "%H:%M")
+    except ValueError:
+        update.message.reply_text("Please give the time as HH:MM, for example: /schedule 07:30")
+        return
+    if timezone not in pytz.all_timezones_set:
+        update.message.reply_text(f"Unknown timezone {timezone}. Use a name like Europe/Paris or America/Toronto.")
+        return
+    
+    checkin_time = parsed.strftime("%H:%M")
+    save_user_settings(user_id, timezone, checkin_time)
+    reschedule_user(user_id)
+    update.message.reply_text(f"✅ Daily check-ins will now arrive at {checkin_time} ({timezone}).")
+
 def stats_command(update: Update, context: CallbackContext):
     """Show user's habit statistics"""
     user_id = update.effective_user.id
@@ -164,24 +246,88 @@ def stats_command(update: Update, context: CallbackContext):
     # Calculate statistics
     from csv_handler import get_user_stats
     stats = get_user_stats(user_id)
+    this_month = get_user_today(user_id)[:7]
     
-    message = "📊 Your Habit Statistics:\n\n"
-    
-    for habit in habits:
-        if habit in stats:
-            habit_stats = stats[habit]
-            total_days = habit_stats['total']
-            completed_days = habit_stats['completed']
-            completion_rate = (completed_days / total_days * 100) if total_days > 0 else 0
-            
-            message += f"🎯 {habit}:\n"
-            message += f"   Completed: {completed_days}/{total_days} days\n"
-            message += f"   Success Rate: {completion_rate:.1f}%\n\n"
-        else:
-            message += f"🎯 {habit}:\n"
-            message += f"   No data yet\n\n"
+    update.message.reply_text(render_stats(habits, stats, this_month))
+
+def rename_command(update: Update, context: CallbackContext):
+    """Rename one of the user's habits; its check-ins and streak carry over"""
+    from csv_handler import rename_user_habit
+    user_id = update.effective_user.id
+    habits = get_user_habits(user_id)
+    
+    if not habits:
+        update.message.reply_text("You haven't set up your habits yet. Use /start to begin!")
+        return
     
-    update.message.reply_text(message)
+    args = list(context.args or [])
+    new_name = ' '.join(args[1:]).strip()
+    if not args or not args[0].isdigit() or not 1 <= int(args[0]) <= len(habits) or not new_name or ',' in new_name:
+        update.message.reply_text(
+            "Send /rename <number> <new name>\n"
+            "For example: /rename 1 drink 2L of water 💧\n\n"
+            f"Your habits:\n{habit_lines(tuple(habits))}"
+        )
+        return
+    
+    old_name = habits[int(args[0]) - 1]
+    if new_name == old_name:
+        update.message.reply_text(f"“{old_name}” already has that name.")
+        return
+    try:
+        rename_user_habit(user_id, old_name, new_name)
+    except ValueError as e:
+        update.message.reply_text(f"⚠️ {e}")
+        return
+    update.message.reply_text(f"✏️ Renamed “{old_name}” to “{new_name}”. Its history and streak carry over.")
+
+EXPORT_USAGE = ("Send /export [csv|json] [from YYYY-MM-DD] [to YYYY-MM-DD]\n"
+                "For example: /export json 2024-01-01 2024-12-31")
+
+def export_command(update: Update, context: CallbackContext):
+    """Send the user's check-in history as gzipped CSV or JSON, streamed from the store"""
+    from export import FORMATS, export_filename, export_parts, iter_export_rows
+    user_id = update.effective_user.id
+    args = list(context.args or [])
+    fmt = args.pop(0).lower() if args and args[0].lower() in FORMATS else 'csv'
+    if len(args) > 2:
+        update.message.reply_text(EXPORT_USAGE)
+        return
+    try:
+        dates = [datetime.strptime(arg, "%Y-%m-%d").strftime("%Y-%m-%d") for arg in args]
+    except ValueError:
+        update.message.reply_text(EXPORT_USAGE)
+        return
+    start, end = (dates + [None, None])[:2]
+    if start and end and start > end:
+        update.message.reply_text(EXPORT_USAGE)
+        return
+    
+    parts = export_parts(iter_export_rows(user_id, start, end), fmt)
+    try:
+        for part, (document, count) in enumerate(parts, 1):
+            if not count and part == 1:
+                update.message.reply_text("📭 No check-ins to export yet." if not args
+                                          else "📭 No check-ins in that date range.")
+                return
+            update.message.reply_document(document=document, filename=export_filename(fmt, start, end, part),
+                                          caption=f"📦 {count} check-in{'s' if count != 1 else ''}"
+                                                  + (f" (part {part})" if part > 1 else ""))
+    finally:
+        parts.close()
+
+def metrics_command(update: Update, context: CallbackContext):
+    """Show a summary of the bot's latency histograms and counters (admins only)"""
+    if update.effective_user.id not in ADMIN_USER_IDS:
+        update.message.reply_text("⛔ /metrics is only available to the bot's admins.")
+        return
+    import metrics
+    text = "📈 Metrics since startup:\n\n" + metrics.summary()
+    # Telegram caps messages at 4096 characters
+    while text:
+        cut = len(text) if len(text) <= 4000 else text.rfind("\n", 0, 4000) + 1 or 4000
+        update.message.reply_text(text[:cut])
+        text = text[cut:]
 
 def sync_command(update: Update, context: CallbackContext):
     """Sync data with GitHub repository"""
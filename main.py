@@ -1,11 +1,19 @@
 # main.py
+import time
+# For the startup report: the imports below are the first phase
+_process_started = time.perf_counter()
 import logging
-from telegram.ext import Updater, CommandHandler, MessageHandler, Filters
-from config import TELEGRAM_TOKEN
-from handlers import start_command, handle_habit_input, help_command, send_daily_checkin, stats_command, sync_command
-from csv_handler import init_github_sync
-from datetime import time
-import pytz
+from telegram.ext import Updater, CommandHandler, MessageHandler, CallbackQueryHandler, Filters
+from config import (TELEGRAM_TOKEN, TELEGRAM_API_URL, DISPATCHER_WORKERS, BOT_MODE, WEBHOOK_LISTEN, WEBHOOK_PORT,
+                    WEBHOOK_PATH, WEBHOOK_URL, WEBHOOK_SECRET, WEBHOOK_WORKERS, METRICS_LISTEN, METRICS_PORT,
+                    DATA_DIR, SHARD_INDEX, SHARD_COUNT, STARTUP_SYNC)
+from handlers import (start_command, handle_habit_input, help_command, send_checkins, stats_command, sync_command,
+                      schedule_command, handle_checkin_callback, metrics_command, export_command,
+                      rename_command)
+from metrics import instrument_handler, set_gauge, start_http_server
+from csv_handler import init_github_sync, get_store, get_aggregates, save_stats_snapshot, shutdown_sync
+from scheduler import init_scheduler
+import os
 
 if not TELEGRAM_TOKEN: #if token is missing
     raise ValueError("TELEGRAM_TOKEN environment variable is missing.") # raise in python triggers exceptions.
@@ -16,46 +24,99 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# (phase, seconds) in startup order
+_startup_phases = []
+
+def _startup_phase(name, since):
+    """Record a startup phase that began at since (perf_counter); returns now."""
+    now = time.perf_counter()
+    _startup_phases.append((name, now - since))
+    set_gauge("habitbot_startup_seconds", now - since, phase=name)
+    return now
+
 def main():
+    phase_started = _startup_phase("imports", _process_started)
     print("🤖 Starting Habit Tracker Bot...")
+    if SHARD_COUNT > 1:
+        print(f"🧩 Shard {SHARD_INDEX + 1}/{SHARD_COUNT}, data in {DATA_DIR or '.'}")
+    if DATA_DIR:
+        os.makedirs(DATA_DIR, exist_ok=True)
+    
+    if METRICS_PORT:
+        start_http_server(METRICS_LISTEN, METRICS_PORT)
     
-    # Initialize GitHub synchronization
-    init_github_sync()
+    # Load habit data into memory once; handlers read from the indexes. This
+    # is the last local snapshot: the bot serves from it while GitHub is pulled
+    get_store()
+    phase_started = _startup_phase("store", phase_started)
+    get_aggregates()
+    phase_started = _startup_phase("stats", phase_started)
+    
+    # Initialize GitHub synchronization (the initial pull runs in the background unless STARTUP_SYNC=blocking)
+    init_github_sync(background=STARTUP_SYNC != "blocking")
+    phase_started = _startup_phase("github", phase_started)
     
     # Create updater and dispatcher
-    updater = Updater(token=TELEGRAM_TOKEN, use_context=True)
+    updater = Updater(token=TELEGRAM_TOKEN, use_context=True, workers=DISPATCHER_WORKERS,
+                      base_url=TELEGRAM_API_URL)
     dp = updater.dispatcher
     
-    # Add command handlers
-    dp.add_handler(CommandHandler("start", start_command))
-    dp.add_handler(CommandHandler("help", help_command))
-    dp.add_handler(CommandHandler("stats", stats_command))
-    dp.add_handler(CommandHandler("sync", sync_command))
+    # Handlers run on the dispatcher's worker threads (run_async); writes are
+    # serialized by the store and per-file locks, so this is safe. Each one is
+    # timed into the habitbot_handler_seconds histogram
+    dp.add_handler(CommandHandler("start", instrument_handler(start_command), run_async=True))
+    dp.add_handler(CommandHandler("help", instrument_handler(help_command), run_async=True))
+    dp.add_handler(CommandHandler("stats", instrument_handler(stats_command), run_async=True))
+    dp.add_handler(CommandHandler("sync", instrument_handler(sync_command), run_async=True))
+    dp.add_handler(CommandHandler("schedule", instrument_handler(schedule_command), run_async=True))
+    dp.add_handler(CommandHandler("metrics", instrument_handler(metrics_command), run_async=True))
+    dp.add_handler(CommandHandler("export", instrument_handler(export_command), run_async=True))
+    dp.add_handler(CommandHandler("rename", instrument_handler(rename_command), run_async=True))
     
     # Add message handler for habit input and check-in responses
-    dp.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_habit_input))
-    
-    # Schedule daily check-in using JobQueue
-    tz = pytz.timezone("America/Toronto")
-    updater.job_queue.run_daily(
-        send_daily_checkin,
-        time=time(hour=8, minute=0, tzinfo=tz),
-        name="Send daily habit check-in to all users",
-        context=updater.bot,
+    dp.add_handler(MessageHandler(Filters.text & ~Filters.command, instrument_handler(handle_habit_input),
+                                  run_async=True))
+    # Buttons of the daily check-in's inline keyboard
+    dp.add_handler(CallbackQueryHandler(instrument_handler(handle_checkin_callback), pattern=r"^[tas][0-9a-f]",
+                                        run_async=True))
+    phase_started = _startup_phase("updater", phase_started)
+    
+    # Schedule per-user check-ins: a heap of next check-in times, drained each minute
+    checkin_scheduler = init_scheduler(lambda user_ids: send_checkins(updater.bot, user_ids))
+    updater.job_queue.run_repeating(
+        checkin_scheduler.tick,
+        interval=60,
+        first=60 - time.time() % 60,  # align ticks to the start of each minute
+        name="Send due habit check-ins",
     )
+    updater.job_queue.run_repeating(save_stats_snapshot, interval=300, name="Save stats snapshot")
+    _startup_phase("scheduler", phase_started)
+    print("⏱️  Startup: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in _startup_phases)
+          + f" - ready in {time.perf_counter() - _process_started:.2f}s")
     
     try:
         print("🚀 Bot is starting...")
         print("📱 Send /start to begin tracking your habits!")
-        print("⏰ Daily check-ins will be sent at 8:00 AM Toronto time")
+        print(f"⏰ Daily check-ins scheduled for {len(checkin_scheduler)} user(s) in their own timezones")
 
         # Start the bot
-        updater.start_polling()
-        updater.idle()
+        if BOT_MODE == "webhook":
+            from webhook import run_webhook
+            run_webhook(updater, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_URL, WEBHOOK_SECRET,
+                        WEBHOOK_WORKERS)
+        else:
+            updater.start_polling()
+            updater.idle()
     except KeyboardInterrupt:
         print("\n🛑 Shutting down bot...")
     except Exception as e:
         print(f"❌ Error: {e}")
+    finally:
+        # Due users are already rescheduled for tomorrow: finish sending today's check-ins
+        checkin_scheduler.stop()
+        save_stats_snapshot()
+        # Don't lose check-ins still waiting in the sync debounce window
+        shutdown_sync()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,229 @@
+# metrics.py
+#
+# In-process counters and latency histograms for the hot paths (file I/O,
+# GitHub requests, handlers, broadcast sends), exposed in the Prometheus text
+# format on a local HTTP endpoint (METRICS_PORT) and summarized by /metrics.
+#
+# Recording is a perf_counter() pair, a bisect over the bucket bounds and a
+# short lock, about a microsecond, so it stays on in production
+# (python benchmark.py metrics measures it).
+import bisect
+import threading
+import time
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+# Histogram bucket upper bounds, in seconds (+Inf is implicit)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# name -> (type, help)
+METRICS = {
+    "habitbot_file_read_seconds": ("histogram", "Time to read a data file into the store"),
+    "habitbot_file_write_seconds": ("histogram", "Time to append to or atomically rewrite a data file"),
+    "habitbot_github_request_seconds": ("histogram", "GitHub API request latency"),
+    "habitbot_handler_seconds": ("histogram", "Time spent in a bot update handler"),
+    "habitbot_handler_errors_total": ("counter", "Handler calls that raised"),
+    "habitbot_broadcast_send_seconds": ("histogram", "sendMessage latency of successful broadcast sends"),
+    "habitbot_broadcast_messages_total": ("counter", "Broadcast messages by outcome"),
+    "habitbot_broadcast_retries_total": ("counter", "Broadcast sends retried after a 429 or network error"),
+    "habitbot_startup_seconds": ("gauge", "Time spent in each startup phase"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'lock')
+
+    def __init__(self):
+        """Cumulative-on-read latency histogram over BUCKETS."""
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(BUCKETS, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self) -> Tuple[list, float]:
+        with self.lock:
+            return list(self.counts), self.sum
+
+    @staticmethod
+    def quantile(counts: list, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (inf if it's in the last one)."""
+        total = sum(counts)
+        rank = q * total
+        seen = 0
+        for bound, count in zip(BUCKETS, counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+_lock = threading.Lock()
+# Counters and gauges
+_counters: Dict[Tuple[str, Labels], float] = {}
+_histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+
+def _key(name: str, labels: dict) -> Tuple[str, Labels]:
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def inc(name: str, amount: float = 1, **labels):
+    """Add amount to a counter."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def set_gauge(name: str, value: float, **labels):
+    """Set a gauge to value."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = value
+
+
+def _histogram(key: Tuple[str, Labels]) -> Histogram:
+    histogram = _histograms.get(key)
+    if histogram is None:
+        with _lock:
+            histogram = _histograms.setdefault(key, Histogram())
+    return histogram
+
+
+def observe(name: str, seconds: float, **labels):
+    """Record one duration in a histogram."""
+    _histogram(_key(name, labels)).observe(seconds)
+
+
+class timed:
+    """Context manager timing its block into a histogram (also when it raises)."""
+    __slots__ = ('key', 'started')
+
+    def __init__(self, name: str, **labels):
+        self.key = _key(name, labels)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        _histogram(self.key).observe(time.perf_counter() - self.started)
+
+
+def instrument_handler(callback):
+    """Wrap a telegram handler callback to record its duration and errors."""
+    name = callback.__name__
+
+    @wraps(callback)
+    def wrapper(update, context):
+        started = time.perf_counter()
+        try:
+            return callback(update, context)
+        except Exception:
+            inc("habitbot_handler_errors_total", handler=name)
+            raise
+        finally:
+            observe("habitbot_handler_seconds", time.perf_counter() - started, handler=name)
+    return wrapper
+
+
+def reset():
+    """Forget everything recorded so far."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(_histograms.items(), key=lambda item: item[0])
+    lines = []
+    described = set()
+
+    def describe(name: str):
+        if name not in described:
+            described.add(name)
+            kind, help_text = METRICS.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in counters:
+        describe(name)
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+    for (name, labels), histogram in histograms:
+        describe(name)
+        counts, total = histogram.snapshot()
+        cumulative = 0
+        for bound, count in zip(BUCKETS, counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels, ('le', f'{bound:g}'))} {cumulative}")
+        cumulative += counts[-1]
+        lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def summary() -> str:
+    """Short human-readable digest: call counts, mean and p50/p99 bucket bounds."""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(_histograms.items(), key=lambda item: item[0])
+    lines = []
+    for (name, labels), histogram in histograms:
+        counts, total = histogram.snapshot()
+        n = sum(counts)
+        if not n:
+            continue
+        label = ",".join(label_value for _, label_value in labels)
+        lines.append(f"{name.replace('habitbot_', '')}[{label}]: {n}× avg {total / n * 1000:.2f} ms, "
+                     f"p50 ≤ {Histogram.quantile(counts, 0.5) * 1000:g} ms, "
+                     f"p99 ≤ {Histogram.quantile(counts, 0.99) * 1000:g} ms")
+    for (name, labels), value in counters:
+        label = ",".join(label_value for _, label_value in labels)
+        lines.append(f"{name.replace('habitbot_', '')}[{label}]: {value:g}")
+    return "\n".join(lines) or "No metrics recorded yet."
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_http_server(listen: str, port: int) -> ThreadingHTTPServer:
+    """Serve GET /metrics on (listen, port) from a daemon thread."""
+    server = ThreadingHTTPServer((listen, port), _MetricsRequestHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"📈 Metrics on http://{listen}:{server.server_port}/metrics")
+    return server
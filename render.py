@@ -0,0 +1,153 @@
+# render.py
+import zlib
+from datetime import date as date_cls
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from quotes import get_random_quote
+
+CHECKIN_HEADER = "🌅 Good morning! Time for your daily habit check-in!\n\n"
+CHECKIN_HABITS_TITLE = "📋 Your habits for today:\n"
+CHECKIN_INSTRUCTIONS = ("\nTap the habits you completed, then 💾 Save (unticked ones count as missed).\n"
+                        "Or reply with your status for each habit: ✅ = Completed, ❌ = Missed\n\n")
+
+# Inline check-in keyboard: callback data is "<op><date ordinal hex>.<habit list version hex>[.<index>]"
+TOGGLE, ALL_DONE, SAVE = 't', 'a', 's'
+UNCHECKED = '⬜'
+# Check-in dates every storage backend can hold (the binary log counts 16-bit days from 1970)
+FIRST_DATE_ORDINAL = date_cls(1970, 1, 1).toordinal()
+LAST_DATE_ORDINAL = date_cls(2149, 6, 6).toordinal()
+
+
+def habits_version(habits: Sequence[str]) -> int:
+    """Short fingerprint of a habit list, so buttons for an old list can be recognised."""
+    return zlib.crc32('\x1f'.join(habits).encode('utf-8')) & 0xffff
+
+
+def encode_callback(op: str, date: str, version: int, index: Optional[int] = None) -> str:
+    data = f"{op}{date_cls.fromisoformat(date).toordinal():x}.{version:x}"
+    return data if index is None else f"{data}.{index}"
+
+
+def decode_callback(data: str) -> Tuple[str, str, int, Optional[int]]:
+    """Inverse of encode_callback: (op, date, version, index or None). Raises ValueError if malformed."""
+    fields = data[1:].split('.')
+    if data[:1] not in (TOGGLE, ALL_DONE, SAVE) or len(fields) not in (2, 3):
+        raise ValueError(f"bad callback data {data!r}")
+    ordinal = int(fields[0], 16)
+    if not FIRST_DATE_ORDINAL <= ordinal <= LAST_DATE_ORDINAL:
+        raise ValueError(f"bad callback data {data!r}")
+    date = date_cls.fromordinal(ordinal).isoformat()
+    index = int(fields[2]) if len(fields) == 3 else None
+    if index is not None and index < 0:
+        raise ValueError(f"bad callback data {data!r}")
+    return data[0], date, int(fields[1], 16), index
+
+
+@lru_cache(maxsize=8192)
+def checkin_inline_keyboard(habits: Tuple[str, ...], date: str, mask: int = 0) -> InlineKeyboardMarkup:
+    """
+    One toggle button per habit plus "All done" and "Save" (memoized).
+
+    Args:
+        habits: The user's habit list
+        date: Check-in date the buttons record for
+        mask: Bit i set if habit i is currently ticked
+    """
+    version = habits_version(habits)
+    rows = [[InlineKeyboardButton(f"{'✅' if mask >> i & 1 else UNCHECKED} {habit}",
+                                  callback_data=encode_callback(TOGGLE, date, version, i))]
+            for i, habit in enumerate(habits)]
+    rows.append([InlineKeyboardButton("✅ All done", callback_data=encode_callback(ALL_DONE, date, version)),
+                 InlineKeyboardButton("💾 Save", callback_data=encode_callback(SAVE, date, version))])
+    return InlineKeyboardMarkup(rows)
+
+
+def mask_from_keyboard(reply_markup) -> int:
+    """Recover the ticked habits from a check-in message's keyboard (when the server-side state is gone)."""
+    mask = 0
+    for row in getattr(reply_markup, 'inline_keyboard', None) or []:
+        for button in row:
+            if button.callback_data and button.callback_data[0] == TOGGLE and button.text.startswith('✅'):
+                mask |= 1 << decode_callback(button.callback_data)[3]
+    return mask
+
+
+@lru_cache(maxsize=None)
+def _example(habit_count: int) -> str:
+    example = ('✅✅❌' * habit_count)[:habit_count]
+    return f"Example: {example} (for {habit_count} habit{'s' if habit_count != 1 else ''})"
+
+
+@lru_cache(maxsize=4096)
+def habit_lines(habits: Tuple[str, ...]) -> str:
+    """'1. habit\\n2. habit\\n...' for a habit list."""
+    return ''.join(f"{i}. {habit}\n" for i, habit in enumerate(habits, 1))
+
+
+@lru_cache(maxsize=8192)
+def _checkin_habits_part(habits: Tuple[str, ...]) -> str:
+    """Everything in the check-in text after the quote, memoized on the habit list."""
+    return ''.join((
+        CHECKIN_HABITS_TITLE,
+        habit_lines(habits),
+        CHECKIN_INSTRUCTIONS,
+        _example(len(habits)),
+    ))
+
+
+def render_checkin(habits: Tuple[str, ...], date: str) -> str:
+    """
+    Daily check-in text for a habit list on a date.
+
+    The habit part is memoized on the habit list, so a user's entry changes
+    as soon as they change their habits; the quote is drawn per message.
+    """
+    return ''.join((CHECKIN_HEADER, f"💭 {get_random_quote()}\n\n", _checkin_habits_part(habits)))
+
+
+@lru_cache(maxsize=4096)
+def render_checkin_confirmation(habits: Tuple[str, ...], statuses: Tuple[str, ...]) -> str:
+    """Reply to a completed check-in, memoized on (habit list, statuses)."""
+    completed = statuses.count('✅')
+    total = len(habits)
+    completion_rate = (completed / total) * 100
+    if completion_rate == 100:
+        encouragement = "🎉 Perfect! You completed all your habits today!"
+    elif completion_rate >= 80:
+        encouragement = "🌟 Great job! You're doing amazing!"
+    elif completion_rate >= 60:
+        encouragement = "👍 Good progress! Keep it up!"
+    else:
+        encouragement = "💪 Tomorrow is a new day! Don't give up!"
+    lines = [f"{i}. {habit}: {status}\n" for i, (habit, status) in enumerate(zip(habits, statuses), 1)]
+    return ''.join((
+        "📊 Daily Check-in Complete!\n\n",
+        *lines,
+        f"\n🎯 Completion Rate: {completed}/{total} ({completion_rate:.1f}%)\n\n",
+        encouragement,
+    ))
+
+
+def render_stats(habits: Sequence[str], stats: Dict[str, Dict], this_month: str) -> str:
+    """/stats reply for a user's habits and their get_user_stats() counters."""
+    parts = ["📊 Your Habit Statistics:\n\n"]
+    for habit in habits:
+        habit_stats = stats.get(habit)
+        if habit_stats is None:
+            parts.append(f"🎯 {habit}:\n   No data yet\n\n")
+            continue
+        total_days = habit_stats['total']
+        completed_days = habit_stats['completed']
+        completion_rate = (completed_days / total_days * 100) if total_days > 0 else 0
+        parts.append(
+            f"🎯 {habit}:\n"
+            f"   Completed: {completed_days}/{total_days} days\n"
+            f"   Success Rate: {completion_rate:.1f}%\n"
+            f"   🔥 Streak: {habit_stats['current_streak']} day(s) (best: {habit_stats['longest_streak']})\n")
+        if habit_stats['month'] == this_month:
+            parts.append(f"   This month: {habit_stats['month_completed']}/{habit_stats['month_total']} days\n")
+        parts.append("\n")
+    return ''.join(parts)
@@ -0,0 +1,57 @@
+# response_parser.py
+import re
+from typing import Iterable, List, Optional
+
+from config import POSITIVE_RESPONSES, NEGATIVE_RESPONSES
+
+DONE = '✅'
+MISSED = '❌'
+
+# Characters allowed between tokens (U+FE0F/U+200D are emoji variation selector/joiner)
+SEPARATORS = ' \t\r\n,;.!|/+&-\ufe0f\u200d'
+
+
+class ResponseParser:
+    def __init__(self, positive: Iterable[str], negative: Iterable[str]):
+        """
+        Single-pass tokenizer for check-in replies like "✅✅❌", "yes yes no",
+        "1,1,0" or "Done / skip ✅".
+
+        One precompiled regex splits the reply into tokens: symbol and digit
+        responses from the vocabularies (longest first, so they may be written
+        back to back), whole runs of letters, and any other non-separator
+        character. Each token is then a single dict lookup; a word or
+        character that isn't in the vocabularies makes the reply invalid
+        ("yess", "maybe").
+
+        Args:
+            positive: Responses meaning the habit was done
+            negative: Responses meaning it was missed
+        """
+        self.statuses = {}
+        for token in negative:
+            self.statuses[token.casefold()] = MISSED
+        for token in positive:
+            self.statuses[token.casefold()] = DONE
+
+        symbols = sorted((token for token in self.statuses if not token.isalpha()), key=len, reverse=True)
+        alternatives = [re.escape(token) for token in symbols]
+        alternatives.append(r"[^\W\d_]+")  # a whole word
+        alternatives.append(rf"[^{re.escape(SEPARATORS)}\s]")  # anything else is invalid
+        self.pattern = re.compile("|".join(alternatives))
+
+    def parse(self, text: str) -> Optional[List[str]]:
+        """Return the reply as a list of ✅/❌, or None if it contains anything else."""
+        lookup = self.statuses.get
+        statuses = [lookup(token) for token in self.pattern.findall(text.casefold())]
+        if None in statuses:
+            return None
+        return statuses
+
+
+_parser = ResponseParser(POSITIVE_RESPONSES, NEGATIVE_RESPONSES)
+
+
+def parse_statuses(text: str) -> Optional[List[str]]:
+    """Parse a check-in reply with the vocabularies from config (see ResponseParser)."""
+    return _parser.parse(text)
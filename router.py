@@ -0,0 +1,226 @@
+# router.py
+#
+# Sharded deployment: one router process receives Telegram's webhook updates
+# and forwards each one to the shard process that owns its user; every shard
+# is a regular bot (main.py in webhook mode) with its own data directory, so
+# it only loads, writes, syncs and schedules check-ins for its own users.
+#
+#   TELEGRAM_TOKEN=... WEBHOOK_URL=https://your-app.example.com python router.py --shards 4
+#
+# Shard i listens on 127.0.0.1:<WEBHOOK_PORT + 1 + i> and keeps its data in
+# <--data-root>/shard-<i>. The number of shards is part of the data layout:
+# changing it moves users between shards, so keep it fixed for a deployment.
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import zlib
+from typing import List, Optional
+
+from webhook import SECRET_TOKEN_HEADER, WebhookRequestHandler, WebhookServer
+
+# Update fields whose object carries the sending user (in "from", or "user" for poll answers)
+USER_FIELDS = ("message", "edited_message", "callback_query", "inline_query", "chosen_inline_result",
+               "shipping_query", "pre_checkout_query", "poll_answer", "my_chat_member", "chat_member",
+               "chat_join_request", "channel_post", "edited_channel_post")
+
+
+def shard_for(user_id, shard_count: int) -> int:
+    """Shard owning user_id; stable across processes and restarts (unlike hash())."""
+    return zlib.crc32(str(user_id).encode()) % shard_count
+
+
+def update_user_id(update: dict) -> Optional[int]:
+    """The user an update belongs to (the chat for channel posts), or None."""
+    for field in USER_FIELDS:
+        body = update.get(field)
+        if body:
+            user = body.get("from") or body.get("user") or body.get("chat")
+            return user.get("id") if user else None
+    return None
+
+
+class RouterRequestHandler(WebhookRequestHandler):
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.split("?", 1)[0] != server.url_path:
+            self._reply(404)
+            return
+        if server.secret_token and self.headers.get(SECRET_TOKEN_HEADER) != server.secret_token:
+            self._reply(403)
+            return
+        try:
+            user_id = update_user_id(json.loads(body))
+        except (ValueError, AttributeError) as e:
+            print(f"⚠️  Ignoring malformed webhook update: {e}")
+            self._reply(400)
+            return
+        shard = shard_for(user_id, len(server.shard_ports)) if user_id is not None else 0
+        # Pass the shard's status on: a failure makes Telegram redeliver the update
+        self._reply(server.forward(shard, body))
+
+
+class ShardRouter(WebhookServer):
+    def __init__(self, address: tuple, shard_ports: List[int], url_path: str, secret_token: Optional[str] = None,
+                 workers: int = 8):
+        """
+        Webhook endpoint that forwards each update, unparsed, to the webhook of
+        the shard owning its user, over keep-alive connections.
+
+        Args:
+            address: (host, port) to bind
+            shard_ports: Local webhook port of each shard, by shard index
+            url_path: Path updates are POSTed to (the shards use the same one)
+            secret_token: Required X-Telegram-Bot-Api-Secret-Token value (optional);
+                forwarded to the shards
+            workers: Maximum number of connections handled at once
+        """
+        self.shard_ports = shard_ports
+        # Per worker thread: shard index -> HTTPConnection
+        self._connections = threading.local()
+        super().__init__(address, None, None, url_path, secret_token, workers)
+        self.RequestHandlerClass = RouterRequestHandler
+
+    def forward(self, shard: int, body: bytes) -> int:
+        """POST body to a shard's webhook; returns its HTTP status (502 if unreachable)."""
+        connections = getattr(self._connections, "by_shard", None)
+        if connections is None:
+            connections = self._connections.by_shard = {}
+        headers = {"Content-Type": "application/json"}
+        if self.secret_token:
+            headers[SECRET_TOKEN_HEADER] = self.secret_token
+        for attempt in range(2):
+            connection = connections.get(shard)
+            reused = connection is not None
+            if connection is None:
+                connection = connections[shard] = http.client.HTTPConnection(
+                    "127.0.0.1", self.shard_ports[shard], timeout=30)
+            try:
+                connection.request("POST", self.url_path, body, headers)
+                response = connection.getresponse()
+                response.read()
+                return response.status
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                del connections[shard]
+                # Retry only if the shard cannot have processed the update: the connection
+                # was refused, or it closed an idle keep-alive connection before reading it.
+                # After a timeout it may already have, and a retry would apply it twice.
+                unsent = isinstance(e, ConnectionRefusedError) or (
+                    reused and isinstance(e, (http.client.RemoteDisconnected, BrokenPipeError)))
+                if attempt or not unsent:
+                    print(f"❌ Shard {shard} unreachable: {e}")
+                    return 502
+        return 502
+
+
+def shard_env(index: int, count: int, port: int, data_dir: str) -> dict:
+    """Environment for shard index: its own data directory, webhook port and GitHub paths."""
+    from github_synch import get_github_config
+
+    env = dict(os.environ, SHARD_INDEX=str(index), SHARD_COUNT=str(count), DATA_DIR=data_dir,
+               BOT_MODE="webhook", WEBHOOK_LISTEN="127.0.0.1", WEBHOOK_PORT=str(port),
+               # The router owns the public webhook registration
+               WEBHOOK_URL="")
+    # Telegram's rate limit is per bot, so the shards split it
+    env["BROADCAST_RATE"] = str(float(os.getenv("BROADCAST_RATE", "25")) / count)
+    if os.getenv("METRICS_PORT", "0") != "0":
+        env["METRICS_PORT"] = str(int(os.environ["METRICS_PORT"]) + index)
+    # Each shard syncs its own copy of the files: <dir>/shard-<i>/<file>
+    github = get_github_config()
+    for variable, key in (("GITHUB_FILE_PATH", "file_path"), ("GITHUB_FILE_PATH_TRACKING", "tracking_file_path"),
+                          ("GITHUB_FILE_PATH_SETTINGS", "settings_file_path"),
+                          ("GITHUB_FILE_PATH_ALIASES", "aliases_file_path")):
+        directory, name = os.path.split(github[key])
+        env[variable] = "/".join(part for part in (directory, f"shard-{index}", name) if part)
+    env["GITHUB_TRACKING_SHARD_DIR"] = f"{github['tracking_shard_dir'].rstrip('/')}/shard-{index}"
+    return env
+
+
+def wait_for_shards(ports: List[int], processes: List[subprocess.Popen], timeout: float):
+    """Block until every shard answers its health check."""
+    deadline = time.monotonic() + timeout
+    for index, port in enumerate(ports):
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=2).read()
+                break
+            except OSError:
+                if processes[index].poll() is not None:
+                    raise RuntimeError(f"shard {index} exited with code {processes[index].returncode}")
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"shard {index} did not come up on port {port}")
+                time.sleep(0.2)
+
+
+def main():
+    from config import (TELEGRAM_TOKEN, TELEGRAM_API_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_URL,
+                        WEBHOOK_SECRET, WEBHOOK_WORKERS)
+
+    parser = argparse.ArgumentParser(description="Run the bot as N shard processes behind a webhook router")
+    parser.add_argument("--shards", type=int, default=int(os.getenv("SHARD_COUNT", "2")))
+    parser.add_argument("--data-root", default=os.getenv("SHARD_DATA_ROOT", "shards"),
+                        help="Shard i keeps its data in <data-root>/shard-<i>")
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    if not TELEGRAM_TOKEN:
+        raise ValueError("TELEGRAM_TOKEN environment variable is missing.")
+
+    url_path = "/" + WEBHOOK_PATH.strip("/")
+    ports = [WEBHOOK_PORT + 1 + index for index in range(args.shards)]
+    main_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    processes = []
+    for index, port in enumerate(ports):
+        data_dir = os.path.join(args.data_root, f"shard-{index}")
+        os.makedirs(data_dir, exist_ok=True)
+        # Own session: Ctrl-C reaches only the router, which stops the shards in order
+        processes.append(subprocess.Popen([sys.executable, main_script],
+                                          env=shard_env(index, args.shards, port, data_dir),
+                                          start_new_session=True))
+    print(f"🧩 Started {args.shards} shard(s) on ports {ports[0]}-{ports[-1]}, data in {args.data_root}/")
+
+    server = None
+    try:
+        wait_for_shards(ports, processes, args.startup_timeout)
+        server = ShardRouter((WEBHOOK_LISTEN, WEBHOOK_PORT), ports, url_path, WEBHOOK_SECRET or None,
+                             WEBHOOK_WORKERS)
+        if WEBHOOK_URL:
+            from telegram import Bot
+            Bot(TELEGRAM_TOKEN, base_url=TELEGRAM_API_URL).set_webhook(
+                url=WEBHOOK_URL.rstrip("/") + url_path, secret_token=WEBHOOK_SECRET or None,
+                max_connections=WEBHOOK_WORKERS)
+            print(f"🔗 Webhook registered at {WEBHOOK_URL.rstrip('/')}{url_path}")
+        threading.Thread(target=server.serve_forever, name="router", daemon=True).start()
+        print(f"🌐 Routing updates on {WEBHOOK_LISTEN}:{server.server_port}{url_path}")
+
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stop.set())
+        while not stop.wait(1):
+            for index, process in enumerate(processes):
+                if process.poll() is not None:
+                    print(f"❌ Shard {index} exited with code {process.returncode}, shutting down")
+                    stop.set()
+    finally:
+        # Finish forwarding first, then let each shard drain its own queue
+        if server is not None:
+            print("🛑 Draining router...")
+            server.drain()
+        for process in processes:
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+        for process in processes:
+            process.wait()
+        print("✅ All shards stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,159 @@
 # scheduler.py
-# This file is no longer used - we now use the built-in JobQueue scheduler from python-telegram-bot
-# The daily check-in is scheduled directly in main.py using updater.job_queue.run_daily()
+import heapq
+import threading
+import time as time_module
+from datetime import datetime, time, timedelta
+from typing import Callable, List, Optional
 
-# Legacy file - kept for reference but not used 
\ No newline at end of file
+import pytz
+
+# The scheduler driving the per-user check-ins (set by main via init_scheduler)
+checkin_scheduler = None
+
+
+def next_fire_time(timezone: str, checkin_time: str, after: float) -> float:
+    """
+    Return the first timestamp strictly after `after` at which the local
+    wall-clock time in `timezone` is `checkin_time` (HH:MM).
+    """
+    tz = pytz.timezone(timezone)
+    hour, minute = (int(part) for part in checkin_time.split(':'))
+    local_now = datetime.fromtimestamp(after, tz)
+    day = local_now.date()
+    while True:
+        candidate = tz.localize(datetime.combine(day, time(hour, minute))).timestamp()
+        if candidate > after:
+            return candidate
+        day += timedelta(days=1)
+
+
+class CheckinScheduler:
+    def __init__(self, send_batch: Callable[[List[int]], None]):
+        """
+        Min-heap of per-user check-in times, drained once a minute.
+
+        Each user has one live heap entry holding the timestamp of their next
+        check-in. Changing a user's settings pushes a new entry and bumps the
+        user's version, so the old entry is discarded lazily when popped.
+        Scheduling one more user is a single O(log n) heap push.
+
+        The (rate-limited) sending runs on a separate thread, so tick() only
+        pops the due users and returns; stop() lets it finish on shutdown.
+
+        Args:
+            send_batch: Called on the sender thread with the user ids that are due
+        """
+        self.send_batch = send_batch
+        self._heap = []
+        # user_id -> (version, timezone, checkin_time)
+        self._entries = {}
+        self._lock = threading.Lock()
+        # Due users waiting for the sender thread; batches queued behind a long broadcast are merged
+        self._outbox = []
+        self._outbox_cond = threading.Condition()
+        self._sender = None
+        self._stopping = False
+
+    def schedule(self, user_id: int, timezone: str, checkin_time: str, now: Optional[float] = None):
+        """(Re)schedule a user's daily check-in at checkin_time in timezone."""
+        now = time_module.time() if now is None else now
+        fire_at = next_fire_time(timezone, checkin_time, now)
+        with self._lock:
+            version = self._entries.get(user_id, (0,))[0] + 1
+            self._entries[user_id] = (version, timezone, checkin_time)
+            heapq.heappush(self._heap, (fire_at, user_id, version))
+
+    def unschedule(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def pop_due(self, now: Optional[float] = None) -> List[int]:
+        """Remove and return the users due at or before now, scheduling their next day."""
+        now = time_module.time() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, user_id, version = heapq.heappop(self._heap)
+                entry = self._entries.get(user_id)
+                if entry is None or entry[0] != version:
+                    continue  # superseded by a later schedule() or unscheduled
+                due.append(user_id)
+                _, timezone, checkin_time = entry
+                heapq.heappush(self._heap, (next_fire_time(timezone, checkin_time, now), user_id, version))
+        return due
+
+    def tick(self, context=None):
+        """JobQueue callback: hand the check-ins that have come due since the last tick to the sender thread."""
+        due = self.pop_due()
+        if not due:
+            return
+        with self._outbox_cond:
+            if not self._stopping:
+                self._outbox.extend(due)
+                if self._sender is None:
+                    self._sender = threading.Thread(target=self._send_loop, name="checkin-sender")
+                    self._sender.start()
+                self._outbox_cond.notify()
+                return
+        # After stop() there is no sender thread left to hand them to
+        self._send(due)
+
+    def _send_loop(self):
+        # One broadcast at a time, so overlapping ticks don't exceed the rate limit together
+        while True:
+            with self._outbox_cond:
+                while not self._outbox and not self._stopping:
+                    self._outbox_cond.wait()
+                if not self._outbox:
+                    return
+                due, self._outbox = self._outbox, []
+            self._send(due)
+
+    def _send(self, due: List[int]):
+        try:
+            self.send_batch(due)
+        except Exception as e:
+            print(f"❌ Exception sending check-ins to {len(due)} user(s): {e}")
+
+    def stop(self):
+        """
+        Send the check-ins already handed to the sender thread, then stop it.
+
+        Their users have been rescheduled for the next day, so dropping them
+        on shutdown would skip their check-in for today.
+        """
+        with self._outbox_cond:
+            self._stopping = True
+            self._outbox_cond.notify()
+            sender, queued = self._sender, len(self._outbox)
+        if queued:
+            print(f"📨 Sending {queued} queued check-in(s) before shutting down")
+        if sender is not None:
+            sender.join()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def init_scheduler(send_batch: Callable[[List[int]], None]) -> CheckinScheduler:
+    """Create the process-wide scheduler and schedule every known user."""
+    global checkin_scheduler
+    from csv_handler import get_all_users
+
+    checkin_scheduler = CheckinScheduler(send_batch)
+    for user_id in get_all_users():
+        reschedule_user(user_id)
+    return checkin_scheduler
+
+
+def reschedule_user(user_id: int):
+    """Pick up a user's current habits and settings (no-op before init_scheduler)."""
+    from csv_handler import get_user_habits, get_user_settings
+
+    if checkin_scheduler is None:
+        return
+    if not get_user_habits(user_id):
+        checkin_scheduler.unschedule(user_id)
+        return
+    settings = get_user_settings(user_id)
+    checkin_scheduler.schedule(user_id, settings['timezone'], settings['checkin_time'])
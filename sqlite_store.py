@@ -0,0 +1,350 @@
+# sqlite_store.py
+import csv
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from atomic_io import atomic_open
+from metrics import timed
+from habit_store import HABIT_LIST_FIELDS, TRACKING_FIELDS, USER_SETTINGS_FIELDS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS habits (
+    user_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    habit TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS habits_user ON habits (user_id, position);
+
+CREATE TABLE IF NOT EXISTS checkins (
+    date TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    habit TEXT NOT NULL,
+    status TEXT NOT NULL,
+    PRIMARY KEY (date, user_id, habit)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS checkins_user_habit ON checkins (user_id, habit, date);
+
+CREATE TABLE IF NOT EXISTS user_settings (
+    user_id TEXT PRIMARY KEY,
+    timezone TEXT NOT NULL,
+    checkin_time TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS conversation_state (
+    user_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS conversation_state_expiry ON conversation_state (expires_at);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SQLiteHabitStore:
+    def __init__(self, db_file: str, habit_list_file: str, tracking_file: str, settings_file: Optional[str] = None):
+        """
+        HabitStore backed by an embedded SQLite database in WAL mode.
+
+        Offers the same methods as habit_store.HabitStore. The CSV files are
+        the interchange format: load() imports any CSV file that changed since
+        the last import or export (e.g. after a pull from GitHub) and
+        export_csv() writes them back out before a push.
+
+        Each thread gets its own connection; writes use BEGIN IMMEDIATE
+        transactions, so concurrent handler threads are serialised by SQLite.
+
+        Args:
+            db_file: Path to the SQLite database
+            habit_list_file: Path to habit_list.csv
+            tracking_file: Path to habit_tracking.csv
+            settings_file: Path to user_settings.csv (optional)
+        """
+        self.db_file = db_file
+        self.habit_list_file = habit_list_file
+        self.tracking_file = tracking_file
+        self.settings_file = settings_file
+        self._local = threading.local()
+        # Connection used by export_csv only: its PRAGMA data_version changes
+        # exactly when another connection committed since it last looked
+        self._export_conn = None
+        self._export_lock = threading.Lock()
+        self._exported_version = None
+
+    # Connections and transactions
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self):
+        """Run the block in one write transaction."""
+        conn = self._conn()
+        with timed("habitbot_file_write_seconds", file=os.path.basename(self.db_file), op="transaction"):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _get_meta(self, conn, key: str) -> Optional[str]:
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, conn, key: str, value):
+        conn.execute("INSERT INTO meta (key, value) VALUES (?, ?) "
+                     "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, str(value)))
+
+    def _bump_tracking_version(self, conn):
+        version = int(self._get_meta(conn, 'tracking_version') or 0) + 1
+        self._set_meta(conn, 'tracking_version', version)
+
+    # CSV import / export
+
+    @staticmethod
+    def _file_signature(path: Optional[str]) -> str:
+        if not path or not os.path.exists(path):
+            return ''
+        st = os.stat(path)
+        return f"{st.st_size}:{st.st_mtime_ns}"
+
+    def load(self):
+        """Create the schema and import every CSV file that changed since it was last seen."""
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        with self._write() as conn:
+            for name, path, importer in (
+                ('habit_list', self.habit_list_file, self._import_habits),
+                ('tracking', self.tracking_file, self._import_tracking),
+                ('settings', self.settings_file, self._import_settings),
+            ):
+                signature = self._file_signature(path)
+                if signature and signature != self._get_meta(conn, f'csv:{name}'):
+                    with open(path, 'r', newline='', encoding='utf-8') as file, \
+                            timed("habitbot_file_read_seconds", file=os.path.basename(path)):
+                        count = importer(conn, csv.DictReader(file))
+                    self._set_meta(conn, f'csv:{name}', signature)
+                    print(f"📥 Imported {count} changed rows from {path} into {self.db_file}")
+
+    # The importers only write rows that differ from the database, without
+    # clearing the tables first: a write committed after the CSV files were
+    # exported must not be wiped by importing them again.
+
+    def _import_habits(self, conn, rows) -> int:
+        """Replace the habit lists that differ; lists of users missing from the file are kept."""
+        imported = {}
+        for row in rows:
+            imported.setdefault(row['user_id'], []).append(row['habit'])
+        current = {}
+        for user_id, habit in conn.execute("SELECT user_id, habit FROM habits ORDER BY user_id, position"):
+            current.setdefault(user_id, []).append(habit)
+        count = 0
+        for user_id, habits in imported.items():
+            if current.get(user_id) != habits:
+                conn.execute("DELETE FROM habits WHERE user_id = ?", (user_id,))
+                conn.executemany("INSERT INTO habits (user_id, position, habit) VALUES (?, ?, ?)",
+                                 ((user_id, position, habit) for position, habit in enumerate(habits)))
+                count += len(habits)
+        return count
+
+    def _import_tracking(self, conn, rows) -> int:
+        """Upsert check-ins (check-ins are never deleted)."""
+        changes = conn.total_changes
+        # Later rows win, like the append-only CSV log
+        conn.executemany(
+            "INSERT INTO checkins (date, user_id, habit, status) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(date, user_id, habit) DO UPDATE SET status = excluded.status "
+            "WHERE status != excluded.status",
+            ((row['date'], row['user_id'], row['habit'], row['status']) for row in rows))
+        count = conn.total_changes - changes
+        if count:
+            self._bump_tracking_version(conn)
+        return count
+
+    def _import_settings(self, conn, rows) -> int:
+        changes = conn.total_changes
+        conn.executemany(
+            "INSERT INTO user_settings (user_id, timezone, checkin_time) VALUES (?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET timezone = excluded.timezone, checkin_time = excluded.checkin_time "
+            "WHERE timezone != excluded.timezone OR checkin_time != excluded.checkin_time",
+            ((row['user_id'], row['timezone'], row['checkin_time']) for row in rows))
+        return conn.total_changes - changes
+
+    def export_csv(self):
+        """
+        Write the database back to the CSV files (used before pushing them to
+        GitHub); a no-op if nothing was committed since the last export.
+        """
+        exports = [
+            ('habit_list', self.habit_list_file, HABIT_LIST_FIELDS,
+             "SELECT user_id, habit FROM habits ORDER BY rowid"),
+            ('tracking', self.tracking_file, TRACKING_FIELDS,
+             "SELECT date, user_id, habit, status FROM checkins ORDER BY date, user_id, habit"),
+            ('settings', self.settings_file, USER_SETTINGS_FIELDS,
+             "SELECT user_id, timezone, checkin_time FROM user_settings ORDER BY user_id"),
+        ]
+        exports = [export for export in exports if export[1]]
+        with self._export_lock:
+            if self._export_conn is None:
+                self._export_conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None,
+                                                    check_same_thread=False)
+            conn = self._export_conn
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._exported_version and all(
+                    self._file_signature(path) == self._get_meta(conn, f'csv:{name}') for name, path, _, _ in exports):
+                return
+            # One read transaction, so the three files are a consistent snapshot;
+            # in WAL mode it doesn't block writers
+            signatures = {}
+            conn.execute("BEGIN")
+            try:
+                for name, path, fields, query in exports:
+                    with atomic_open(path, 'w', newline='', encoding='utf-8') as file:
+                        writer = csv.writer(file)
+                        writer.writerow(fields)
+                        writer.writerows(conn.execute(query))
+                    signatures[name] = self._file_signature(path)
+            finally:
+                conn.execute("COMMIT")
+            # Committed on the export connection, so it doesn't count as a change
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for name, signature in signatures.items():
+                    self._set_meta(conn, f'csv:{name}', signature)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            self._exported_version = version
+
+    def tracking_signature(self) -> Optional[list]:
+        """Value that changes whenever the tracking data changes."""
+        return ['sqlite', int(self._get_meta(self._conn(), 'tracking_version') or 0)]
+
+    # Habit list
+
+    def get_habits(self, user_id) -> List[str]:
+        rows = self._conn().execute(
+            "SELECT habit FROM habits WHERE user_id = ? ORDER BY position", (str(user_id),))
+        return [habit for (habit,) in rows]
+
+    def users(self) -> List[str]:
+        rows = self._conn().execute("SELECT user_id FROM habits GROUP BY user_id ORDER BY MIN(rowid)")
+        return [user_id for (user_id,) in rows]
+
+    def set_habits(self, user_id, habits: List[str]):
+        user_id = str(user_id)
+        with self._write() as conn:
+            conn.execute("DELETE FROM habits WHERE user_id = ?", (user_id,))
+            conn.executemany("INSERT INTO habits (user_id, position, habit) VALUES (?, ?, ?)",
+                             [(user_id, position, habit) for position, habit in enumerate(habits)])
+
+    # User settings
+
+    def get_settings(self, user_id) -> Optional[Dict[str, str]]:
+        row = self._conn().execute(
+            "SELECT timezone, checkin_time FROM user_settings WHERE user_id = ?", (str(user_id),)).fetchone()
+        return {'timezone': row[0], 'checkin_time': row[1]} if row else None
+
+    def set_settings(self, user_id, timezone: str, checkin_time: str):
+        with self._write() as conn:
+            conn.execute("INSERT OR REPLACE INTO user_settings (user_id, timezone, checkin_time) VALUES (?, ?, ?)",
+                         (str(user_id), timezone, checkin_time))
+
+    # Conversation state
+
+    def get_state(self, user_id) -> Optional[Tuple[str, float]]:
+        row = self._conn().execute(
+            "SELECT state, expires_at FROM conversation_state WHERE user_id = ?", (str(user_id),)).fetchone()
+        return tuple(row) if row else None
+
+    def set_state(self, user_id, state: str, expires_at: float, now: float, max_entries: int):
+        with self._write() as conn:
+            conn.execute("INSERT OR REPLACE INTO conversation_state (user_id, state, expires_at) VALUES (?, ?, ?)",
+                         (str(user_id), state, expires_at))
+            conn.execute("DELETE FROM conversation_state WHERE expires_at <= ?", (now,))
+            conn.execute("DELETE FROM conversation_state WHERE user_id IN ("
+                         "SELECT user_id FROM conversation_state ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                         (max_entries,))
+
+    def delete_state(self, user_id):
+        with self._write() as conn:
+            conn.execute("DELETE FROM conversation_state WHERE user_id = ?", (str(user_id),))
+
+    def count_states(self, now: float) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM conversation_state WHERE expires_at > ?", (now,)).fetchone()[0]
+
+    # Tracking
+
+    def has_checkin(self, user_id, date: str) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM checkins WHERE date = ? AND user_id = ? LIMIT 1", (date, str(user_id))).fetchone()
+        return row is not None
+
+    def get_checkins(self, user_id, date: str) -> Dict[str, str]:
+        rows = self._conn().execute(
+            "SELECT habit, status FROM checkins WHERE date = ? AND user_id = ?", (date, str(user_id)))
+        return dict(rows)
+
+    def get_status(self, date: str, user_id, habit: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT status FROM checkins WHERE date = ? AND user_id = ? AND habit = ?",
+            (date, str(user_id), habit)).fetchone()
+        return row[0] if row else None
+
+    def upsert_checkin(self, date: str, user_id, habit: str, status: str):
+        self.upsert_checkins(date, user_id, [(habit, status)])
+
+    def upsert_checkins(self, date: str, user_id, statuses):
+        """Insert or update several check-ins for one user and day in one transaction."""
+        self.upsert_rows([(date, user_id, habit, status) for habit, status in statuses])
+
+    def upsert_rows(self, rows):
+        """Insert or update (date, user_id, habit, status) rows in one transaction."""
+        rows = [(date, str(user_id), habit, status) for date, user_id, habit, status in rows]
+        if not rows:
+            return
+        with self._write() as conn:
+            conn.executemany(
+                "INSERT INTO checkins (date, user_id, habit, status) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(date, user_id, habit) DO UPDATE SET status = excluded.status", rows)
+            self._bump_tracking_version(conn)
+
+    def habit_history(self, user_id, habit: str) -> List[tuple]:
+        rows = self._conn().execute(
+            "SELECT date, status FROM checkins WHERE user_id = ? AND habit = ? ORDER BY date",
+            (str(user_id), habit))
+        return rows.fetchall()
+
+    def iter_checkins(self):
+        """Yield (date, user_id, habit, status) for every stored check-in."""
+        # A dedicated connection so callers may interleave other queries
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        try:
+            yield from conn.execute("SELECT date, user_id, habit, status FROM checkins")
+        finally:
+            conn.close()
+
+    def iter_user_checkins(self, user_id, start: Optional[str] = None, end: Optional[str] = None):
+        """Yield (date, habit, status) for one user's check-ins between start and end (inclusive) in date order."""
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        try:
+            yield from conn.execute(
+                "SELECT date, habit, status FROM checkins WHERE user_id = ? AND date >= ? AND date <= ? "
+                "ORDER BY date", (str(user_id), start or "", end or "9999-12-31"))
+        finally:
+            conn.close()
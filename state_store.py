@@ -0,0 +1,84 @@
+# state_store.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class StateStore:
+    def __init__(self, ttl_seconds: float = 86400, max_entries: int = 10000, backend=None):
+        """
+        Per-user conversation state (e.g. "waiting_for_habits") with expiry.
+
+        States expire ttl_seconds after they were set. In memory the entries
+        are kept in LRU order and the least recently used ones are evicted
+        beyond max_entries, so abandoned /start flows can't grow it without
+        bound.
+
+        With a backend (a habit store) the states are persisted through its
+        get_state/set_state/delete_state methods instead, so they survive
+        restarts and are shared by every process using the same storage.
+
+        Args:
+            ttl_seconds: Lifetime of a state
+            max_entries: Maximum number of users with a state
+            backend: Habit store to persist to, or None for memory only
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.backend = backend
+        self._lock = threading.Lock()
+        # user_id -> (state, expires_at), least recently used first
+        self._entries = OrderedDict()
+
+    def get(self, user_id) -> Optional[str]:
+        """Return the user's state, or None if there is none or it expired."""
+        user_id = str(user_id)
+        now = time.time()
+        if self.backend is not None:
+            entry = self.backend.get_state(user_id)
+            if entry is None or entry[1] <= now:
+                return None
+            return entry[0]
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[0]
+
+    def set(self, user_id, state: str):
+        user_id = str(user_id)
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        if self.backend is not None:
+            self.backend.set_state(user_id, state, expires_at, now=now, max_entries=self.max_entries)
+            return
+        with self._lock:
+            self._entries[user_id] = (state, expires_at)
+            self._entries.move_to_end(user_id)
+            # Expired entries are mostly at the cold end; drop those, then enforce the cap
+            while self._entries:
+                oldest, (_, oldest_expiry) = next(iter(self._entries.items()))
+                if oldest_expiry > now and len(self._entries) <= self.max_entries:
+                    break
+                del self._entries[oldest]
+
+    def pop(self, user_id) -> Optional[str]:
+        """Remove and return the user's state (None if there was none)."""
+        state = self.get(user_id)
+        if self.backend is not None:
+            self.backend.delete_state(str(user_id))
+        else:
+            with self._lock:
+                self._entries.pop(str(user_id), None)
+        return state
+
+    def __len__(self):
+        if self.backend is not None:
+            return self.backend.count_states(time.time())
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,264 @@
+# stats_engine.py
+import os
+import threading
+from datetime import date as date_cls
+from typing import Callable, Dict, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+from habit_store import TRACKING_FIELDS
+
+EPOCH_ORDINAL = date_cls(1970, 1, 1).toordinal()
+
+
+def to_day(date: str) -> int:
+    """'YYYY-MM-DD' -> days since 1970-01-01."""
+    return date_cls.fromisoformat(date).toordinal() - EPOCH_ORDINAL
+
+
+def from_day(day: int) -> str:
+    return date_cls.fromordinal(int(day) + EPOCH_ORDINAL).isoformat()
+
+
+class StatsEngine:
+    def __init__(self, habit_key: Optional[Callable[[str, str], Hashable]] = None):
+        """
+        Columnar copy of the tracking log for vectorized statistics.
+
+        Users and habits are dictionary-encoded to int32 codes, dates are
+        stored as int32 day numbers and statuses as a bool array. Rows are
+        appended in log order, so the last row for a (user, habit, day) wins
+        when results are computed, exactly like the CSV log.
+
+        Args:
+            habit_key: Maps (user_id, habit name) to the key check-ins are
+                grouped by (e.g. HabitIds.habit_id, so a renamed habit keeps
+                its streak); the habit name if None
+        """
+        self._lock = threading.Lock()
+        self.habit_key = habit_key
+        self.user_codes: Dict[str, int] = {}
+        self.habit_codes: Dict[str, int] = {}
+        self.users = []
+        self.habits = []
+        # habit_key results, dictionary-encoded: (user code, habit code) -> key code
+        self._pair_keys: Dict[tuple, int] = {}
+        self._key_codes: Dict[Hashable, int] = {}
+        self.keys = []
+        self._n = 0
+        self._day = np.empty(1024, dtype=np.int32)
+        self._user = np.empty(1024, dtype=np.int32)
+        self._habit = np.empty(1024, dtype=np.int32)
+        self._done = np.empty(1024, dtype=bool)
+
+    # Loading
+
+    def load_csv(self, path: str):
+        """Replace the contents with the rows of a tracking CSV file."""
+        if os.path.exists(path):
+            frame = pd.read_csv(path, dtype=str, usecols=TRACKING_FIELDS, keep_default_na=False)
+        else:
+            frame = pd.DataFrame({field: pd.Series(dtype=str) for field in TRACKING_FIELDS})
+        self._load_frame(frame)
+
+    def load_rows(self, rows):
+        """Replace the contents with (date, user_id, habit, status) tuples."""
+        self._load_frame(pd.DataFrame.from_records(list(rows), columns=TRACKING_FIELDS))
+
+    def _load_frame(self, frame: pd.DataFrame):
+        user_codes, users = pd.factorize(frame['user_id'])
+        habit_codes, habits = pd.factorize(frame['habit'])
+        days = (pd.to_datetime(frame['date'], format='%Y-%m-%d').to_numpy('datetime64[D]')
+                .astype(np.int64).astype(np.int32))
+        self.load_columns(days, user_codes, habit_codes, (frame['status'] == '✅').to_numpy(), users, habits)
+
+    def load_columns(self, day, user, habit, done, users, habits):
+        """
+        Replace the contents with already dictionary-encoded columns in log
+        order (e.g. binary_store's mapped records): day numbers, user and
+        habit codes indexing users and habits, and completion flags.
+        """
+        with self._lock:
+            self.user_codes = {user_id: code for code, user_id in enumerate(users)}
+            self.habit_codes = {name: code for code, name in enumerate(habits)}
+            self.users = list(users)
+            self.habits = list(habits)
+            self._pair_keys, self._key_codes, self.keys = {}, {}, []
+            n = len(day)
+            capacity = max(1024, 2 * n)
+            self._n = n
+            self._day = np.empty(capacity, dtype=np.int32)
+            self._user = np.empty(capacity, dtype=np.int32)
+            self._habit = np.empty(capacity, dtype=np.int32)
+            self._done = np.empty(capacity, dtype=bool)
+            self._day[:n] = day
+            self._user[:n] = user
+            self._habit[:n] = habit
+            self._done[:n] = done
+
+    def append(self, date: str, user_id, habit: str, status: str):
+        """Append one check-in (amortized O(1))."""
+        with self._lock:
+            if self._n == len(self._day):
+                capacity = 2 * len(self._day)
+                for name in ('_day', '_user', '_habit', '_done'):
+                    old = getattr(self, name)
+                    new = np.empty(capacity, dtype=old.dtype)
+                    new[:self._n] = old[:self._n]
+                    setattr(self, name, new)
+            user_code = self.user_codes.get(str(user_id))
+            if user_code is None:
+                user_code = self.user_codes[str(user_id)] = len(self.users)
+                self.users.append(str(user_id))
+            habit_code = self.habit_codes.get(habit)
+            if habit_code is None:
+                habit_code = self.habit_codes[habit] = len(self.habits)
+                self.habits.append(habit)
+            i = self._n
+            self._day[i] = to_day(date)
+            self._user[i] = user_code
+            self._habit[i] = habit_code
+            self._done[i] = status == '✅'
+            self._n += 1
+
+    # Computation
+
+    def _keyed(self, user, habit):
+        """Key codes for (user, habit) code pairs; habit_key runs once per distinct pair. Call with the lock held."""
+        width = max(len(self.habits), 1)
+        pairs, inverse = np.unique(user.astype(np.int64) * width + habit, return_inverse=True)
+        codes = np.empty(len(pairs), dtype=np.int32)
+        for i, pair in enumerate(pairs.tolist()):
+            user_code, habit_code = divmod(pair, width)
+            code = self._pair_keys.get((user_code, habit_code))
+            if code is None:
+                key = self.habit_key(self.users[user_code], self.habits[habit_code])
+                code = self._key_codes.get(key)
+                if code is None:
+                    code = self._key_codes[key] = len(self.keys)
+                    self.keys.append(key)
+                self._pair_keys[(user_code, habit_code)] = code
+            codes[i] = code
+        return codes[inverse.reshape(-1)]
+
+    def _resolved(self, user_id=None):
+        """
+        Return (user, key, day, done, habit) with superseded rows dropped,
+        sorted by user, key and day, plus the key labels. key is the
+        habit_key code (the habit code without habit_key) and habit the code
+        of the name each row was recorded under. Restricted to one user if
+        user_id is given.
+        """
+        with self._lock:
+            n = self._n
+            user, habit, day, done = self._user[:n], self._habit[:n], self._day[:n], self._done[:n]
+            if user_id is not None:
+                code = self.user_codes.get(str(user_id))
+                mask = user == (-1 if code is None else code)
+                user, habit, day, done = user[mask], habit[mask], day[mask], done[mask]
+            else:
+                user, habit, day, done = user.copy(), habit.copy(), day.copy(), done.copy()
+            if self.habit_key is None:
+                key, labels = habit, self.habits
+            else:
+                key, labels = self._keyed(user, habit), self.keys
+
+        # Stable sort keeps log order within equal keys, so the last one wins
+        order = np.lexsort((np.arange(len(day)), day, key, user))
+        user, key, day, done, habit = user[order], key[order], day[order], done[order], habit[order]
+        last = np.ones(len(day), dtype=bool)
+        last[:-1] = (user[1:] != user[:-1]) | (key[1:] != key[:-1]) | (day[1:] != day[:-1])
+        return user[last], key[last], day[last], done[last], habit[last], labels
+
+    def compute(self, user_id=None, today: Optional[str] = None) -> pd.DataFrame:
+        """
+        Per-(user, habit) totals, completions and streaks, for one user or
+        everyone; with habit_key, check-ins under names with the same key
+        count as one habit.
+
+        A streak is a run of completed check-ins on consecutive days. The
+        current streak is the run ending at the latest check-in, and only
+        counts if that check-in is from today or yesterday.
+
+        Returns:
+            DataFrame with columns user_id, habit (the name of the latest
+            check-in), habit_id (its habit_key, or the name again), total,
+            completed, current_streak, last_run (the run ending at the
+            latest check-in, whatever today is), longest_streak, last_date
+        """
+        user, key, day, done, habit, labels = self._resolved(user_id)
+        columns = ['user_id', 'habit', 'habit_id', 'total', 'completed', 'current_streak', 'last_run',
+                   'longest_streak', 'last_date']
+        if len(day) == 0:
+            return pd.DataFrame(columns=columns)
+
+        # Group boundaries: rows are sorted by (user, key, day)
+        group_start = np.ones(len(day), dtype=bool)
+        group_start[1:] = (user[1:] != user[:-1]) | (key[1:] != key[:-1])
+        group_id = np.cumsum(group_start) - 1
+        starts = np.flatnonzero(group_start)
+        ends = np.append(starts[1:], len(day)) - 1
+
+        # A row extends the previous run if both are done and a day apart
+        extends = np.zeros(len(day), dtype=bool)
+        extends[1:] = done[1:] & done[:-1] & ~group_start[1:] & (day[1:] - day[:-1] == 1)
+        run_id = np.cumsum(~extends)
+        run_len = np.bincount(run_id, weights=done)
+        streak_at = run_len[run_id] * done  # length of the run each row belongs to
+
+        groups = len(starts)
+        longest = np.zeros(groups, dtype=np.int64)
+        np.maximum.at(longest, group_id, streak_at.astype(np.int64))
+
+        today_day = to_day(today) if today else int(np.datetime64('today', 'D').astype(np.int64))
+        last_run = run_len[run_id[ends]].astype(np.int64)
+        alive = day[ends] >= today_day - 1
+        current = np.where(alive, last_run, 0)
+
+        return pd.DataFrame({
+            'user_id': [self.users[code] for code in user[starts]],
+            'habit': [self.habits[code] for code in habit[ends]],
+            'habit_id': [labels[code] for code in key[starts]],
+            'total': np.diff(np.append(starts, len(day))),
+            'completed': np.bincount(group_id, weights=done, minlength=groups).astype(np.int64),
+            'current_streak': current,
+            'last_run': last_run,
+            'longest_streak': longest,
+            'last_date': [from_day(d) for d in day[ends]],
+        }, columns=columns)
+
+    def user_stats(self, user_id, today: Optional[str] = None) -> Dict[str, Dict]:
+        """{habit id: {'total', 'completed', 'current_streak', 'longest_streak', 'last_date'}} for one user."""
+        frame = self.compute(user_id, today)
+        return {row.pop('habit_id'): row for row in frame.drop(columns=['user_id', 'habit']).to_dict('records')}
+
+    def rollup(self, user_id=None, period: str = 'W') -> pd.DataFrame:
+        """
+        Completion totals per (user, habit, period) where period is 'W'
+        (weeks starting Monday) or 'M' (calendar months), with the same
+        habit and habit_id columns as compute.
+        """
+        user, key, day, done, habit, labels = self._resolved(user_id)
+        if period == 'W':
+            # 1970-01-01 was a Thursday; shift so weeks start on Monday
+            start = (day + 3) // 7 * 7 - 3
+        elif period == 'M':
+            start = day.astype('datetime64[D]').astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+        else:
+            raise ValueError(f"unknown period {period!r}")
+        # Name of each (user, key)'s latest check-in
+        group_end = np.ones(len(day), dtype=bool)
+        group_end[:-1] = (user[1:] != user[:-1]) | (key[1:] != key[:-1])
+        names = {(u, k): self.habits[h] for u, k, h in zip(user[group_end].tolist(), key[group_end].tolist(),
+                                                             habit[group_end].tolist())}
+        frame = pd.DataFrame({'user': user, 'key': key, 'start': start, 'done': done})
+        grouped = frame.groupby(['user', 'key', 'start'], sort=True)['done'].agg(['size', 'sum']).reset_index()
+        return pd.DataFrame({
+            'user_id': [self.users[code] for code in grouped['user']],
+            'habit': [names[pair] for pair in zip(grouped['user'].tolist(), grouped['key'].tolist())],
+            'habit_id': [labels[code] for code in grouped['key']],
+            'period_start': [from_day(d) for d in grouped['start']],
+            'total': grouped['size'].astype(np.int64),
+            'completed': grouped['sum'].astype(np.int64),
+        })
@@ -0,0 +1,122 @@
+# sync_worker.py
+import threading
+import time
+
+
+class GitHubSyncWorker:
+    def __init__(self, debounce_seconds: float = 10.0, max_backoff_seconds: float = 300.0):
+        """
+        Background worker that pushes dirty CSV files to GitHub.
+
+        Writers call mark_dirty() and return immediately. The worker waits for
+        the debounce window so that a burst of writes becomes one commit per
+        file, and retries failed pushes with exponential backoff.
+
+        Args:
+            debounce_seconds: Delay between the first write and the push
+            max_backoff_seconds: Upper bound for the retry delay
+        """
+        self.debounce_seconds = debounce_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._cond = threading.Condition()
+        # local_path -> (GitHubCSVSync instance responsible for it, prepare callable)
+        self._dirty = {}
+        # time.monotonic() at which the next push is due (None if idle)
+        self._due = None
+        self._failures = 0
+        self._stopping = False
+        # Serialises pushes from the worker thread and flush()
+        self._push_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="github-sync", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def mark_dirty(self, sync, local_path: str, prepare=None):
+        """
+        Schedule local_path to be pushed with sync after the debounce window.
+
+        Args:
+            sync: GitHubCSVSync (or compatible) responsible for the file
+            local_path: Local file to push
+            prepare: Optional callable run before the push, e.g. to export
+                the file from a database; run once per batch of pushes
+        """
+        with self._cond:
+            self._dirty[local_path] = (sync, prepare)
+            if self._due is None:
+                self._due = time.monotonic() + self.debounce_seconds
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping and (self._due is None or time.monotonic() < self._due):
+                    timeout = None if self._due is None else self._due - time.monotonic()
+                    self._cond.wait(timeout)
+                if self._stopping:
+                    return
+            self._push_pending()
+
+    def _push_pending(self) -> bool:
+        """Push every dirty file once; failed files are rescheduled with backoff."""
+        with self._push_lock:
+            with self._cond:
+                pending, self._dirty = self._dirty, {}
+                self._due = None
+
+            failed = {}
+            # Files sharing a prepare callable (e.g. one database export) only need it run once
+            prepared = set()
+            for local_path, (sync, prepare) in pending.items():
+                try:
+                    if prepare and prepare not in prepared:
+                        prepare()
+                        prepared.add(prepare)
+                    if not sync.sync_to_github(local_path):
+                        failed[local_path] = (sync, prepare)
+                except Exception as e:
+                    print(f"❌ Exception in background sync of {local_path}: {e}")
+                    failed[local_path] = (sync, prepare)
+
+            with self._cond:
+                if failed:
+                    for local_path, entry in failed.items():
+                        self._dirty.setdefault(local_path, entry)
+                    self._failures += 1
+                    # At least a second, so a zero debounce doesn't retry in a tight loop
+                    backoff = min(self.max_backoff_seconds, max(1.0, self.debounce_seconds) * 2 ** self._failures)
+                    self._due = time.monotonic() + backoff
+                    print(f"⏳ GitHub sync failed for {len(failed)} file(s), retrying in {backoff:.1f}s")
+                else:
+                    self._failures = 0
+                    if self._dirty and self._due is None:
+                        self._due = time.monotonic() + self.debounce_seconds
+                self._cond.notify()
+            return not failed
+
+    def flush(self, attempts: int = 1) -> bool:
+        """
+        Push all dirty files now instead of waiting for the debounce window.
+
+        Args:
+            attempts: How many times to try before giving up
+
+        Returns:
+            True if nothing is left to push, False otherwise
+        """
+        for attempt in range(attempts):
+            if attempt:
+                time.sleep(min(self.max_backoff_seconds, 2 ** attempt))
+            if self._push_pending():
+                return True
+        return False
+
+    def stop(self, attempts: int = 3) -> bool:
+        """Stop the worker thread and push whatever is still dirty."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread.is_alive():
+            self._thread.join()
+        return self.flush(attempts)
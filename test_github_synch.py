@@ -0,0 +1,109 @@
+# test_github_synch.py
+import csv
+
+import pytest
+
+from fake_github import FakeGitHubAPI
+from github_synch import GitHubShardedCSVSync
+from habit_store import TRACKING_FIELDS
+
+
+@pytest.fixture
+def api():
+    api = FakeGitHubAPI()
+    api.start()
+    yield api
+    api.stop()
+
+
+def make_sync(api) -> GitHubShardedCSVSync:
+    return GitHubShardedCSVSync("owner", "repo", "data/habit_tracking", "token", api_url=api.url)
+
+
+def append_rows(path, rows):
+    new = not path.exists()
+    with open(path, 'a', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        if new:
+            writer.writerow(TRACKING_FIELDS)
+        writer.writerows(rows)
+
+
+def read_rows(path) -> dict:
+    """{(date, user_id, habit): status}, last row winning like the log."""
+    with open(path, newline='', encoding='utf-8') as file:
+        return {(row['date'], row['user_id'], row['habit']): row['status'] for row in csv.DictReader(file)}
+
+
+def test_pull_keeps_unpushed_local_rows_after_restart(api, tmp_path):
+    ours, theirs = tmp_path / "ours.csv", tmp_path / "theirs.csv"
+    append_rows(ours, [["2025-07-01", "1", "read", "✅"]])
+    assert make_sync(api).sync_to_github(str(ours))
+
+    # Another replica changes the same month's shard
+    other = make_sync(api)
+    assert other.sync_from_github(str(theirs))
+    append_rows(theirs, [["2025-07-02", "2", "run", "❌"]])
+    assert other.sync_to_github(str(theirs))
+
+    # Meanwhile we record a check-in, restart before pushing it, then pull
+    append_rows(ours, [["2025-07-03", "1", "read", "✅"]])
+    assert make_sync(api).sync_from_github(str(ours))
+
+    assert read_rows(ours) == {
+        ("2025-07-01", "1", "read"): "✅",
+        ("2025-07-02", "2", "run"): "❌",
+        ("2025-07-03", "1", "read"): "✅",
+    }
+
+
+def test_pull_keeps_local_correction_of_an_unchanged_row(api, tmp_path):
+    ours, theirs = tmp_path / "ours.csv", tmp_path / "theirs.csv"
+    sync = make_sync(api)
+    append_rows(ours, [["2025-07-01", "1", "read", "✅"]])
+    assert sync.sync_to_github(str(ours))
+
+    other = make_sync(api)
+    assert other.sync_from_github(str(theirs))
+    append_rows(theirs, [["2025-07-02", "2", "run", "✅"]])
+    assert other.sync_to_github(str(theirs))
+
+    append_rows(ours, [["2025-07-01", "1", "read", "❌"]])
+    assert sync.sync_from_github(str(ours))
+
+    assert read_rows(ours) == {("2025-07-01", "1", "read"): "❌", ("2025-07-02", "2", "run"): "✅"}
+
+
+def test_concurrent_pushes_to_one_shard_merge(api, tmp_path):
+    ours, theirs = tmp_path / "ours.csv", tmp_path / "theirs.csv"
+    sync, other = make_sync(api), make_sync(api)
+    append_rows(ours, [["2025-07-01", "1", "read", "✅"]])
+    append_rows(theirs, [["2025-07-01", "2", "run", "❌"], ["2025-08-01", "2", "run", "✅"]])
+    assert sync.sync_to_github(str(ours))
+    assert other.sync_to_github(str(theirs))
+
+    expected = {
+        ("2025-07-01", "1", "read"): "✅",
+        ("2025-07-01", "2", "run"): "❌",
+        ("2025-08-01", "2", "run"): "✅",
+    }
+    assert read_rows(theirs) == expected
+    assert sync.sync_from_github(str(ours))
+    assert read_rows(ours) == expected
+
+
+def test_pull_applies_merged_rows_through_callback(api, tmp_path):
+    ours, theirs = tmp_path / "ours.csv", tmp_path / "theirs.csv"
+    append_rows(theirs, [["2025-07-02", "2", "run", "❌"]])
+    assert make_sync(api).sync_to_github(str(theirs))
+
+    applied = []
+    sync = GitHubShardedCSVSync("owner", "repo", "data/habit_tracking", "token", api_url=api.url,
+                                apply_changes=lambda rows, changed: applied.append((rows, changed)))
+    append_rows(ours, [["2025-07-01", "1", "read", "✅"]])
+    assert sync.sync_from_github(str(ours))
+
+    assert applied == [([{'date': "2025-07-02", 'user_id': "2", 'habit': "run", 'status': "❌"}],
+                        {("2025-07-02", "2", "run")})]
+    # The callback owns the local data: the file is left to it
+    assert read_rows(ours) == {("2025-07-01", "1", "read"): "✅"}
@@ -0,0 +1,147 @@
+# webhook.py
+import json
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Optional
+
+from telegram import Update
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookRequestHandler(BaseHTTPRequestHandler):
+    """Accepts Telegram updates POSTed to the webhook path and queues them for the dispatcher."""
+
+    protocol_version = "HTTP/1.1"
+    # Idle keep-alive connections are closed after this many seconds
+    timeout = 15
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: bytes = b""):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        if self.server.draining:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        # Health check for load balancers
+        self._reply(503 if self.server.draining else 200, b"draining" if self.server.draining else b"ok")
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.split("?", 1)[0] != server.url_path:
+            self._reply(404)
+            return
+        if server.secret_token and self.headers.get(SECRET_TOKEN_HEADER) != server.secret_token:
+            self._reply(403)
+            return
+        try:
+            update = Update.de_json(json.loads(body), server.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            print(f"⚠️  Ignoring malformed webhook update: {e}")
+            self._reply(400)
+            return
+        # Acknowledge right away; the dispatcher's workers handle the update
+        server.update_queue.put(update)
+        self._reply(200)
+
+
+class WebhookServer(HTTPServer):
+    def __init__(self, address: tuple, bot, update_queue, url_path: str, secret_token: Optional[str] = None,
+                 workers: int = 8):
+        """
+        HTTP server for Telegram webhooks whose connections are handled by a
+        bounded thread pool.
+
+        Requests only parse the update and put it on the dispatcher's queue,
+        so a few workers keep up with many updates per second.
+
+        Args:
+            address: (host, port) to bind
+            bot: telegram.Bot used to deserialize updates
+            update_queue: The Updater's update queue
+            url_path: Path updates are POSTed to (e.g. "/telegram")
+            secret_token: Required X-Telegram-Bot-Api-Secret-Token value (optional)
+            workers: Maximum number of connections handled at once
+        """
+        self.bot = bot
+        self.update_queue = update_queue
+        self.url_path = url_path
+        self.secret_token = secret_token
+        self.draining = False
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="webhook")
+        super().__init__(address, WebhookRequestHandler)
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def drain(self):
+        """Stop accepting connections and wait for the requests in flight (call from another thread)."""
+        self.draining = True
+        self.shutdown()
+        self._pool.shutdown(wait=True)
+        self.server_close()
+
+
+def run_webhook(updater, listen: str, port: int, url_path: str, webhook_url: str = "",
+                secret_token: str = "", workers: int = 8):
+    """
+    Serve updates through a webhook until SIGINT/SIGTERM, then drain.
+
+    On shutdown the server stops accepting connections, finishes the requests
+    in flight, and the dispatcher processes every update already queued before
+    the function returns. The webhook is left registered so other instances
+    behind the same URL keep receiving updates.
+
+    Args:
+        updater: telegram.ext.Updater with handlers registered (not started)
+        listen: Interface to bind, e.g. "0.0.0.0"
+        port: Port to bind
+        url_path: Path updates are POSTed to
+        webhook_url: Public base URL to register with Telegram (skipped if empty)
+        secret_token: Secret Telegram must send with each update (optional)
+        workers: HTTP worker threads
+    """
+    url_path = "/" + url_path.strip("/")
+    server = WebhookServer((listen, port), updater.bot, updater.update_queue, url_path,
+                           secret_token or None, workers)
+    if webhook_url:
+        updater.bot.set_webhook(url=webhook_url.rstrip("/") + url_path, secret_token=secret_token or None,
+                                max_connections=workers)
+        print(f"🔗 Webhook registered at {webhook_url.rstrip('/')}{url_path}")
+
+    updater.job_queue.start()
+    dispatcher_thread = threading.Thread(target=updater.dispatcher.start, name="dispatcher")
+    dispatcher_thread.start()
+    threading.Thread(target=server.serve_forever, name="webhook-server", daemon=True).start()
+    print(f"🌐 Listening for webhook updates on {listen}:{server.server_port}{url_path}")
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *args: stop.set())
+    while not stop.wait(1):
+        pass
+
+    print("🛑 Draining webhook server...")
+    server.drain()
+    updater.job_queue.stop()
+    # Returns once every queued update and running handler has finished
+    updater.dispatcher.stop()
+    dispatcher_thread.join()
+    print("✅ Webhook server drained")